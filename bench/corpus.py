@@ -0,0 +1,320 @@
+"""Генерирует синтетический ETL-корпус SQL-файлов.
+
+Запуск:
+    python bench/corpus.py КАТАЛОГ [--files 10] [--statements 1000] [--cte-depth 3]
+        [--join-fanout 3] [--procedures 0] [--dialects postgres=0.6,oracle=0.3,mysql=0.1]
+        [--seed 0]
+
+Корпус детерминирован: одни и те же параметры и seed дают побайтно одинаковые
+файлы, а содержимое каждого файла зависит только от seed и номера файла.
+
+Файлы etl_NNNN.sql содержат операторы одного диалекта (CREATE TABLE, INSERT ...
+SELECT с JOIN, цепочки CTE, UPDATE, DELETE, MERGE, SELECT). Файлы procs_NNNN.ddl
+содержат процедуры plpgsql, которые пишут в буферные таблицы buff_N и читают из них.
+"""
+
+import argparse
+import os
+import random
+from typing import Dict, Iterator, List
+
+DIALECT_MIX = {"postgres": 0.6, "oracle": 0.3, "mysql": 0.1}
+SCHEMAS = ("raw", "stg", "dwh", "mart")
+PROCEDURES_PER_FILE = 50
+
+# Доли видов операторов в файле
+STATEMENT_WEIGHTS = {
+    "insert": 35,
+    "cte": 20,
+    "update": 15,
+    "merge": 10,
+    "create": 10,
+    "delete": 5,
+    "select": 5,
+}
+
+_TYPES = {
+    "postgres": "id BIGSERIAL, amount NUMERIC(12, 2), name TEXT, updated_at TIMESTAMP",
+    "oracle": "id NUMBER(12), amount NUMBER(12, 2), name VARCHAR2(100), updated_at DATE",
+    "mysql": "id INT AUTO_INCREMENT, amount DECIMAL(12, 2), name VARCHAR(100), "
+    "updated_at DATETIME",
+}
+_COALESCE = {
+    "postgres": "COALESCE({}, 0)::numeric",
+    "oracle": "NVL({}, 0)",
+    "mysql": "IFNULL({}, 0)",
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Разбирает долю диалектов вида "postgres=0.6,oracle=0.4"."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(DIALECT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown dialects: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class _FileWriter:
+    """Операторы одного файла корпуса (см. generate_corpus)."""
+
+    def __init__(self, rng: random.Random, dialect: str, tables: int, options: dict):
+        self.rng = rng
+        self.dialect = dialect
+        self.tables = tables
+        self.cte_depth = options["cte_depth"]
+        self.join_fanout = options["join_fanout"]
+
+    def table(self) -> str:
+        i = self.rng.randrange(self.tables)
+        name = f"{SCHEMAS[i % len(SCHEMAS)]}_table_{i}"
+        return f"`{name}`" if self.dialect == "mysql" else name
+
+    def statement(self) -> str:
+        kind = self.rng.choices(
+            list(STATEMENT_WEIGHTS), weights=list(STATEMENT_WEIGHTS.values())
+        )[0]
+        if kind == "merge" and self.dialect == "mysql":
+            kind = "upsert"
+        return getattr(self, f"_{kind}")()
+
+    def _amount(self, alias: str) -> str:
+        return _COALESCE[self.dialect].format(f"{alias}.amount")
+
+    def _joins(self, fanout: int) -> str:
+        lines = []
+        for j in range(1, fanout + 1):
+            join = self.rng.choice(("JOIN", "LEFT JOIN"))
+            lines.append(f"{join} {self.table()} t{j} ON t{j}.id = t0.id")
+        return "\n".join(lines)
+
+    def _insert(self) -> str:
+        fanout = self.rng.randint(0, self.join_fanout)
+        joins = self._joins(fanout)
+        return (
+            f"INSERT INTO {self.table()} (id, amount, updated_at)\n"
+            f"SELECT t0.id, {self._amount('t0')}, t0.updated_at\n"
+            f"FROM {self.table()} t0\n"
+            + (joins + "\n" if joins else "")
+            + f"WHERE t0.amount > {self.rng.randrange(1000)};"
+        )
+
+    def _cte(self) -> str:
+        depth = self.rng.randint(1, max(self.cte_depth, 1))
+        ctes = [f"c1 AS (SELECT id, amount FROM {self.table()})"]
+        for level in range(2, depth + 1):
+            ctes.append(
+                f"c{level} AS (SELECT c{level - 1}.id, c{level - 1}.amount "
+                f"FROM c{level - 1} JOIN {self.table()} s ON s.id = c{level - 1}.id)"
+            )
+        ctes = ",\n     ".join(ctes)
+        return (
+            f"INSERT INTO {self.table()} (id, amount)\n"
+            f"WITH {ctes}\n"
+            f"SELECT id, amount FROM c{depth};"
+        )
+
+    def _update(self) -> str:
+        target, source = self.table(), self.table()
+        if self.dialect == "postgres":
+            return (
+                f"UPDATE {target} SET amount = s.amount\n"
+                f"FROM {source} s WHERE s.id = {target}.id;"
+            )
+        if self.dialect == "mysql":
+            return (
+                f"UPDATE {target} t JOIN {source} s ON s.id = t.id\n"
+                f"SET t.amount = s.amount;"
+            )
+        return (
+            f"UPDATE {target} t SET amount = (\n"
+            f"    SELECT MAX(s.amount) FROM {source} s WHERE s.id = t.id\n);"
+        )
+
+    def _merge(self) -> str:
+        return (
+            f"MERGE INTO {self.table()} t USING {self.table()} s ON (t.id = s.id)\n"
+            f"WHEN MATCHED THEN UPDATE SET amount = s.amount\n"
+            f"WHEN NOT MATCHED THEN INSERT (id, amount) VALUES (s.id, s.amount);"
+        )
+
+    def _upsert(self) -> str:
+        return (
+            f"INSERT INTO {self.table()} (id, amount)\n"
+            f"SELECT id, IFNULL(amount, 0) FROM {self.table()}\n"
+            f"ON DUPLICATE KEY UPDATE amount = VALUES(amount);"
+        )
+
+    def _create(self) -> str:
+        suffix = " ENGINE=InnoDB" if self.dialect == "mysql" else ""
+        return f"CREATE TABLE {self.table()} ({_TYPES[self.dialect]}){suffix};"
+
+    def _delete(self) -> str:
+        return (
+            f"DELETE FROM {self.table()}\n"
+            f"WHERE id IN (SELECT id FROM {self.table()});"
+        )
+
+    def _select(self) -> str:
+        joins = self._joins(self.rng.randint(1, max(self.join_fanout, 1)))
+        return (
+            f"SELECT t0.id, SUM(t0.amount)\nFROM {self.table()} t0\n{joins}\n"
+            f"GROUP BY t0.id;"
+        )
+
+
+def _file_rng(seed: int, kind: str, index: int) -> random.Random:
+    return random.Random(f"{seed}:{kind}:{index}")
+
+
+def sql_file(index: int, statements: int, options: dict) -> str:
+    """Возвращает текст index-го файла etl_NNNN.sql корпуса.
+
+    Args:
+        index (int): Номер файла.
+        statements (int): Количество операторов в файле.
+        options (dict): Параметры корпуса (см. corpus_options()).
+
+    Returns:
+        str: Операторы через пустую строку.
+    """
+    rng = _file_rng(options["seed"], "sql", index)
+    mix = options["dialects"]
+    dialect = rng.choices(list(mix), weights=list(mix.values()))[0]
+    writer = _FileWriter(rng, dialect, options["tables"], options)
+    return "\n\n".join(writer.statement() for _ in range(statements)) + "\n"
+
+
+def procedure_file(index: int, procedures: int, options: dict) -> str:
+    """Возвращает текст index-го файла procs_NNNN.ddl корпуса.
+
+    Каждая процедура пишет в одну буферную таблицу и читает из другой,
+    поэтому большинство buff_N оказываются реальными буферными таблицами.
+
+    Args:
+        index (int): Номер файла.
+        procedures (int): Количество процедур в файле.
+        options (dict): Параметры корпуса (см. corpus_options()).
+
+    Returns:
+        str: Процедуры plpgsql через пустую строку.
+    """
+    rng = _file_rng(options["seed"], "ddl", index)
+    writer = _FileWriter(rng, "postgres", options["tables"], options)
+    buffers = max(options["tables"] // 10, 2)
+    blocks = []
+    for i in range(procedures):
+        write_to, read_from = rng.sample(range(buffers), 2)
+        blocks.append(
+            f'CREATE OR REPLACE PROCEDURE "load_{index}_{i}" ()\n'
+            "LANGUAGE plpgsql\n"
+            "AS $$\n"
+            "BEGIN\n"
+            f"    INSERT INTO buff_{write_to} (id, amount)\n"
+            f"    SELECT id, amount FROM {writer.table()};\n"
+            f"    INSERT INTO {writer.table()} (id, amount)\n"
+            f"    SELECT id, amount FROM buff_{read_from};\n"
+            f"    DELETE FROM buff_{read_from};\n"
+            "END;\n"
+            "$$;"
+        )
+    return "\n\n".join(blocks) + "\n"
+
+
+def corpus_options(
+    statements: int,
+    cte_depth: int = 3,
+    join_fanout: int = 3,
+    dialects: Dict[str, float] = None,
+    seed: int = 0,
+) -> dict:
+    """Собирает параметры корпуса.
+
+    Количество таблиц растет вместе с корпусом (одна на 10 операторов),
+    чтобы граф сохранял типичную плотность связей.
+
+    Args:
+        statements (int): Общее количество операторов корпуса.
+        cte_depth (int): Наибольшая длина цепочки CTE.
+        join_fanout (int): Наибольшее количество JOIN в запросе.
+        dialects (Dict[str, float], optional): Доли диалектов файлов. По умолчанию DIALECT_MIX.
+        seed (int): Начальное значение генератора.
+
+    Returns:
+        dict: Параметры для sql_file() и procedure_file().
+    """
+    return {
+        "tables": max(statements // 10, 50),
+        "cte_depth": cte_depth,
+        "join_fanout": join_fanout,
+        "dialects": dialects or DIALECT_MIX,
+        "seed": seed,
+    }
+
+
+def iter_corpus(
+    files: int, statements: int, procedures: int, options: dict
+) -> Iterator[tuple]:
+    """Выдает (имя файла, текст) файлов корпуса без записи на диск.
+
+    Args:
+        files (int): Количество файлов etl_NNNN.sql.
+        statements (int): Количество операторов в каждом файле.
+        procedures (int): Общее количество процедур (по PROCEDURES_PER_FILE в файле).
+        options (dict): Параметры корпуса (см. corpus_options()).
+    """
+    for index in range(files):
+        yield f"etl_{index:04d}.sql", sql_file(index, statements, options)
+    for index, start in enumerate(range(0, procedures, PROCEDURES_PER_FILE)):
+        count = min(PROCEDURES_PER_FILE, procedures - start)
+        yield f"procs_{index:04d}.ddl", procedure_file(index, count, options)
+
+
+def generate_corpus(
+    directory: str, files: int, statements: int, procedures: int, options: dict
+) -> List[str]:
+    """Записывает корпус в directory (см. iter_corpus).
+
+    Returns:
+        List[str]: Пути к созданным файлам.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, text in iter_corpus(files, statements, procedures, options):
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ETL corpus")
+    parser.add_argument("directory")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--statements", type=int, default=1000, help="per file")
+    parser.add_argument("--cte-depth", type=int, default=3)
+    parser.add_argument("--join-fanout", type=int, default=3)
+    parser.add_argument("--procedures", type=int, default=0, help="in total")
+    parser.add_argument("--dialects", type=parse_mix, default=DIALECT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    options = corpus_options(
+        args.files * args.statements,
+        cte_depth=args.cte_depth,
+        join_fanout=args.join_fanout,
+        dialects=args.dialects,
+        seed=args.seed,
+    )
+    paths = generate_corpus(
+        args.directory, args.files, args.statements, args.procedures, options
+    )
+    print(f"Generated {len(paths)} files in {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
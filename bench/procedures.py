@@ -0,0 +1,95 @@
+"""Сравнивает скорость извлечения процедур: прежнее регулярное выражение и сканер.
+
+Запуск:
+    python bench/procedures.py [директория] [--megabytes 4]   # по умолчанию buff_dml/
+
+Замеры (скорость в МБ/с):
+    files        - каждый .ddl файл директории по отдельности;
+    concatenated - файлы директории, повторенные до --megabytes МБ;
+    unclosed     - файлы без $$ с одной незакрытой $$ кавычкой в конце,
+                   размером 8 КБ, 16 КБ, ... до --megabytes МБ: на таком коде
+                   регулярное выражение перебирает с возвратами весь остаток
+                   текста для каждой позиции, и время растет кубически.
+
+Прежняя реализация на следующем размере unclosed не запускается, если на
+предыдущем заняла больше --limit секунд.
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from util.procedures import scan_procedures  # noqa: E402
+
+# Extractor used by Procedure.extract_procedures before the linear scanner
+_LEGACY_RE = re.compile(
+    r"[?:PROCEDURE|FUNCTION]\s+[\"\'?]?(\w+)[\"\'?]?\s*\(.*?\)\s*[^$]+?\$\$(.*?)\$\$",
+    re.DOTALL,
+)
+
+
+def _legacy(sql_code: str) -> int:
+    if "$$" not in sql_code:
+        return 0
+    return len(_LEGACY_RE.findall(sql_code))
+
+
+def _scanner(sql_code: str) -> int:
+    return len(scan_procedures(sql_code))
+
+
+def _report(name: str, label: str, extract, texts) -> float:
+    """Замеряет extract на texts, выводит строку отчета и возвращает секунды."""
+    megabytes = sum(len(text) for text in texts) / (1024 * 1024)
+    started = time.perf_counter()
+    found = sum(extract(text) for text in texts)
+    seconds = time.perf_counter() - started
+    speed = megabytes / max(seconds, 1e-9)
+    print(
+        f"{name:<14}{label:<10}{megabytes:>8.3f}{seconds:>10.3f}{speed:>10.2f}{found:>8}"
+    )
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Procedure extraction benchmark")
+    parser.add_argument("directory", nargs="?", default=os.path.join(ROOT, "buff_dml"))
+    parser.add_argument("--megabytes", type=float, default=4)
+    parser.add_argument("--limit", type=float, default=5)
+    args = parser.parse_args()
+
+    files = []
+    for path in sorted(glob.glob(os.path.join(args.directory, "*.ddl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            files.append(f.read())
+    joined = "\n".join(files)
+    size = int(args.megabytes * 1024 * 1024)
+    concatenated = (joined * (size // max(len(joined), 1) + 1))[:size]
+
+    print(
+        f"{'input':<14}{'extractor':<10}{'MB':>8}{'seconds':>10}{'MB/s':>10}{'found':>8}"
+    )
+    for label, extract in (("regex", _legacy), ("scanner", _scanner)):
+        _report("files", label, extract, files)
+    for label, extract in (("regex", _legacy), ("scanner", _scanner)):
+        _report("concatenated", label, extract, [concatenated])
+
+    without_quotes = concatenated.replace("$$", "")
+    legacy = True
+    length = 8 * 1024
+    while length <= size:
+        unclosed = without_quotes[:length] + "\nAS $$ BEGIN"
+        if legacy:
+            legacy = _report("unclosed", "regex", _legacy, [unclosed]) <= args.limit
+        _report("unclosed", "scanner", _scanner, [unclosed])
+        length *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Сравнивает память и время GraphStorage и ColumnarGraphStorage.
+
+Запуск:
+    python bench/storage.py [число_ребер]   # по умолчанию 1 000 000
+
+Граф синтетический: ребра между 50 000 таблицами с типичным набором операций,
+по 100 ребер на файл.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from sqlglot.expressions import Insert, Join, Select, Table, Update  # noqa: E402
+
+from base.columnar import ColumnarGraphStorage  # noqa: E402
+from base.storage import Edge, GraphStorage  # noqa: E402
+from logger_config import logger  # noqa: E402
+
+TABLES = 50_000
+EDGES_PER_FILE = 100
+OPERATIONS = (Insert, Select, Join, Table, Update)
+
+
+def files(edge_count: int):
+    """Выдает (зависимости, путь) синтетических файлов."""
+    for start in range(0, edge_count, EDGES_PER_FILE):
+        dependencies = defaultdict(set)
+        for i in range(start, min(start + EDGES_PER_FILE, edge_count)):
+            target = f"table_{i % TABLES}"
+            source = f"table_{(i * 7919 + 1) % TABLES}"
+            edge = Edge(source, target, OPERATIONS[i % len(OPERATIONS)])
+            dependencies[target].add(edge)
+        yield dependencies, f"file_{start // EDGES_PER_FILE}.sql"
+
+
+def fill(storage_cls, edge_count: int):
+    storage = storage_cls()
+    for dependencies, file_path in files(edge_count):
+        storage.add_dependencies(dependencies, source_file=file_path)
+    return storage
+
+
+def measure(storage_cls, edge_count: int):
+    """Возвращает (МБ памяти хранилища, секунд на заполнение, секунд на рёбра)."""
+    tracemalloc.start()
+    storage = fill(storage_cls, edge_count)
+    memory = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    tracemalloc.stop()
+    del storage
+
+    started = time.perf_counter()
+    storage = fill(storage_cls, edge_count)
+    filled = time.perf_counter() - started
+    started = time.perf_counter()
+    storage.get_filtered_nodes_edges()
+    return memory, filled, time.perf_counter() - started
+
+
+def main(edge_count: int):
+    logger.setLevel("WARNING")
+    print(f"{'storage':<24}{'MB':>10}{'fill, s':>10}{'edges, s':>10}")
+    for storage_cls in (GraphStorage, ColumnarGraphStorage):
+        memory, filled, listed = measure(storage_cls, edge_count)
+        print(
+            f"{storage_cls.__name__:<24}{memory:>10.1f}{filled:>10.2f}{listed:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,266 @@
+"""Измеряет пропускную способность разбора и пиковую память на синтетическом корпусе.
+
+Запуск:
+    python bench/throughput.py [--scales 1000,10000] [--benchmarks sqlast,directory]
+        [--save bench/baselines/throughput.json]
+        [--compare bench/baselines/throughput.json] [--tolerance 0.25]
+
+Для каждого масштаба (общее число операторов, от 1 000 до 1 000 000) корпус
+строится bench/corpus.py с фиксированным seed, а каждый замер выполняется в
+отдельном процессе: время не искажается сборкой мусора предыдущих замеров,
+а пиковая память (прирост ru_maxrss после импорта модулей) относится только
+к нему.
+
+Замеры:
+    sqlast         - SqlAst по тексту каждого файла (табличный режим);
+    directory      - DirectoryParser.parse_directory по файлам на диске;
+    column_storage - ColumnStorage.add_dependencies для зависимостей колонок
+                     (разбор SqlAst(column_mode=True) не входит во время);
+    buffer_tables  - BufferTable.find_buffer_tables по процедурам .ddl файлов
+                     (по 4 оператора в процедуре).
+
+Пропускная способность считается в операторах в секунду, для column_storage -
+в ребрах в секунду.
+
+Результаты сохраняются в JSON (--save) и сравниваются с сохраненными ранее
+(--compare): замедление или рост памяти больше --tolerance считается регрессией,
+и скрипт завершается с кодом 1.
+
+Результаты зависят от машины, поэтому baseline в репозитории не хранится
+(bench/baselines/ в .gitignore): сохраните его до изменения и сравнивайте
+после на той же машине. Если baseline снят на другой машине, compare()
+предупреждает об этом.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+import corpus  # noqa: E402
+
+BASELINE_VERSION = 1
+STATEMENTS_PER_FILE = 1000
+STATEMENTS_PER_PROCEDURE = 4
+SEED = 0
+BENCHMARKS = ("sqlast", "directory", "column_storage", "buffer_tables")
+
+
+def _layout(scale: int):
+    """Возвращает (файлов, операторов в файле, процедур) корпуса масштаба scale."""
+    per_file = min(scale, STATEMENTS_PER_FILE)
+    return max(scale // per_file, 1), per_file, scale // STATEMENTS_PER_PROCEDURE
+
+
+def _peak_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS - bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _bench_sqlast(scale: int, directory: str):
+    from base.parse import SqlAst
+
+    files, per_file, _ = _layout(scale)
+    options = corpus.corpus_options(scale, seed=SEED)
+    seconds = 0.0
+    for index in range(files):
+        sql_code = corpus.sql_file(index, per_file, options)
+        started = time.perf_counter()
+        SqlAst(sql_code, source_path=f"etl_{index:04d}.sql")
+        seconds += time.perf_counter() - started
+    return seconds, files * per_file
+
+
+def _bench_directory(scale: int, directory: str):
+    from base.parse import DirectoryParser
+
+    files, per_file, _ = _layout(scale)
+    parser = DirectoryParser()
+    started = time.perf_counter()
+    for _ in parser.iter_directory(directory):
+        pass
+    return time.perf_counter() - started, files * per_file
+
+
+def _bench_column_storage(scale: int, directory: str):
+    from base.parse import SqlAst
+    from field.storage import ColumnStorage
+
+    files, per_file, _ = _layout(scale)
+    options = corpus.corpus_options(scale, seed=SEED)
+    storage = ColumnStorage()
+    seconds = 0.0
+    edges = 0
+    for index in range(files):
+        path = f"etl_{index:04d}.sql"
+        sql_code = corpus.sql_file(index, per_file, options)
+        dependencies = SqlAst(sql_code, source_path=path, column_mode=True)
+        dependencies = dependencies.get_dependencies()
+        edges += sum(len(e) for e in dependencies.values())
+        started = time.perf_counter()
+        storage.add_dependencies(dependencies, source_file=path)
+        seconds += time.perf_counter() - started
+    return seconds, edges
+
+
+def _bench_buffer_tables(scale: int, directory: str):
+    from func.buff_tables import BufferTable, Procedure
+
+    _, _, procedures = _layout(scale)
+    options = corpus.corpus_options(scale, seed=SEED)
+    seconds = 0.0
+    for name, sql_code in corpus.iter_corpus(0, 0, procedures, options):
+        started = time.perf_counter()
+        found = Procedure.extract_procedures(sql_code)
+        BufferTable.find_buffer_tables(found, [], source_path=name)
+        seconds += time.perf_counter() - started
+    return seconds, procedures * STATEMENTS_PER_PROCEDURE
+
+
+def _measure(benchmark: str, scale: int, directory: str) -> dict:
+    """Выполняет один замер (в отдельном процессе, см. run())."""
+    # Modules are imported before the memory baseline is taken
+    import base.parse  # noqa: F401
+    import field.storage  # noqa: F401
+    import func.buff_tables  # noqa: F401
+    from logger_config import logger
+
+    logger.setLevel("ERROR")
+    before = _peak_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds, items = globals()[f"_bench_{benchmark}"](scale, directory)
+    return {
+        "seconds": round(seconds, 4),
+        "items": items,
+        "items_per_second": round(items / max(seconds, 1e-9), 1),
+        "peak_mb": round(max(_peak_mb() - before, 0.0), 1),
+    }
+
+
+def run(benchmarks, scales) -> dict:
+    """Выполняет замеры и возвращает результаты в формате baseline.
+
+    Returns:
+        dict: {"version", "meta", "results": {замер: {масштаб: результат}}}
+    """
+    context = multiprocessing.get_context("spawn")
+    results = {benchmark: {} for benchmark in benchmarks}
+    for scale in scales:
+        files, per_file, _ = _layout(scale)
+        with tempfile.TemporaryDirectory() as directory:
+            if "directory" in benchmarks:
+                options = corpus.corpus_options(scale, seed=SEED)
+                corpus.generate_corpus(directory, files, per_file, 0, options)
+            for benchmark in benchmarks:
+                with context.Pool(1) as pool:
+                    result = pool.apply(_measure, (benchmark, scale, directory))
+                results[benchmark][str(scale)] = result
+                print(
+                    f"{benchmark:<16}{scale:>10}{result['seconds']:>10.2f}"
+                    f"{result['items_per_second']:>14.0f}{result['peak_mb']:>10.1f}"
+                )
+    return {
+        "version": BASELINE_VERSION,
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Сравнивает результаты с baseline.
+
+    Args:
+        current (dict): Результаты run().
+        baseline (dict): Ранее сохраненные результаты run().
+        tolerance (float): Допустимая доля замедления или роста памяти.
+
+    Returns:
+        list: Описания регрессий (пустой, если их нет).
+    """
+    regressions = []
+    differs = [
+        key
+        for key in ("platform", "cpus", "python")
+        if baseline.get("meta", {}).get(key) != current["meta"][key]
+    ]
+    if differs:
+        print(
+            f"\nWarning: the baseline was recorded on another machine "
+            f"({', '.join(differs)} differ), the comparison is not reliable"
+        )
+    print(f"\n{'benchmark':<16}{'scale':>10}{'speed':>10}{'memory':>10}")
+    for benchmark, scales in current["results"].items():
+        for scale, result in scales.items():
+            previous = baseline.get("results", {}).get(benchmark, {}).get(scale)
+            if previous is None:
+                continue
+            speed = result["items_per_second"] / max(previous["items_per_second"], 1e-9)
+            memory = (result["peak_mb"] + 1) / (previous["peak_mb"] + 1)
+            print(f"{benchmark:<16}{scale:>10}{speed:>10.2f}x{memory:>9.2f}x")
+            if speed < 1 - tolerance:
+                regressions.append(f"{benchmark} at {scale}: {speed:.2f}x throughput")
+            if memory > 1 + tolerance:
+                regressions.append(f"{benchmark} at {scale}: {memory:.2f}x peak memory")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse throughput benchmarks")
+    parser.add_argument(
+        "--scales",
+        type=lambda text: [int(s) for s in text.split(",")],
+        default=[1000, 10000],
+        help="Comma-separated total statement counts (up to 1000000)",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        type=lambda text: text.split(","),
+        default=list(BENCHMARKS),
+    )
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    print(f"{'benchmark':<16}{'scale':>10}{'seconds':>10}{'items/s':>14}{'MB':>10}")
+    current = run(args.benchmarks, args.scales)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
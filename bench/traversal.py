@@ -0,0 +1,114 @@
+"""Считает обходы узлов AST при извлечении зависимостей.
+
+Запуск:
+    python bench/traversal.py [директория]   # по умолчанию buff_dml/
+
+Для каждого файла директории (табличный режим) и для каждой процедуры из него
+(функциональный режим) выводит число узлов AST и число посещений узлов при
+извлечении зависимостей. Посещения, выполненные при самом разборе, вычитаются.
+Данные INSERT ... VALUES не отбрасываются (см. strip_bulk_data), чтобы деревья
+совпадали с деревьями BASELINE.
+
+Для buff_dml/ рядом выводятся посещения многопроходного обхода, который
+заменил DependencyVisitor (BASELINE), и их сокращение.
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from sqlglot.expressions import Expression  # noqa: E402
+
+import base.parse  # noqa: E402
+from base.parse import SqlAst  # noqa: E402
+from func.buff_tables import Procedure  # noqa: E402
+
+DEFAULT_DIRECTORY = os.path.join(ROOT, "buff_dml")
+# (узлов, посещений) многопроходного обхода до DependencyVisitor (коммит
+# 5e0a449), измерено этим скриптом на buff_dml/
+BASELINE = {"table": (1362, 3350), "functional": (1611, 5332)}
+
+_counting = False
+_visits = 0
+_iter_expressions = Expression.iter_expressions
+_parse_statements = base.parse.parse_statements
+
+
+def _counting_iter_expressions(self, *args, **kwargs):
+    global _visits
+    _visits += _counting
+    return _iter_expressions(self, *args, **kwargs)
+
+
+def _uncounted_parse_statements(*args, **kwargs):
+    global _counting
+    _counting = False
+    try:
+        results = iter(_parse_statements(*args, **kwargs))
+    finally:
+        _counting = True
+    while True:
+        _counting = False
+        try:
+            result = next(results, None)
+        finally:
+            _counting = True
+        if result is None:
+            return
+        yield result
+
+
+def measure(sql_code: str):
+    """Возвращает (узлов в AST, посещений узлов при извлечении зависимостей)."""
+    global _counting, _visits
+    _visits = 0
+    _counting = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        ast = SqlAst(sql_code)
+    _counting = False
+    nodes = sum(1 for expression in ast.parsed or [] for _ in expression.walk())
+    return nodes, _visits
+
+
+def main(directory: str):
+    Expression.iter_expressions = _counting_iter_expressions
+    base.parse.parse_statements = _uncounted_parse_statements
+    base.parse.strip_bulk_data = lambda text, backslash_escapes=False: text
+    baseline = BASELINE if os.path.samefile(directory, DEFAULT_DIRECTORY) else {}
+    totals = {"table": [0, 0], "functional": [0, 0]}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            sql_code = f.read()
+
+        samples = [("table", sql_code)] + [
+            ("functional", proc.code) for proc in Procedure.extract_procedures(sql_code)
+        ]
+        for mode, code in samples:
+            nodes, visits = measure(code)
+            totals[mode][0] += nodes
+            totals[mode][1] += visits
+
+    header = f"{'mode':<12}{'nodes':>10}{'visits':>10}{'visits/node':>13}"
+    if baseline:
+        header += f"{'before':>10}{'change':>10}"
+    print(header)
+    for mode, (nodes, visits) in totals.items():
+        ratio = visits / nodes if nodes else 0.0
+        line = f"{mode:<12}{nodes:>10}{visits:>10}{ratio:>13.2f}"
+        if mode in baseline:
+            before_nodes, before = baseline[mode]
+            # Another number of nodes means the trees differ from the baseline's
+            change = f"{visits / before - 1:+.0%}" if nodes == before_nodes else "n/a"
+            line += f"{before:>10}{change:>10}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DIRECTORY)
@@ -0,0 +1,251 @@
+from array import array
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional
+
+from base.storage import GraphStorage
+from logger_config import logger
+
+# Битовые флаги ребра в массиве _flags
+_INTERNAL_UPDATE = 1
+_RECURSIVE = 2
+
+
+class ColumnarGraphStorage(GraphStorage):
+    """Компактное хранилище графа для больших репозиториев (режим таблиц).
+
+    Имена узлов хранятся один раз в таблице строк, а ребра - в параллельных
+    типизированных массивах: номер источника, номер цели, код операции и флаги.
+    Словари метаданных ребер не хранятся и строятся только при обращении
+    к edges или get_filtered_nodes_edges(), поэтому на ребро приходится
+    около 14 байт вместо кортежа и словаря.
+
+    Интерфейс совпадает с GraphStorage: nodes и edges возвращают множество
+    и список (source, target, data) и строятся при каждом обращении.
+
+    Attributes:
+        operator_filter (set): Фильтр типов операторов для отображения.
+        ignore_io (bool): Пропускать узлы "unknown N".
+
+    Example:
+        >>> storage = ColumnarGraphStorage()
+        >>> storage.add_dependencies(dependencies, source_file="etl/load.sql")
+        >>> nodes, edges = storage.get_filtered_nodes_edges()
+    """
+
+    def __init__(self, ignore_io=False):
+        """Инициализирует хранилище с пустыми данными."""
+        self.operator_filter = None
+        self.ignore_io = ignore_io
+        self._init_arrays()
+        logger.debug("ColumnarGraphStorage initialized")
+
+    def _init_arrays(self):
+        self._names: List[Hashable] = []  # номер узла -> имя
+        self._ids: Dict[Hashable, int] = {}  # имя узла -> номер
+        # номер узла -> число концов ребер и отдельных добавлений этого узла
+        self._refs = array("l")
+        self._op_types: List[type] = []  # код операции -> тип
+        self._op_codes: Dict[type, int] = {}
+        self._files: Dict[Optional[str], int] = {}  # файл -> номер
+        # Цели без принятых ребер (узел без ребер) и их файлы
+        self._lone_nodes = array("I")
+        self._lone_files = array("I")
+        self._sources = array("I")
+        self._targets = array("I")
+        self._ops = array("B")
+        self._flags = array("B")
+        self._edge_files = array("I")
+
+    @property
+    def nodes(self) -> set:
+        """Множество узлов графа (строится при обращении)."""
+        refs = self._refs
+        return {name for i, name in enumerate(self._names) if refs[i] > 0}
+
+    @property
+    def edges(self) -> list:
+        """Рёбра в формате GraphStorage: [(источник, цель, метаданные), ...]."""
+        return list(self._iter_edges())
+
+    def add_dependencies(
+        self, dependencies: defaultdict, source_file: Optional[str] = None
+    ):
+        """Добавляет зависимости в хранилище (см. GraphStorage.add_dependencies)."""
+        file_id = self._files.setdefault(source_file, len(self._files))
+        for to_table, edges in dependencies.items():
+            if self.ignore_io and "unknown" in str(to_table):
+                continue
+            target = self._node_id(to_table)
+            added = len(self._sources)
+            for edge in edges:
+                if self.ignore_io and "unknown" in str(edge.source):
+                    continue
+                if (
+                    self.operator_filter is not None
+                    and edge.op_type not in self.operator_filter
+                ):
+                    logger.debug(f"Skipping edge {edge} due to operator filter")
+                    continue
+                source = self._node_id(edge.source)
+                self._refs[source] += 1
+                self._refs[target] += 1
+                self._sources.append(source)
+                self._targets.append(target)
+                self._ops.append(self._op_code(edge.op_type))
+                self._flags.append(
+                    _INTERNAL_UPDATE * edge.is_internal_update
+                    + _RECURSIVE * edge.is_recursive
+                )
+                self._edge_files.append(file_id)
+            if len(self._sources) == added:
+                self._refs[target] += 1
+                self._lone_nodes.append(target)
+                self._lone_files.append(file_id)
+        logger.info(f"Added {len(dependencies)} dependencies")
+
+    def remove_files(self, source_files):
+        """Удаляет из графа узлы и рёбра, добавленные из указанных файлов.
+
+        Args:
+            source_files (Iterable[str]): Файлы, переданные ранее в add_dependencies().
+        """
+        file_ids = {self._files[f] for f in source_files if f in self._files}
+        if not file_ids:
+            return
+        refs = self._refs
+        keep = []
+        for i, (source, target, file_id) in enumerate(
+            zip(self._sources, self._targets, self._edge_files)
+        ):
+            if file_id in file_ids:
+                refs[source] -= 1
+                refs[target] -= 1
+            else:
+                keep.append(i)
+        removed = len(self._sources) - len(keep)
+        if removed:
+            for name in ("_sources", "_targets", "_ops", "_flags", "_edge_files"):
+                self._compact(name, keep)
+
+        keep = []
+        for i, (node, file_id) in enumerate(zip(self._lone_nodes, self._lone_files)):
+            if file_id in file_ids:
+                refs[node] -= 1
+            else:
+                keep.append(i)
+        if len(keep) < len(self._lone_nodes):
+            self._compact("_lone_nodes", keep)
+            self._compact("_lone_files", keep)
+        self._compact_names()
+        logger.debug(f"Removed {removed} edges from {source_files}")
+
+    def _compact(self, name: str, keep: List[int]):
+        old = getattr(self, name)
+        setattr(self, name, array(old.typecode, (old[i] for i in keep)))
+
+    def _compact_names(self):
+        """Убирает из таблицы строк узлы, на которые не ссылается ни одно ребро.
+
+        При изменении файлов (--incremental, --watch, --serve) узлы удаленных
+        ребер, например синтетические "result etl/load.sql:3", больше не
+        появляются, поэтому таблица перестраивается, как только мертвых имен
+        становится не меньше половины: память и стоимость nodes ограничены
+        размером графа, а перестроение в среднем стоит O(1) на удаленное имя.
+        """
+        refs = self._refs
+        live = [i for i, count in enumerate(refs) if count > 0]
+        if 2 * len(live) > len(self._names):
+            return
+        remap = array("I", [0]) * len(self._names)
+        for new, old in enumerate(live):
+            remap[old] = new
+        self._names = [self._names[i] for i in live]
+        self._ids = {name: i for i, name in enumerate(self._names)}
+        self._refs = array("l", (refs[i] for i in live))
+        for name in ("_sources", "_targets", "_lone_nodes"):
+            old = getattr(self, name)
+            setattr(self, name, array(old.typecode, (remap[i] for i in old)))
+
+    def iter_file_edges(self):
+        """Перебирает рёбра вместе с файлами (см. GraphStorage.iter_file_edges)."""
+        files = {file_id: source_file for source_file, file_id in self._files.items()}
+        templates = self._templates()
+        names = self._names
+        for source, target, op, flags, file_id in zip(
+            self._sources, self._targets, self._ops, self._flags, self._edge_files
+        ):
+            yield (
+                files[file_id],
+                names[source],
+                names[target],
+                dict(templates[op, flags]),
+            )
+
+    def clear(self):
+        """Очищает все данные хранилища."""
+        self._init_arrays()
+        logger.debug("ColumnarGraphStorage cleared")
+
+    def get_filtered_nodes_edges(self):
+        """Возвращает отфильтрованные узлы и рёбра (см. GraphStorage).
+
+        Returns:
+            Tuple[set, list]: (узлы, рёбра) после применения фильтра.
+        """
+        if not self.operator_filter:
+            return self.nodes, self.edges
+
+        filtered_edges = list(self.iter_filtered_edges())
+        visible_nodes = set()
+        for source, target, _ in filtered_edges:
+            visible_nodes.add(source)
+            visible_nodes.add(target)
+        return visible_nodes, filtered_edges
+
+    def iter_filtered_edges(self):
+        """Перебирает рёбра get_filtered_nodes_edges() (см. GraphStorage)."""
+        if not self.operator_filter:
+            return self._iter_edges()
+        names = {op_class.__name__ for op_class in self.operator_filter}
+        visible = {
+            key
+            for key, data in self._templates().items()
+            if data.get("operation", "") in names
+        }
+        return self._iter_edges(visible)
+
+    def _node_id(self, node: Hashable) -> int:
+        node_id = self._ids.get(node)
+        if node_id is None:
+            node_id = self._ids[node] = len(self._names)
+            self._names.append(node)
+            self._refs.append(0)
+        return node_id
+
+    def _op_code(self, op_type: type) -> int:
+        code = self._op_codes.get(op_type)
+        if code is None:
+            code = self._op_codes[op_type] = len(self._op_types)
+            self._op_types.append(op_type)
+        return code
+
+    def _templates(self) -> Dict[tuple, dict]:
+        """Метаданные для каждой встречающейся пары (код операции, флаги)."""
+        return {
+            (op, flags): self._edge_data(
+                self._op_types[op],
+                bool(flags & _INTERNAL_UPDATE),
+                bool(flags & _RECURSIVE),
+            )
+            for op, flags in set(zip(self._ops, self._flags))
+        }
+
+    def _iter_edges(self, keys=None):
+        templates = self._templates()
+        names = self._names
+        for source, target, op, flags in zip(
+            self._sources, self._targets, self._ops, self._flags
+        ):
+            key = (op, flags)
+            if keys is None or key in keys:
+                yield names[source], names[target], dict(templates[key])
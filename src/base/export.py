@@ -0,0 +1,177 @@
+import csv
+import json
+import os
+from typing import Iterable, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+EXPORT_FORMATS = ("jsonl", "graphml", "dot", "csv")
+# Расширение файла -> формат (см. export_format)
+FORMAT_EXTENSIONS = {
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".graphml": "graphml",
+    ".dot": "dot",
+    ".gv": "dot",
+    ".csv": "csv",
+}
+# Метаданные рёбер в порядке вывода (см. GraphStorage._edge_data, ColumnStorage)
+EDGE_ATTRIBUTES = ("operation", "color", "style", "columns")
+BUFFER_SIZE = 1024 * 1024  # bytes of the output buffer
+
+
+def export_format(path: str, output_format: Optional[str] = None) -> str:
+    """Определяет формат выгрузки: явно заданный или по расширению path.
+
+    Returns:
+        str: Один из EXPORT_FORMATS. Неизвестное расширение - "jsonl".
+
+    Raises:
+        ValueError: Если output_format не входит в EXPORT_FORMATS.
+    """
+    if output_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        return FORMAT_EXTENSIONS.get(extension, "jsonl")
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}")
+    return output_format
+
+
+def _attribute(value) -> str:
+    """Значение метаданных ребра для текстовых форматов (колонки - в JSON)."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _write_jsonl(f: TextIO, nodes: Iterable[str], edges) -> int:
+    for node in nodes:
+        f.write(json.dumps({"type": "node", "id": node}, ensure_ascii=False))
+        f.write("\n")
+    count = 0
+    for source, target, data in edges:
+        record = {"type": "edge", "source": str(source), "target": str(target)}
+        record.update(
+            (name, data[name]) for name in EDGE_ATTRIBUTES if data.get(name) is not None
+        )
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def _write_csv(f: TextIO, nodes: Iterable[str], edges) -> int:
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(("type", "source", "target") + EDGE_ATTRIBUTES)
+    empty = ("",) * (1 + len(EDGE_ATTRIBUTES))
+    for node in nodes:
+        writer.writerow(("node", node) + empty)
+    count = 0
+    for source, target, data in edges:
+        writer.writerow(
+            ("edge", str(source), str(target))
+            + tuple(
+                _attribute(data[name]) if data.get(name) is not None else ""
+                for name in EDGE_ATTRIBUTES
+            )
+        )
+        count += 1
+    return count
+
+
+def _dot_quote(value: str) -> str:
+    value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{value}"'
+
+
+def _write_dot(f: TextIO, nodes: Iterable[str], edges) -> int:
+    f.write("digraph dependencies {\n")
+    for node in nodes:
+        f.write(f"  {_dot_quote(node)};\n")
+    count = 0
+    for source, target, data in edges:
+        attributes = [
+            f"{'label' if name == 'operation' else name}="
+            f"{_dot_quote(_attribute(data[name]))}"
+            for name in EDGE_ATTRIBUTES
+            if data.get(name) is not None
+        ]
+        f.write(
+            f"  {_dot_quote(str(source))} -> {_dot_quote(str(target))}"
+            f" [{', '.join(attributes)}];\n"
+        )
+        count += 1
+    f.write("}\n")
+    return count
+
+
+def _write_graphml(f: TextIO, nodes: Iterable[str], edges) -> int:
+    f.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    )
+    for name in EDGE_ATTRIBUTES:
+        f.write(
+            f'  <key id="{name}" for="edge" attr.name="{name}" attr.type="string"/>\n'
+        )
+    f.write('  <graph id="dependencies" edgedefault="directed">\n')
+    for node in nodes:
+        f.write(f"    <node id={quoteattr(node)}/>\n")
+    count = 0
+    for source, target, data in edges:
+        f.write(
+            f"    <edge source={quoteattr(str(source))} target={quoteattr(str(target))}>"
+        )
+        for name in EDGE_ATTRIBUTES:
+            if data.get(name) is not None:
+                f.write(f'<data key="{name}">{escape(_attribute(data[name]))}</data>')
+        f.write("</edge>\n")
+        count += 1
+    f.write("  </graph>\n</graphml>\n")
+    return count
+
+
+_WRITERS = {
+    "jsonl": _write_jsonl,
+    "graphml": _write_graphml,
+    "dot": _write_dot,
+    "csv": _write_csv,
+}
+
+
+def export_graph(
+    storage, path: str, output_format: Optional[str] = None
+) -> Tuple[int, int]:
+    """Записывает граф хранилища в файл, не строя граф networkx.
+
+    Узлы и рёбра те же, что у визуализации (см. get_filtered_nodes_edges()),
+    вместе с операцией, цветом, стилем линии и колонками ребра. Рёбра
+    передаются в файл по одному прямо из хранилища (iter_filtered_edges()),
+    а запись идет через буфер BUFFER_SIZE, поэтому память не зависит от
+    числа рёбер. Узлы выводятся по алфавиту, чтобы выгрузка одного и того же
+    графа не менялась между запусками.
+
+    Форматы:
+        jsonl - строки {"type": "node", "id"} и {"type": "edge", "source",
+            "target", "operation", "color", ["style"], ["columns"]};
+        graphml - GraphML с атрибутами рёбер operation, color, style, columns;
+        dot - Graphviz digraph (операция - подпись ребра);
+        csv - таблица type,source,target,operation,color,style,columns.
+
+    Args:
+        storage (GraphStorage): Хранилище графа.
+        path (str): Путь к выходному файлу.
+        output_format (str, optional): Один из EXPORT_FORMATS.
+            По умолчанию определяется по расширению path (см. export_format).
+
+    Returns:
+        Tuple[int, int]: (число узлов, число рёбер).
+
+    Example:
+        >>> export_graph(manager.storage, "lineage.graphml")
+        (57, 81)
+    """
+    writer = _WRITERS[export_format(path, output_format)]
+    nodes = sorted(str(node) for node in storage.get_filtered_nodes())
+    with open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as f:
+        edges = writer(f, nodes, storage.iter_filtered_edges())
+    return len(nodes), edges
@@ -1,11 +1,20 @@
-from typing import Optional, Tuple, List
-from base.parse import DirectoryParser
+import asyncio
+import os
+import pickle
+import time
+from typing import Callable, Optional, Tuple, List
+from base.parse import DirectoryParser, WorkerPool
+from base.columnar import ColumnarGraphStorage
+from base.export import export_graph
 from base.storage import GraphStorage
-from base.visualize import GraphVisualizer
 from field.storage import ColumnStorage
-from field.visualize import ColumnVisualizer
 from base.parse import SqlAst
 from logger_config import logger
+from util import metrics
+from util.cycles import MAX_EXAMPLE_CYCLES, CycleReport
+from util.manifest import FileManifest
+from util.prefilter import StatementFilter
+from util.watch import WATCH_INTERVAL, FileWatcher
 
 
 class GraphManager:
@@ -15,33 +24,106 @@ class GraphManager:
         - Режим таблиц (по умолчанию): использует GraphStorage и GraphVisualizer.
         - Режим колонок (column_mode=True): использует ColumnStorage и ColumnVisualizer.
 
+    Для больших графов режима таблиц можно использовать ColumnarGraphStorage
+    (columnar=True).
+
     Attributes:
-        storage (Union[GraphStorage, ColumnStorage]): Хранилище зависимостей.
+        storage (Union[GraphStorage, ColumnarGraphStorage, ColumnStorage]): Хранилище зависимостей.
         visualizer (Union[GraphVisualizer, ColumnVisualizer]): Генератор графов.
-        parser (DirectoryParser): Парсер для обработки директорий с SQL-файлами."""
+            Создается при первом обращении, поэтому matplotlib и networkx
+            загружаются, только если граф действительно рисуется.
+        headless (bool): Не рисовать графы: visualize() только пишет в лог.
+        parser (DirectoryParser): Парсер для обработки директорий с SQL-файлами.
+        prefilter (StatementFilter): Отбрасывает до разбора операторы, которые не могут
+            дать ребер с операциями из фильтра хранилища.
+        manifest (Optional[FileManifest]): Снимок файлов последнего разбора директории.
+    """
+
+    STATE_FORMAT_VERSION = 2
+    headless = False
 
-    def __init__(self, column_mode=False, operators=None, ignore_io=False):
+    def __init__(
+        self,
+        column_mode=False,
+        operators=None,
+        ignore_io=False,
+        cache=None,
+        dialect=None,
+        columnar=False,
+        budget=None,
+    ):
         """Инициализирует компоненты на основе выбранного режима.
 
         Args:
             column_mode (bool): Если True, активирует режим работы с колонками. По умолчанию False.
             operators (Optional[List[str]]): Фильтр для операторов (например, ['JOIN', 'WHERE']).
+            cache (Optional[ParseCache]): Кеш результатов разбора файлов. По умолчанию без кеша.
+            dialect (Optional[str]): Диалект SQL. По умолчанию определяется автоматически.
+            columnar (bool): Хранить граф режима таблиц в ColumnarGraphStorage.
+            budget (Optional[TimeBudget]): Бюджет времени разбора файла и оператора.
+                По умолчанию без ограничений.
         """
         self.ignore_io = ignore_io
-        self.storage = (
-            GraphStorage(ignore_io=self.ignore_io)
-            if not column_mode
-            else ColumnStorage(ignore_io=self.ignore_io)
-        )
-        self.visualizer = GraphVisualizer() if not column_mode else ColumnVisualizer()
-        self.parser = DirectoryParser(SqlAst, self.ignore_io)
+        self.dialect = dialect
+        if column_mode:
+            self.storage = ColumnStorage(ignore_io=self.ignore_io)
+        elif columnar:
+            self.storage = ColumnarGraphStorage(ignore_io=self.ignore_io)
+        else:
+            self.storage = GraphStorage(ignore_io=self.ignore_io)
+        self._visualizer = None
+        self.column_mode = column_mode
         if operators:
             self.storage.set_operator_filter(operators)
+        self.prefilter = self._make_prefilter()
+        self.parser = DirectoryParser(
+            SqlAst,
+            self.ignore_io,
+            cache=cache,
+            dialect=self.dialect,
+            column_mode=column_mode,
+            prefilter=self.prefilter,
+            budget=budget,
+        )
+        self.manifest = None
+        self._sql_statements = 0  # операторов, добавленных process_sql
         logger.debug("GraphManager initialized")
 
+    @property
+    def visualizer(self):
+        if self._visualizer is None:
+            # The plotting stack takes most of the startup time: load it on demand
+            if self.column_mode:
+                from field.visualize import ColumnVisualizer
+
+                self._visualizer = ColumnVisualizer()
+            else:
+                from base.visualize import GraphVisualizer
+
+                self._visualizer = GraphVisualizer()
+        return self._visualizer
+
+    @visualizer.setter
+    def visualizer(self, visualizer):
+        self._visualizer = visualizer
+
+    def _make_prefilter(self) -> StatementFilter:
+        """Строит фильтр операторов по фильтру хранилища и флагу ignore_io."""
+        operators = self.storage.operator_filter
+        return StatementFilter(
+            operators=(
+                {op.__name__ for op in operators} if operators is not None else None
+            ),
+            ignore_io=self.ignore_io,
+        )
+
     def process_sql(self, sql_code: str) -> List[str]:
         """Парсит SQL-код, извлекает зависимости и возвращает корректировки.
 
+        Номера операторов в именах синтетических узлов продолжаются от вызова
+        к вызову ("input 1", "input 2", ...), поэтому узлы разных фрагментов
+        кода не совпадают.
+
         Args:
             sql_code (str): SQL-запрос для анализа.
 
@@ -53,49 +135,392 @@ class GraphManager:
             ['WARNING: Missing schema prefix in table "users"']
         """
 
-        ast = SqlAst(sql_code, sep_parse=True, ignore_io=self.ignore_io)
-        self.storage.add_dependencies(ast.get_dependencies())
+        ast = SqlAst(
+            sql_code,
+            ignore_io=self.ignore_io,
+            dialect=self.dialect,
+            column_mode=self.column_mode,
+            prefilter=self.prefilter,
+            budget=self.parser.budget,
+            statement_offset=self._sql_statements,
+        )
+        self._sql_statements += ast.statement_count + ast.skipped_statements
+        with metrics.timer("storage.add"):
+            self.storage.add_dependencies(ast.get_dependencies())
         logger.info(f"Processed SQL code: {len(ast.get_corrections())} corrections")
         return ast.get_corrections()
 
-    def process_directory(self, directory_path: str) -> List[Tuple[str, List[str]]]:
+    def process_directory(
+        self,
+        directory_path: str,
+        jobs: int = 1,
+        incremental: bool = False,
+        pool: Optional[WorkerPool] = None,
+    ) -> List[Tuple[str, List[str]]]:
         """Обрабатывает все SQL-файлы в указанной директории.
 
+        В инкрементальном режиме директория сравнивается со снимком предыдущего
+        разбора (manifest): разбираются только добавленные и измененные файлы,
+        а вклад измененных и удаленных файлов убирается из хранилища.
+        Зависимости каждого файла добавляются в хранилище сразу после его разбора
+        (см. DirectoryParser.iter_directory).
+
         Args:
             directory_path (str): Путь к директории с SQL-файлами.
+            jobs (int): Количество процессов для разбора файлов (см. DirectoryParser.parse_directory).
+            incremental (bool): Обновить граф предыдущего разбора вместо полного перестроения.
+            pool (WorkerPool, optional): Уже запущенный пул процессов для разбора
+                (см. DirectoryParser.iter_files).
 
         Returns:
             List[Tuple[str, List[str]]]:
                 Список кортежей вида (путь_к_файлу, корректировки_для_файла).
+                В инкрементальном режиме - только для разобранных заново файлов.
 
         Example:
             >>> manager.process_directory("/data/sql")
             [("/data/sql/query1.sql", ['WARNING: Ambiguous column "id"'])]
         """
+        if not incremental or self.manifest is None:
+            parse_results = self.parser.iter_directory(
+                directory_path, jobs=jobs, pool=pool
+            )
+            manifest = None
+        else:
+            plan = self._plan_incremental(directory_path)
+            if plan is None:
+                return []
+            file_paths, manifest = plan
+            parse_results = self.parser.iter_files(file_paths, jobs=jobs, pool=pool)
+
+        # Each file is added as soon as it is parsed, so its AST can be freed
         results = []
-        parse_results = self.parser.parse_directory(directory_path)
         for dependencies, corrections, file_path in parse_results:
-            self.storage.add_dependencies(dependencies)
-            results.append((file_path, corrections))
-            logger.debug(f"Processed file: {file_path}")
+            self._store_file(dependencies, corrections, file_path, results)
+        self._finish_directory(results, manifest, incremental)
+        return results
+
+    async def process_directory_async(
+        self,
+        directory_path: str,
+        jobs: int = 1,
+        incremental: bool = False,
+        queue_size: Optional[int] = None,
+    ) -> List[Tuple[str, List[str]]]:
+        """Асинхронный вариант process_directory() на конвейере asyncio.
+
+        Чтение файлов, их разбор в пуле и добавление в хранилище идут
+        одновременно и связаны ограниченными очередями (см.
+        DirectoryParser.aiter_files): пока разбирается один файл, читаются
+        следующие, а память ограничена размером очередей. Результат совпадает
+        с process_directory().
+
+        Args:
+            directory_path (str): Путь к директории с SQL-файлами.
+            jobs (int): Количество процессов для разбора файлов.
+            incremental (bool): Обновить граф предыдущего разбора вместо полного перестроения.
+            queue_size (int, optional): Размер очередей конвейера.
+                По умолчанию DirectoryParser.QUEUE_SIZE.
+
+        Returns:
+            List[Tuple[str, List[str]]]: См. process_directory().
+
+        Example:
+            >>> asyncio.run(manager.process_directory_async("/data/sql", jobs=4))
+            [("/data/sql/query1.sql", [])]
+        """
+        if not incremental or self.manifest is None:
+            parse_results = self.parser.aiter_directory(
+                directory_path, jobs=jobs, queue_size=queue_size
+            )
+            manifest = None
+        else:
+            plan = await asyncio.to_thread(self._plan_incremental, directory_path)
+            if plan is None:
+                return []
+            file_paths, manifest = plan
+            parse_results = self.parser.aiter_files(
+                file_paths, jobs=jobs, queue_size=queue_size
+            )
+
+        results = []
+        async for dependencies, corrections, file_path in parse_results:
+            self._store_file(dependencies, corrections, file_path, results)
+        await asyncio.to_thread(self._finish_directory, results, manifest, incremental)
+        return results
+
+    def _plan_incremental(
+        self, directory_path: str
+    ) -> Optional[Tuple[List[str], FileManifest]]:
+        """Сравнивает директорию со снимком и убирает из хранилища вклад измененных файлов.
+
+        Returns:
+            Optional[Tuple[List[str], FileManifest]]: (файлы для разбора, новый снимок)
+                или None, если директории нет.
+        """
+        if not os.path.isdir(directory_path):
+            print(f"Error: {directory_path} is not a directory!")
+            return None
+        file_paths = self.parser.collect_files(directory_path)
+        manifest = FileManifest.scan(file_paths, previous=self.manifest)
+        added, modified, deleted = manifest.diff(self.manifest)
+        logger.info(
+            f"Incremental update: {len(added)} added, {len(modified)} modified, "
+            f"{len(deleted)} deleted, {len(manifest) - len(added) - len(modified)} unchanged"
+        )
+        self.storage.remove_files(modified + deleted)
+        return sorted(added + modified), manifest
+
+    def _store_file(self, dependencies, corrections, file_path: str, results: list):
+        """Добавляет зависимости разобранного файла в хранилище."""
+        with metrics.timer("storage.add"):
+            self.storage.add_dependencies(
+                dependencies, source_file=FileManifest.key(file_path)
+            )
+        results.append((file_path, corrections))
+        logger.debug(f"Processed file: {file_path}")
+
+    def _finish_directory(
+        self, results: list, manifest: Optional[FileManifest], incremental: bool
+    ):
+        """Запоминает снимок файлов после разбора директории."""
+        if manifest is not None:
+            self.manifest = manifest
+        elif incremental:
+            self.manifest = FileManifest.scan(file_path for file_path, _ in results)
+        else:
+            self.manifest = None
         logger.info(f"Processed directory: {len(results)} files")
+
+    def update_files(
+        self,
+        file_paths: List[str],
+        jobs: int = 1,
+        pool: Optional[WorkerPool] = None,
+    ) -> Optional[List[Tuple[str, List[str]]]]:
+        """Обновляет граф по файлам, которые могли измениться.
+
+        Снимок (manifest) сравнивается только для переданных файлов: удаленные
+        и измененные файлы убираются из хранилища, добавленные и измененные
+        разбираются заново. Остальная часть графа не трогается.
+
+        Args:
+            file_paths (List[str]): Пути добавленных, измененных или удаленных файлов.
+            jobs (int): Количество процессов для разбора файлов.
+            pool (WorkerPool, optional): Уже запущенный пул (см. process_directory).
+
+        Returns:
+            Optional[List[Tuple[str, List[str]]]]: (путь_к_файлу, корректировки)
+                для разобранных заново файлов или None, если содержимое файлов
+                не изменилось.
+
+        Example:
+            >>> manager.process_directory("/data/sql", incremental=True)
+            >>> manager.update_files(["/data/sql/query1.sql"])
+            [("/data/sql/query1.sql", [])]
+        """
+        if self.manifest is None:
+            self.manifest = FileManifest()
+        keys = sorted({FileManifest.key(file_path) for file_path in file_paths})
+        previous = FileManifest(
+            {
+                key: self.manifest.entries[key]
+                for key in keys
+                if key in self.manifest.entries
+            }
+        )
+        current = FileManifest.scan(keys, previous=previous)
+        added, modified, deleted = current.diff(previous)
+        if not (added or modified or deleted):
+            return None
+        logger.info(
+            f"Update: {len(added)} added, {len(modified)} modified, {len(deleted)} deleted"
+        )
+        self.storage.remove_files(modified + deleted)
+        results = []
+        for dependencies, corrections, file_path in self.parser.iter_files(
+            sorted(added + modified), jobs=jobs, pool=pool
+        ):
+            self._store_file(dependencies, corrections, file_path, results)
+        for key in deleted:
+            del self.manifest.entries[key]
+        self.manifest.entries.update(current.entries)
         return results
 
+    def watch(
+        self,
+        directory_path: str,
+        jobs: int = 1,
+        interval: float = WATCH_INTERVAL,
+        on_update: Optional[Callable[[List[Tuple[str, List[str]]]], None]] = None,
+        on_idle: Optional[Callable[[], None]] = None,
+        stop=None,
+        use_inotify: bool = True,
+        pool: Optional[WorkerPool] = None,
+    ):
+        """Разбирает директорию и держит граф актуальным при изменении файлов.
+
+        После первого (инкрементального, см. process_directory) разбора
+        директория отслеживается FileWatcher: при сохранении файла заново
+        разбираются только затронутые файлы (см. update_files), а граф
+        в хранилище обновляется на месте.
+
+        Args:
+            directory_path (str): Путь к директории с SQL-файлами.
+            jobs (int): Количество процессов для разбора файлов.
+            interval (float): Наибольшее время ожидания изменений за один шаг
+                цикла в секундах (период опроса, если inotify недоступен).
+            on_update (Callable, optional): Вызывается с результатами первого
+                разбора и каждого обновления графа.
+            on_idle (Callable, optional): Вызывается на каждом шаге цикла
+                (например, для обработки событий окна графа).
+            stop (threading.Event, optional): Завершает наблюдение, когда
+                установлен. По умолчанию наблюдение продолжается до прерывания.
+            use_inotify (bool): Использовать inotify, если он доступен.
+            pool (WorkerPool, optional): Уже запущенный пул (см. process_directory).
+
+        Example:
+            >>> manager.watch("/data/sql", on_update=lambda results: manager.visualize(live=True))
+        """
+        # The watcher snapshots the directory before the first parse, so edits
+        # made while it runs are picked up by the first wait
+        with FileWatcher(
+            directory_path, self.parser.FILE_EXTENSIONS, use_inotify=use_inotify
+        ) as watcher:
+            logger.info(f"Watching {directory_path} ({watcher.backend})")
+            results = self.process_directory(
+                directory_path, jobs=jobs, incremental=True, pool=pool
+            )
+            if on_update is not None:
+                on_update(results)
+            while stop is None or not stop.is_set():
+                changed = watcher.wait(interval)
+                if changed:
+                    started = time.perf_counter()
+                    results = self.update_files(changed, jobs=jobs, pool=pool)
+                    if results is not None:
+                        logger.info(
+                            f"Graph updated in {time.perf_counter() - started:.3f}s"
+                        )
+                        if on_update is not None:
+                            on_update(results)
+                if on_idle is not None:
+                    on_idle()
+
+    def save_state(self, path: str):
+        """Сохраняет граф и снимок файлов для следующего инкрементального запуска.
+
+        Args:
+            path (str): Путь к файлу состояния.
+        """
+        state = {
+            "version": self.STATE_FORMAT_VERSION,
+            "manifest": self.manifest.entries if self.manifest else None,
+            "storage": self.storage,
+        }
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.info(f"Saved graph state to {path}")
+
+    def load_state(self, path: str) -> bool:
+        """Загружает граф и снимок файлов, сохраненные save_state().
+
+        Args:
+            path (str): Путь к файлу состояния.
+
+        Returns:
+            bool: True, если состояние загружено. Отсутствующий, поврежденный
+                или несовместимый файл игнорируется.
+        """
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != self.STATE_FORMAT_VERSION:
+                raise ValueError(f"unsupported state version {state.get('version')}")
+            if type(state["storage"]) is not type(self.storage):
+                raise ValueError("state was saved in another mode")
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Ignoring graph state {path}: {e}")
+            return False
+        operator_filter = self.storage.operator_filter
+        self.storage = state["storage"]
+        self.storage.operator_filter = operator_filter
+        self.manifest = FileManifest(state["manifest"]) if state["manifest"] else None
+        logger.info(f"Loaded graph state from {path}")
+        return True
+
+    def report_cycles(self, max_cycles: int = MAX_EXAMPLE_CYCLES) -> CycleReport:
+        """Находит циклы во всем графе хранилища (с учетом фильтров хранилища).
+
+        Args:
+            max_cycles (int): Наибольшее количество примеров циклов на компоненту.
+
+        Returns:
+            CycleReport: Сильно связные компоненты с циклами и примеры циклов.
+
+        Example:
+            >>> print(manager.report_cycles().format())
+            Found 1 strongly connected components with cycles
+            1. 2 nodes: stg_orders, stg_payments
+               cycle: stg_orders -> stg_payments -> stg_orders
+        """
+        _, edges = self.storage.get_filtered_nodes_edges()
+        return CycleReport.from_edges(
+            ((source, target) for source, target, _ in edges), max_cycles
+        )
+
+    def export(
+        self,
+        path: str,
+        output_format: Optional[str] = None,
+        storage: Optional[GraphStorage] = None,
+    ):
+        """Выгружает граф в файл без визуализации (см. base.export.export_graph).
+
+        Args:
+            path (str): Путь к выходному файлу.
+            output_format (str, optional): jsonl, graphml, dot или csv.
+                По умолчанию определяется по расширению path.
+            storage (GraphStorage, optional): Хранилище. По умолчанию self.storage.
+
+        Example:
+            >>> manager.export("lineage.graphml")
+        """
+        if storage is None:
+            storage = self.storage
+        try:
+            with metrics.timer("export"):
+                nodes, edges = export_graph(storage, path, output_format)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error exporting graph to {path}: {e}")
+        else:
+            logger.info(f"Exported {nodes} nodes and {edges} edges to {path}")
+
     def visualize(
-        self, title: Optional[str] = None, storage: Optional[GraphStorage] = None
+        self,
+        title: Optional[str] = None,
+        storage: Optional[GraphStorage] = None,
+        live: bool = False,
     ):
         """Генерирует графическое представление зависимостей.
 
         Args:
             title (Optional[str]): Заголовок графа. Если не указан, используется значение по умолчанию.
+            live (bool): Перерисовать открытое окно графа без блокировки
+                (режим --watch, см. GraphVisualizer.render).
 
         Example:
             >>> manager.visualize(title="Data Pipeline")
         """
+        if self.headless:
+            logger.info(f"Headless run: skipping rendering of {title!r}")
+            return
         if storage is None:
             storage = self.storage
         try:
-            self.visualizer.render(storage, title)
+            self.visualizer.render(storage, title, live=live)
         except Exception as e:
             logger.error(
                 f"Error visualizing graph: {e}\nYou may need to run this in an environment that supports matplotlib display."
@@ -1,7 +1,19 @@
 from functools import total_ordering
+import asyncio
+import multiprocessing
 import os
-from collections import defaultdict
-from typing import Optional, List, Tuple, Dict, Set
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Optional, Iterator, List, Tuple, Dict, Set
 from sqlglot.expressions import (
     Update,
     Insert,
@@ -9,21 +21,31 @@ from sqlglot.expressions import (
     Delete,
     Merge,
     Select,
-    Join,
     Values,
     Create,
     Drop,
     Alter,
     With,
     CTE,
-    Subquery,
     Expression,
 )
-from util.dialect import safe_parse
+from util import metrics
+from util.budget import TIMEOUT_PREFIX, BudgetExceeded, TimeBudget
+from util.cache import file_hash
+from util.cycles import MAX_EXAMPLE_CYCLES, CycleReport
+from util.dialect import DialectDetector, parse_statements, uses_backslash_escapes
+from util.manifest import FileManifest
+from util.statements import read_statements, split_statements, strip_bulk_data
 from base.storage import Edge
+from field.columns import edge_columns
+from base.visitor import DependencyVisitor
 from logger_config import logger
 
 
+# Budget of SqlAst created without one: no limits
+_NO_BUDGET = TimeBudget()
+
+
 class SqlAst:
     """Парсит SQL-код, строит AST и извлекает зависимости между таблицами/CTE.
 
@@ -32,29 +54,54 @@ class SqlAst:
         dependencies (defaultdict): Граф зависимостей вида {target: {Edge(source, target, node)}}.
         table_schema (Dict[str, Dict]): Схемы таблиц из CREATE-запросов (например, {"users": {"id": "INT"}}).
         recursive_ctes (Set[str]): Множество рекурсивных CTE (например, {"cte1"}).
+        statement_positions (List[Tuple[int, int]]): (номер оператора, строка) для каждого узла parsed.
 
     Example:
         >>> ast = SqlAst("SELECT * FROM users")
         >>> ast.get_dependencies()
-        defaultdict(<class 'set'>, {'result_0': {Edge('users', 'result_0', ...)}})
+        defaultdict(<class 'set'>, {'result 1': {Edge('users', 'result 1', ...)}})
     """
 
-    _input_id = 0
-    _output_id = 0
-    _unknown_id = 0
-    _join_id = 0
-    _transfer_id = 0
-    _cte_id = 0  # Counter for CTE nodes
-
-    def __init__(self, sql_code: str, sep_parse: bool = False, ignore_io=False):
+    def __init__(
+        self,
+        sql_code: str,
+        *,
+        ignore_io=False,
+        dialect=None,
+        source_path=None,
+        statements=None,
+        column_mode=False,
+        prefilter=None,
+        budget=None,
+        statement_offset=0,
+        detector=None,
+    ):
         """Инициализирует парсер SQL и запускает анализ кода.
 
         Args:
-            sql_code (str): SQL-код для анализа.
-            sep_parse (bool): Если True, использует отдельные счетчики для каждого экземпляра.
+            sql_code (str): SQL-код для анализа. Если переданы statements - только
+                начало кода, по которому определяется диалект.
+            dialect (str, optional): Диалект разбора. None - автоопределение.
+            source_path (str, optional): Путь к файлу с кодом (для определения диалекта
+                и имен синтетических узлов).
+            statements (Iterable[Tuple[int, str]], optional): Готовые операторы
+                (строка, текст), например из read_statements(). Каждый оператор
+                анализируется сразу после разбора, а его AST не сохраняется в parsed,
+                поэтому код может быть больше доступной памяти.
+            column_mode (bool): Сохранять в ребрах колонки операций (для ColumnStorage).
+            prefilter (StatementFilter, optional): Отбрасывает до разбора операторы,
+                которые не могут дать нужных ребер. None - разбираются все операторы.
+            budget (TimeBudget, optional): Бюджет времени разбора оператора.
+                Оператор, превысивший его, прерывается и попадает в корректировки.
+            statement_offset (int): Сдвиг номеров операторов в именах синтетических
+                узлов кода без source_path, чтобы фрагменты кода, добавленные
+                в одно хранилище, не делили узлы (см. GraphManager.process_sql).
+            detector (DialectDetector, optional): Детектор диалектов парсера
+                (см. DirectoryParser.detector). None - новый детектор.
 
         Raises:
             Exception: Если возникает ошибка при парсинге SQL.
+            BudgetExceeded: Если исчерпан бюджет файла (см. TimeBudget.file()).
         """
         if not sql_code or not isinstance(sql_code, str):
             self.corrected_sql = ""
@@ -62,18 +109,27 @@ class SqlAst:
             self.sql_code = ""
             self.parsed = None
             self.dependencies = defaultdict(set)
+            self.statement_count = 0
+            self.skipped_statements = 0
             return
         self.corrections = []
         self.sql_code = sql_code
         self.corrected_sql = self.sql_code
         self.dependencies = defaultdict(set)
-        self.input_id = SqlAst._input_id
-        self.output_id = SqlAst._output_id
-        self.unknown_id = SqlAst._unknown_id
-        self.cte_id = SqlAst._cte_id
-        self.sep_parse = sep_parse
+        self.source_path = source_path
         self.ignore_io = ignore_io
+        self.column_mode = column_mode
+        self.prefilter = prefilter
+        self.budget = budget if budget is not None else _NO_BUDGET
+        self._op_columns = {}  # id(op) -> колонки, в пределах одного оператора
+        self._statement_index = 0  # номер анализируемого оператора
+        self.statement_offset = statement_offset
+        self.detector = detector
+        self._synthetic_counts = Counter()  # роль -> выданные в операторе имена
         self._statement_count = 0
+        self.statement_count = 0  # количество разобранных операторов
+        self.skipped_statements = 0  # количество отброшенных prefilter операторов
+        self.statement_positions = []
         self.table_schema = {}  # Store table schema information
 
         # Track CTE definitions and references for recursion detection
@@ -83,16 +139,12 @@ class SqlAst:
         self.recursive_ctes = set()  # Set of recursive CTE names
 
         try:
-            self.parsed, self.dialect = safe_parse(self.corrected_sql)
-            assert self.parsed is not None
-            # Extract schema information first (when available)
-            self._extract_schema_info()
-            # First pass to identify all CTEs
-            self._identify_all_ctes()
-            # Then extract dependencies
-            self.dependencies = self._extract_dependencies()
+            self._analyze(statements, dialect, source_path)
+            if self.parsed is None:
+                return
             # Check for recursive CTEs
-            self._detect_recursive_ctes()
+            with metrics.timer("recursive_ctes"):
+                self._detect_recursive_ctes()
             logger.info("SQL parsing and dependency extraction completed.")
 
         except Exception as e:
@@ -101,61 +153,209 @@ class SqlAst:
             self.dependencies = defaultdict(set)
             self.corrections.append(f"Error parsing SQL: {str(e)}")
 
-    def _extract_schema_info(self):
-        """Извлекает схемы таблиц из CREATE-запросов.
+    def _analyze(self, statements=None, dialect=None, source_path=None):
+        """Разбирает операторы по одному и сразу извлекает из каждого зависимости.
+
+        Данные INSERT ... VALUES и COPY ... FROM stdin не разбираются
+        (см. strip_bulk_data): такой оператор дает то же ребро "input N -> таблица".
+        Операторы, отброшенные prefilter, не разбираются и ошибок не дают.
+        Ошибка разбора или анализа одного оператора добавляется в корректировки
+        с его номером и строкой и не мешает остальным, как и превышение бюджета
+        времени оператора (см. TimeBudget). Если не разобрался ни один оператор,
+        `parsed` становится None.
+
+        Args:
+            statements (Iterable[Tuple[int, str]], optional): (строка, текст) операторов.
+                None - операторы получаются из corrected_sql через split_statements().
+            dialect (str, optional): Принудительный диалект.
+            source_path (str, optional): Путь к файлу с кодом.
+        """
+        keep_ast = statements is None
+        sample = self.corrected_sql
+        escapes = uses_backslash_escapes(dialect, sample)
+        # Bulk data payloads are not parsed, only their target and columns
+        if statements is None:
+            statements = [
+                (line, strip_bulk_data(text, escapes))
+                for line, text in split_statements(self.corrected_sql, escapes)
+            ]
+            # Dialect markers are searched in the statements, not in the data
+            sample = "\n".join(text for _, text in statements)
+        else:
+            statements = (
+                (line, strip_bulk_data(text, escapes)) for line, text in statements
+            )
+        # Numbers are assigned before filtering: they are part of synthetic names
+        statements = (
+            (index, line, text) for index, (line, text) in enumerate(statements, 1)
+        )
+        if self.prefilter is not None and self.prefilter.active:
+            statements = self._prefiltered(statements)
+        self.parsed = []
+        self.statement_positions = []  # (номер оператора, строка) для parsed
+        visitor = DependencyVisitor(self, self.dependencies)
+        used = Counter()
+        # Statements are read outside the time budget and handed to the parser
+        # one by one: a timeout inside the parser must not break the reading
+        pending = deque()
+        results = None
+        for index, line, text in statements:
+            self.statement_count += 1
+            metrics.count("statements")
+            self._statement_index = index
+            self._synthetic_counts.clear()
+            pending.append(text)
+            if results is None:
+                results = parse_statements(
+                    sample,
+                    _drain(pending),
+                    dialect=dialect,
+                    source_path=source_path,
+                    detector=self.detector,
+                )
+            try:
+                with self.budget.statement():
+                    expressions, statement_dialect, error = next(results)
+                    if expressions is None:
+                        message = str(error).strip().splitlines()[0] if error else ""
+                        metrics.count("statements.errors")
+                        print(
+                            f"Error parsing SQL in statement {index} (line {line}): "
+                            f"{message}"
+                        )
+                        self.corrections.append(
+                            f"Error parsing SQL: statement {index} (line {line}): "
+                            f"{message}"
+                        )
+                        continue
+                    used[statement_dialect] += 1
+                    for expression in expressions:
+                        if expression is None:
+                            continue
+                        if keep_ast:
+                            self.parsed.append(expression)
+                            self.statement_positions.append((index, line))
+                        self._analyze_statement(expression, index, line, visitor)
+            except BudgetExceeded as e:
+                if e.scope != "statement":
+                    raise
+                message = (
+                    f"statement {index} (line {line}) exceeded {e.limit:g}s "
+                    f"time budget after {e.elapsed:.1f}s"
+                )
+                print(f"Timeout in {message}")
+                metrics.count("timeouts.statement")
+                self.corrections.append(f"{TIMEOUT_PREFIX} {message}")
+                if results.gi_frame is None:
+                    # Interrupted inside the parser: start a new one
+                    pending.clear()
+                    results = None
+        if results is not None:
+            # Let the parser finish and remember the dialect
+            pending.append(None)
+            for _ in results:
+                pass
+
+        if used:
+            self.dialect = used.most_common(1)[0][0]
+        else:
+            self.dialect = "Unknown"
+            if self.statement_count:
+                self.parsed = None
+
+    def _prefiltered(self, statements):
+        """Пропускает операторы, которые не могут дать ребер (см. StatementFilter)."""
+        for statement in statements:
+            if self.prefilter.accepts(statement[2]):
+                yield statement
+            else:
+                self.skipped_statements += 1
+                metrics.count("statements.skipped")
+
+    def _analyze_statement(self, statement, index: int, line: int, visitor):
+        """Извлекает схему, CTE и зависимости одного оператора.
+
+        Args:
+            statement (Expression): Корневой узел оператора.
+            index (int): Номер оператора в коде.
+            line (int): Строка начала оператора.
+            visitor (DependencyVisitor): Обходчик, заполняющий dependencies.
+        """
+        self._op_columns.clear()
+        try:
+            # Extract schema information first (when available)
+            with metrics.timer("schema"):
+                self._extract_schema_info(statement)
+            # Register CTEs before their references are resolved
+            with metrics.timer("ctes"):
+                self._identify_ctes(statement)
+            with metrics.timer("dependencies"):
+                self._extract_dependencies(statement, visitor)
+        except Exception as e:
+            print(f"Error in dependency extraction (statement {index}): {e}")
+            self.corrections.append(
+                f"Error in dependency extraction: statement {index} (line {line}): {e}"
+            )
+
+    def _extract_schema_info(self, statement):
+        """Извлекает схему таблицы из CREATE-запроса.
 
         Заполняет атрибут `table_schema` данными о колонках, их типах и ограничениях.
+
+        Args:
+            statement (Expression): Корневой узел оператора.
         """
+        if isinstance(statement, Create) and statement.args.get("kind") == "TABLE":
+            table_name = self.get_table_name(statement.args.get("this"))
+            columns = {}
+
+            # Extract column definitions
+            if "expressions" in statement.args:
+                for col_def in statement.args["expressions"]:
+                    if "this" in col_def.args and "datatype" in col_def.args:
+                        col_name = col_def.args["this"].args["this"]
+                        data_type = col_def.args["datatype"].sql()
+                        columns[col_name] = {
+                            "data_type": data_type,
+                            "nullable": "not" not in col_def.args
+                            or not col_def.args["not"],
+                            "primary_key": "primary" in col_def.args
+                            and col_def.args["primary"],
+                        }
+
+            self.table_schema[table_name] = columns
+            logger.debug(f"Extracted schema for table %s: %s", table_name, columns)
+
+    def _identify_ctes(self, statement):
+        """Идентифицирует CTE оператора, включая рекурсивные.
 
-        for statement in self.parsed:
-            if isinstance(statement, Create) and statement.args.get("kind") == "TABLE":
-                table_name = self.get_table_name(statement.args.get("this"))
-                columns = {}
-
-                # Extract column definitions
-                if "expressions" in statement.args:
-                    for col_def in statement.args["expressions"]:
-                        if "this" in col_def.args and "datatype" in col_def.args:
-                            col_name = col_def.args["this"].args["this"]
-                            data_type = col_def.args["datatype"].sql()
-                            columns[col_name] = {
-                                "data_type": data_type,
-                                "nullable": "not" not in col_def.args
-                                or not col_def.args["not"],
-                                "primary_key": "primary" in col_def.args
-                                and col_def.args["primary"],
-                            }
-
-                self.table_schema[table_name] = columns
-                logger.debug(f"Extracted schema for table %s: %s", table_name, columns)
-
-    def _identify_all_ctes(self):
-        """Идентифицирует все CTE в SQL-коде, включая рекурсивные."""
-        for statement in self.parsed:
-            # Handle direct WITH statements
-            if isinstance(statement, With):
-                self._register_ctes_from_with(statement)
-
-            # Handle WITH clauses in other statements
-            elif "with" in statement.args and statement.args["with"]:
-                self._register_ctes_from_with(statement.args["with"])
-
-            # Check if WITH RECURSIVE is used (explicit recursion)
-            is_recursive = False
-            if isinstance(statement, With) and "recursive" in statement.args:
-                is_recursive = statement.args["recursive"]
-            elif (
-                "with" in statement.args
-                and statement.args["with"]
-                and "recursive" in statement.args["with"].args
-            ):
-                is_recursive = statement.args["with"].args["recursive"]
+        Args:
+            statement (Expression): Корневой узел оператора.
+        """
+        # Handle direct WITH statements
+        if isinstance(statement, With):
+            self._register_ctes_from_with(statement)
+
+        # Handle WITH clauses in other statements
+        elif "with" in statement.args and statement.args["with"]:
+            self._register_ctes_from_with(statement.args["with"])
+
+        # Check if WITH RECURSIVE is used (explicit recursion)
+        is_recursive = False
+        if isinstance(statement, With) and "recursive" in statement.args:
+            is_recursive = statement.args["recursive"]
+        elif (
+            "with" in statement.args
+            and statement.args["with"]
+            and "recursive" in statement.args["with"].args
+        ):
+            is_recursive = statement.args["with"].args["recursive"]
 
-            if is_recursive:
-                # Mark all CTEs in this WITH clause as potentially recursive
-                self._mark_ctes_as_recursive(statement)
+        if is_recursive:
+            # Mark all CTEs in this WITH clause as potentially recursive
+            self._mark_ctes_as_recursive(statement)
 
-                logger.debug("Marked CTEs in WITH RECURSIVE as recursive.")
+            logger.debug("Marked CTEs in WITH RECURSIVE as recursive.")
 
     def _register_ctes_from_with(self, with_statement):
         """Регистрирует CTE из WITH-выражения.
@@ -214,188 +414,130 @@ class SqlAst:
                 self.recursive_ctes.add(cte_name)
 
     def _detect_recursive_ctes(self):
-        """Обнаруживает рекурсивные CTE через анализ зависимостей."""
-        # Check direct recursion (self-reference)
-        for cte_name, cte_node in self.cte_definitions.items():
-            # Walk the CTE expression to find self-references
-            if cte_node.args["this"]:
-                for node in cte_node.args["this"].walk():
-                    if isinstance(node, Table):
-                        table_name = self.get_table_name(node)
-                        if table_name == cte_name:
-                            self.recursive_ctes.add(cte_name)
-                            break
-
-        # Check for indirect recursion (cycles in CTE references)
-        visited = set()
-        temp_visited = set()
-
-        def dfs(node):
-            if node in temp_visited:  # Found a cycle
-                self.recursive_ctes.add(node)
-                return True
-            if node in visited:
-                return False
-
-            visited.add(node)
-            temp_visited.add(node)
-
-            # Check all references from this CTE
-            for neighbor in self.cte_references.get(node, set()):
-                if dfs(neighbor):
-                    self.recursive_ctes.add(node)  # Part of a recursive cycle
-                    return True
-
-            temp_visited.remove(node)
-            return False
-
-        # Run DFS from each CTE
-        for cte_name in self.cte_definitions:
-            if cte_name not in visited:
-                dfs(cte_name)
-
-    def _extract_dependencies(self) -> defaultdict:
-        """Извлекает зависимости между таблицами из SQL-операций.
+        """Обнаруживает рекурсивные CTE через анализ зависимостей.
 
-        Returns:
-            defaultdict: Словарь зависимостей в формате {target_table: {edges}}.
+        CTE рекурсивна, если лежит на цикле ссылок между CTE, то есть входит
+        в сильно связную компоненту с циклом (см. CycleReport).
         """
-        dependencies = defaultdict(set)
-        etl_types = (Insert, Update, Delete, Merge)
-
-        # Process CTEs first to establish their dependencies
-        self._process_all_ctes(dependencies)
-
-        try:
-            for statement in self.parsed:
-                # First determine the target table (for data modification operations)
-                self._statement_count += 1
-                to_table = None
-
-                # Handle DDL statements
-                if isinstance(statement, Create):
-                    to_table = self.get_table_name(statement.args.get("this"))
-                    # For CREATE TABLE AS SELECT, extract dependencies from the SELECT
-                    if (
-                        statement.args.get("kind") == "TABLE"
-                        and "expression" in statement.args
-                    ):
-                        self._process_statement_tree(
-                            statement.args["expression"], to_table, dependencies
-                        )
+        # Direct self-references are registered by _find_cte_references()
+        # Indirect recursion: CTEs in cyclic strongly connected components
+        references = (
+            (referenced, cte_name)
+            for referenced, cte_names in self.cte_references.items()
+            for cte_name in cte_names
+        )
+        report = CycleReport.from_edges(references, max_cycles=0)
+        self.recursive_ctes.update(report.cyclic_nodes())
 
-                elif isinstance(statement, Drop):
-                    # For DROP statements, no dependencies to track
-                    continue
+    def _extract_dependencies(self, statement, visitor):
+        """Извлекает зависимости между таблицами из SQL-операции.
 
-                elif isinstance(statement, Alter):
-                    to_table = self.get_table_name(statement.args.get("this"))
-                    # If ALTER TABLE involves SELECT (e.g., ALTER TABLE ADD COLUMN AS SELECT...)
-                    if "expression" in statement.args and isinstance(
-                        statement.args["expression"], Select
-                    ):
-                        self._process_statement_tree(
-                            statement.args["expression"], to_table, dependencies
-                        )
+        Оператор обходится один раз (см. DependencyVisitor), вместе с
+        телами объявленных в нем CTE.
 
-                # Handle DML statements
-                elif isinstance(statement, etl_types):
-                    if "this" in statement.args:
-                        to_table = self.get_table_name(statement.args.get("this"))
-
-                elif (
-                    isinstance(statement, Select)
-                    and hasattr(statement, "into")
-                    and statement.into is not None
-                ):
-                    to_table = self.get_table_name(statement.into)
-
-                # For regular SELECT statements without an explicit target
-                else:
-                    if self.ignore_io:
-                        continue
-                    to_table = f"result {self._get_output_id()}"
-                if isinstance(statement, Delete):
-                    # Process the table being deleted from
-                    if "this" in statement.args and statement.args["this"] is not None:
-                        from_table = self.get_table_name(statement.args["this"])
-                        # Add dependency from the source table to the target
-                        dependencies[to_table].add(
-                            Edge(from_table, to_table, statement)
-                        )
-
-                    # Process WHERE conditions in DELETE statements
-                    if (
-                        "where" in statement.args
-                        and statement.args["where"] is not None
-                    ):
-                        self._extract_table_dependencies(
-                            statement.args["where"], to_table, dependencies
-                        )
-
-                    # Check for USING clause in DELETE (some dialects support this)
-                    if (
-                        "using" in statement.args
-                        and statement.args["using"] is not None
-                    ):
-                        using_tables = self._extract_using_tables(
-                            statement.args["using"]
-                        )
-                        for using_table in using_tables:
-                            dependencies[to_table].add(
-                                Edge(using_table, to_table, statement)
-                            )
-
-                # Handle INSERT statements specifically
-                if isinstance(statement, Insert):
-                    # For INSERT...VALUES
-                    if isinstance(statement.args.get("expression"), Values):
-                        if self.ignore_io:
-                            continue
-                        input_node = f"input {self._get_input_id()}"
-                        dependencies[to_table].add(
-                            Edge(input_node, to_table, statement)
-                        )
-                    # For INSERT...SELECT
-                    elif isinstance(statement.args.get("expression"), Select):
-                        self._process_statement_tree(
-                            statement.args["expression"], to_table, dependencies
-                        )
-                # Process WITH clauses (Common Table Expressions)
-                if (
-                    isinstance(statement, With)
-                    or "with" in statement.args
-                    and statement.args["with"]
-                ):
-                    self._process_with_statement(statement, to_table, dependencies)
-
-                # Process the main statement and all subqueries
-                self._process_statement_tree(statement, to_table, dependencies)
-                # Process the main statement and all subqueries
-                self._process_statement_tree(statement, to_table, dependencies)
+        Args:
+            statement (Expression): Корневой узел оператора.
+            visitor (DependencyVisitor): Обходчик, заполняющий dependencies.
+        """
+        dependencies = self.dependencies
+        etl_types = (Insert, Update, Delete, Merge)
+        # First determine the target table (for data modification operations)
+        self._statement_count += 1
+        to_table = None
+        # Parts of the statement processed as queries with the same target
+        roots = []
+
+        # Handle DDL statements
+        if isinstance(statement, Create):
+            to_table = self.get_table_name(statement.args.get("this"))
+            # For CREATE TABLE AS SELECT, extract dependencies from the SELECT
+            if statement.args.get("kind") == "TABLE" and "expression" in statement.args:
+                roots.append(statement.args["expression"])
+
+        elif isinstance(statement, Drop):
+            # For DROP statements, no dependencies to track
+            return
 
-        except Exception as e:
-            print(f"Error in dependency extraction: {e}")
+        elif isinstance(statement, Alter):
+            to_table = self.get_table_name(statement.args.get("this"))
+            # If ALTER TABLE involves SELECT (e.g., ALTER TABLE ADD COLUMN AS SELECT...)
+            if "expression" in statement.args and isinstance(
+                statement.args["expression"], Select
+            ):
+                roots.append(statement.args["expression"])
+
+        # Handle DML statements
+        elif isinstance(statement, etl_types):
+            if "this" in statement.args:
+                to_table = self.get_table_name(statement.args.get("this"))
+
+        elif (
+            isinstance(statement, Select)
+            and hasattr(statement, "into")
+            and statement.into is not None
+        ):
+            to_table = self.get_table_name(statement.into)
+
+        # For regular SELECT statements without an explicit target
+        else:
+            if self.ignore_io:
+                # CTE bodies still contribute their own dependencies
+                visitor.visit(statement, None)
+                return
+            to_table = self._synthetic_name("result")
+        if isinstance(statement, Delete):
+            # Process the table being deleted from
+            if "this" in statement.args and statement.args["this"] is not None:
+                from_table = self.get_table_name(statement.args["this"])
+                # Add dependency from the source table to the target
+                dependencies[to_table].add(
+                    self.make_edge(from_table, to_table, statement)
+                )
 
-        return dependencies
+            # Check for USING clause in DELETE (some dialects support this)
+            if "using" in statement.args and statement.args["using"] is not None:
+                using_tables = self._extract_using_tables(statement.args["using"])
+                for using_table in using_tables:
+                    dependencies[to_table].add(
+                        self.make_edge(using_table, to_table, statement)
+                    )
 
-    def _process_all_ctes(self, dependencies):
-        """Обрабатывает все CTE для построения зависимостей.
+        # Handle INSERT statements specifically
+        if isinstance(statement, Insert):
+            # For INSERT...VALUES
+            if isinstance(statement.args.get("expression"), Values):
+                if self.ignore_io:
+                    visitor.visit(statement, None)
+                    return
+                input_node = self._synthetic_name("input")
+                dependencies[to_table].add(
+                    self.make_edge(input_node, to_table, statement)
+                )
+            # For INSERT...SELECT
+            elif isinstance(statement.args.get("expression"), Select):
+                roots.append(statement.args["expression"])
+        # Process WITH clauses (Common Table Expressions)
+        if (
+            isinstance(statement, With)
+            or "with" in statement.args
+            and statement.args["with"]
+        ):
+            self._process_with_statement(statement, to_table, dependencies)
+
+        # Process the main statement, all subqueries and CTE bodies
+        visitor.visit(statement, to_table, roots)
+
+    def _extract_using_tables(self, using) -> List[str]:
+        """Возвращает имена таблиц из USING-клаузы DELETE.
 
         Args:
-            dependencies: Граф зависимостей для заполнения.
-        """
-        for cte_name, cte_node in self.cte_definitions.items():
-            cte_definition = cte_node.args["this"]
-            # Process the CTE query expression
-            if cte_definition:
-                self._process_statement_tree(cte_definition, cte_name, dependencies)
+            using: Узел или список узлов USING.
 
-            # For recursive CTEs, add a self-dependency
-            if cte_name in self.recursive_ctes:
-                recursive_edge = Edge(cte_name, cte_name, cte_node)
-                recursive_edge.is_recursive = True  # Mark edge as recursive
-                dependencies[cte_name].add(recursive_edge)
+        Returns:
+            List[str]: Имена таблиц.
+        """
+        nodes = using if isinstance(using, list) else [using]
+        return [self.get_table_name(node) for node in nodes]
 
     def _process_with_statement(self, statement, to_table, dependencies):
         """Обрабатывает WITH-конструкции и их связь с основным запросом.
@@ -423,284 +565,39 @@ class SqlAst:
                     if cte_definition:
                         # Add dependency from CTE to the main query
                         if isinstance(main_query, Select):
-                            cte_edge = Edge(cte_name, to_table, main_query)
+                            cte_edge = self.make_edge(cte_name, to_table, main_query)
                             dependencies[to_table].add(cte_edge)
 
-    def _process_statement_tree(self, statement, to_table, dependencies):
-        """Рекурсивно обрабатывает узлы AST для извлечения зависимостей.
-
-        Args:
-            statement: Корневой узел для обработки.
-            to_table: Целевая таблица текущего запроса.
-            dependencies: Граф зависимостей для заполнения.
-        """
-        try:
-            # Skip if statement is None
-            if statement is None:
-                return
-
-            # Handle references to CTEs
-            self._handle_cte_references(statement, to_table, dependencies)
-
-            # Process the main FROM table
-            if "from" in statement.args and statement.args["from"] is not None:
-                from_table = self.get_table_name(statement.args["from"])
-                # Add dependency from main table to result
-                if isinstance(statement, Select):
-                    dependencies[to_table].add(Edge(from_table, to_table, statement))
-                else:
-                    # For data modification operations (DML)
-                    dependencies[to_table].add(Edge(from_table, to_table, statement))
-
-            # Process MERGE operations
-            if isinstance(statement, Merge):
-                # USING defines the source table
-                if "using" in statement.args and statement.args["using"]:
-                    using_table = self.get_table_name(statement.args["using"])
-                    dependencies[to_table].add(Edge(using_table, to_table, statement))
-
-                # Check merge conditions
-                if "on" in statement.args and statement.args["on"]:
-                    self._extract_table_dependencies(
-                        statement.args["on"], to_table, dependencies
-                    )
-
-                # Check additional conditions
-                if "expressions" in statement.args:
-                    for expr in statement.args["expressions"]:
-                        self._extract_table_dependencies(expr, to_table, dependencies)
-
-            # Process JOINs in any queries
-            if "joins" in statement.args and statement.args["joins"]:
-                for join_node in statement.args["joins"]:
-                    if "this" in join_node.args:
-                        join_table = self.get_table_name(join_node.args["this"])
-
-                        # Create JOIN object for the graph
-                        dependencies[to_table].add(
-                            Edge(join_table, to_table, join_node)
-                        )
-
-                        # Also check for conditions in the JOIN that might reference other tables
-                        if "on" in join_node.args and join_node.args["on"]:
-                            self._extract_table_dependencies(
-                                join_node.args["on"], to_table, dependencies
-                            )
-
-            # Process expressions in UPDATE and INSERT queries
-            if isinstance(statement, Update) and "set" in statement.args:
-                # In UPDATE there may be hidden dependencies in SET expressions
-                for set_item in statement.args["set"]:
-                    if "expression" in set_item.args:
-                        self._extract_table_dependencies(
-                            set_item.args["expression"], to_table, dependencies
-                        )
-
-            # Process WHERE conditions, which may contain subqueries
-            if "where" in statement.args and statement.args["where"] is not None:
-                self._extract_table_dependencies(
-                    statement.args["where"], to_table, dependencies
-                )
-
-            # Process GROUP BY, HAVING, and ORDER BY clauses which may contain subqueries
-            for clause_type in ["group", "having", "order"]:
-                if clause_type in statement.args and statement.args[clause_type]:
-                    self._extract_table_dependencies(
-                        statement.args[clause_type], to_table, dependencies
-                    )
-
-            # Process SELECT list items for subqueries
-            if "expressions" in statement.args and isinstance(statement, Select):
-                for expr in statement.args["expressions"]:
-                    self._extract_table_dependencies(expr, to_table, dependencies)
-
-        except Exception as e:
-            print(f"Error processing statement tree: {e}")
-
-    def _handle_cte_references(self, statement, to_table, dependencies):
-        """Обрабатывает ссылки на CTE в запросе.
-
-        Args:
-            statement: Узел AST для анализа.
-            to_table: Целевая таблица текущего запроса.
-            dependencies: Граф зависимостей для заполнения.
-        """
-        try:
-            # Look for all table references that might be CTEs
-            for node in statement.walk():
-                if isinstance(node, Table):
-                    table_name = self.get_table_name(node)
-
-                    # If this table name matches a CTE name, it's a reference
-                    if table_name in self.cte_definitions:
-                        # Add dependency from CTE to current target
-                        dependencies[to_table].add(Edge(table_name, to_table, node))
-
-                        # If this is a recursive CTE and is referencing itself
-                        if table_name in self.recursive_ctes and to_table == table_name:
-                            # Mark as a recursive edge
-                            for edge in dependencies[to_table]:
-                                if (
-                                    edge.source == table_name
-                                    and edge.target == to_table
-                                ):
-                                    edge.is_recursive = True
-        except Exception as e:
-            logger.error(f"Error handling CTE references: {e}")
-
-    def _extract_table_dependencies(self, expression, to_table, dependencies):
-        """Извлекает зависимости из таблиц в выражениях.
-
-        Args:
-            expression: Узел AST для анализа (WHERE, JOIN и т.д.).
-            to_table: Целевая таблица.
-            dependencies: Граф зависимостей для заполнения.
-        """
-        try:
-            # Look for all subqueries within the expression
-            for node in expression.walk():
-                if isinstance(node, Select):
-                    self._process_statement_tree(node, to_table, dependencies)
-
-                elif isinstance(node, Subquery):
-                    if "this" in node.args:
-                        self._process_statement_tree(
-                            node.args["this"], to_table, dependencies
-                        )
-
-                # Look for direct references to tables
-                elif isinstance(node, Table):
-                    table_name = self.get_table_name(node)
-                    # Add direct dependency
-
-                    # Check if this is a CTE reference
-                    if table_name in self.cte_definitions:
-                        # Add dependency from CTE to current target
-                        dependencies[to_table].add(Edge(table_name, to_table, node))
-                    else:
-                        # Regular table reference
-                        dependencies[to_table].add(Edge(table_name, to_table, node))
-
-        except Exception as e:
-            print(f"Error extracting table dependencies: {e}")
-
-    def _extract_join_dependencies(self, select_statement, dependencies):
-        """Обрабатывает JOIN-операции в SELECT-запросах.
-
-        Args:
-            select_statement: Узел SELECT-запроса.
-            dependencies: Граф зависимостей для заполнения.
-        """
-        try:
-            if "from" not in select_statement.args:
-                return
-
-            # Extract the base table from FROM
-            from_clause = select_statement.args["from"]
-            base_table = self.get_table_name(from_clause)
-
-            # Process the list of JOINs
-            if "joins" in select_statement.args and select_statement.args["joins"]:
-                for join_node in select_statement.args["joins"]:
-                    joined_table = self.get_table_name(join_node.args.get("this"))
-                    if base_table and joined_table:
-                        # Create a relationship between tables
-                        dependencies[base_table].add(
-                            Edge(joined_table, base_table, join_node)
-                        )
-
-            # Also check for nested JOINs in FROM
-            self._find_nested_joins(from_clause, dependencies)
-
-        except Exception as e:
-            print(f"Error extracting JOIN dependencies: {e}")
-
-    def _find_nested_joins(self, expr, dependencies):
-        """Находит вложенные JOIN-операции в выражениях.
-
-        Args:
-            expr: Узел AST для анализа.
-            dependencies: Граф зависимостей для заполнения.
-        """
-        try:
-            for node in expr.walk():
-                if isinstance(node, Join):
-                    left_table = self._extract_table_name(node.args.get("this"))
-                    right_table = self._extract_table_name(node.args.get("expression"))
-
-                    if left_table and right_table:
-                        # Create a relationship between tables
-                        dependencies[left_table].add(
-                            Edge(right_table, left_table, node)
-                        )
-        except Exception as e:
-            print(f"Error processing nested JOINs: {e}")
-
-    def _process_join(self, join_node, dependencies):
-        """Обрабатывает отдельный JOIN-узел.
-
-        Args:
-            join_node: Узел JOIN-операции.
-            dependencies: Граф зависимостей для заполнения.
-        """
-        try:
-            left_expr = join_node.args.get("this")
-            right_expr = join_node.args.get("expression")
-            if left_expr is None or right_expr is None:
-                print(
-                    f"Skipping JOIN due to missing expression: left_expr={left_expr}, right_expr={right_expr}"
-                )
-                return
-
-            left_table = self._extract_table_name(left_expr)
-            print(f"Left table extracted: {left_table}")  # Debug statement
-
-            right_table = self._extract_table_name(right_expr)
-            print(f"Right table extracted: {right_table}")  # Debug statement
-
-            # Add dependency: from right_table to left_table
-            if left_table and right_table:
-                dependencies[left_table].add(Edge(right_table, left_table, join_node))
-                logger.debug("Added JOIN dependency: %s -> %s", right_table, left_table)
+    def make_edge(
+        self, source, target, op: Expression, is_internal_update=False
+    ) -> Edge:
+        """Создает ребро, которое не ссылается на AST оператора.
 
-            else:
-                print(
-                    f"Could not extract both tables from JOIN: left={left_table}, right={right_table}"
-                )
-        except Exception as e:
-            print(f"Error processing JOIN: {e}")
-
-    def _extract_table_name(self, expr):
-        """Извлекает имя таблицы из узла AST.
+        Имена CTE (узлы Identifier) копируются без родителя, а в режиме колонок
+        колонки операции извлекаются сразу (один раз на узел операции).
 
         Args:
-            expr: Узел AST, содержащий ссылку на таблицу.
+            source: Источник зависимости.
+            target: Цель зависимости.
+            op (Expression): Узел операции.
+            is_internal_update (bool): Внутреннее обновление.
 
         Returns:
-            Имя таблицы или None, если не удалось извлечь.
+            Edge: Новое ребро.
         """
-        if expr is None:
-            return None
-
-        # Direct processing for Table objects
-        if isinstance(expr, Table):
-            try:
-                return expr.args["this"].args["this"]
-            except (KeyError, AttributeError):
-                pass
-
-        # Search for tables within the expression
-        tables = []
-        for node in expr.walk():
-            if isinstance(node, Table):
-                try:
-                    table_name = node.args["this"].args["this"]
-                    tables.append(table_name)
-                except (KeyError, AttributeError):
-                    pass
-
-        # Return the first table found or None
-        return tables[0] if tables else None
+        columns = None
+        if self.column_mode and not isinstance(op, Table):
+            key = id(op)
+            if key not in self._op_columns:
+                self._op_columns[key] = edge_columns(op)
+            columns = self._op_columns[key]
+        return Edge(
+            _detach(source),
+            _detach(target),
+            op,
+            is_internal_update=is_internal_update,
+            columns=columns,
+        )
 
     def get_dependencies(self) -> defaultdict:
         """Возвращает граф зависимостей между таблицами.
@@ -798,10 +695,10 @@ class SqlAst:
                         return self.get_table_name(value)
 
             # If no table found
-            return f"unknown {self._get_unknown_id()}"
+            return self._synthetic_name("unknown")
         except Exception as e:
             print(f"Error in get_table_name: {e}")
-            return f"unknown {self._get_unknown_id()}"
+            return self._synthetic_name("unknown")
 
     def get_first_from(self, stmt) -> Optional[str]:
         """Возвращает первую таблицу в FROM-клаузе.
@@ -869,100 +766,277 @@ class SqlAst:
                     result.append(node)
         return result
 
-    def get_cyclic_dependencies(self) -> List[List[str]]:
-        """Возвращает циклы в графе зависимостей.
+    def get_cyclic_dependencies(
+        self, max_cycles: int = MAX_EXAMPLE_CYCLES
+    ) -> List[List[str]]:
+        """Возвращает примеры циклов в графе зависимостей.
+
+        Простые циклы не перечисляются все (их число растет экспоненциально):
+        для каждой сильно связной компоненты возвращается не больше max_cycles
+        кратчайших циклов (см. CycleReport).
+
+        Args:
+            max_cycles (int): Наибольшее количество циклов на компоненту.
 
         Returns:
-            List[List[str]]: Список циклов
+            List[List[str]]: Список циклов (узлы без повтора первого в конце).
 
         Example:
             >>> sql = "CREATE TABLE a AS SELECT * FROM b; CREATE TABLE b AS SELECT * FROM a"
             >>> ast = SqlAst(sql)
             >>> ast.get_cyclic_dependencies()
-            [['a', 'b', 'a']]
+            [['a', 'b']]
         """
-        import networkx as nx
+        edges = (
+            (edge.source, target_table)
+            for target_table, edges in self.dependencies.items()
+            for edge in edges
+        )
+        return CycleReport.from_edges(edges, max_cycles).cycles()
 
-        # Create a directed graph from dependencies
-        G = nx.DiGraph()
-        for target_table, edges in self.dependencies.items():
-            for edge in edges:
-                source_table = edge.source
-                G.add_edge(source_table, target_table)
+    def _synthetic_name(self, role: str) -> str:
+        """Возвращает имя очередного синтетического узла анализируемого оператора.
 
-        # Find all simple cycles in the graph
-        try:
-            cycles = list(nx.simple_cycles(G))
-            return cycles
-        except Exception as e:
-            logger.error(f"Error finding cycles: {e}")
-            return []
+        Имя строится из пути к файлу, номера оператора и роли узла, поэтому
+        не зависит от порядка разбора файлов, процесса и других экземпляров SqlAst.
+
+        Args:
+            role (str): Роль узла: "input", "result" или "unknown".
+
+        Returns:
+            str: Например, "input /etl/load.sql:3" (третий оператор файла),
+                "unknown 2.2" (второй такой узел второго оператора кода без файла).
+        """
+        ordinal = self._synthetic_counts[role]
+        self._synthetic_counts[role] += 1
+        if self.source_path:
+            location = f"{self.source_path}:{self._statement_index}"
+        else:
+            location = str(self.statement_offset + self._statement_index)
+        if ordinal:
+            location = f"{location}.{ordinal + 1}"
+        return f"{role} {location}"
+
+
+# "spawn" is used on every platform: forking a process that already runs the
+# executor's management thread may deadlock the child.
+_POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _drain(pending: deque) -> Iterator[str]:
+    """Выдает тексты операторов из очереди до None."""
+    while True:
+        text = pending.popleft()
+        if text is None:
+            return
+        yield text
+
+
+def _detach(name):
+    """Копирует имя-узел AST (например, Identifier CTE) без ссылки на дерево."""
+    return name.copy() if isinstance(name, Expression) else name
+
+
+def _terminate_workers(executor: ProcessPoolExecutor):
+    """Останавливает рабочие процессы пула, не дожидаясь их текущих задач."""
+    terminate = getattr(executor, "terminate_workers", None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+
+
+def _ready() -> bool:
+    return True
+
+
+class WorkerPool:
+    """Пул процессов разбора, переживающий отдельные вызовы iter_files().
+
+    Долгоживущий процесс (см. base.server.LineageServer) запускает пул один
+    раз, и каждое обновление графа разбирает файлы в уже запущенных процессах
+    с импортированным sqlglot. Бюджет времени при этом соблюдается так же,
+    как в пуле iter_files(): оператор прерывается таймером в процессе пула,
+    а зависший файл останавливает сторож. Если процесс остановлен сторожем
+    или упал, пул пересоздается при следующем обращении к executor.
+
+    Attributes:
+        jobs (int): Количество процессов.
+
+    Example:
+        >>> with WorkerPool(4) as pool:
+        ...     pool.start()
+        ...     results = list(parser.iter_files(file_paths, pool=pool))
+    """
+
+    def __init__(self, jobs: int, initializer=None, initargs=()):
+        """Создает пул; процессы запускаются в start() или по первой задаче.
 
-    def _get_input_id(self):
-        if self.sep_parse:
-            self.input_id += 1
-            return self.input_id - 1
-        SqlAst._input_id += 1
-        return SqlAst._input_id - 1
-
-    def _get_output_id(self):
-        if self.sep_parse:
-            self.output_id += 1
-            return self.output_id - 1
-        SqlAst._output_id += 1
-        return SqlAst._output_id - 1
-
-    def _get_unknown_id(self):
-        if self.sep_parse:
-            self.unknown_id += 1
-            return self.unknown_id - 1
-        SqlAst._unknown_id += 1
-        return SqlAst._unknown_id - 1
-
-    def _get_cte_id(self):
-        if self.sep_parse:
-            self.cte_id += 1
-            return self.cte_id - 1
-        SqlAst._cte_id += 1
-        return SqlAst._cte_id - 1
+        Args:
+            jobs (int): Количество процессов.
+            initializer (Callable, optional): Вызывается в каждом процессе при запуске.
+            initargs (tuple): Аргументы initializer.
+        """
+        self.jobs = jobs
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Текущий пул процессов; сломанный пул заменяется новым."""
+        with self._lock:
+            if self._executor is not None and self._executor._broken:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.jobs,
+                    mp_context=_POOL_CONTEXT,
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+            return self._executor
+
+    def start(self):
+        """Запускает все процессы сейчас, а не при первых задачах."""
+        executor = self.executor
+        for future in [executor.submit(_ready) for _ in range(self.jobs)]:
+            future.result()
+
+    def discard(self, executor: ProcessPoolExecutor):
+        """Останавливает процессы executor; следующий executor будет новым."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        _terminate_workers(executor)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Останавливает пул, отменяя еще не начатые задачи."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+@contextmanager
+def _pool_executor(jobs: int, pool: Optional[WorkerPool]):
+    """Пул pool или новый пул из jobs процессов, закрываемый на выходе."""
+    if pool is not None:
+        yield pool.executor
+        return
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=_POOL_CONTEXT) as executor:
+        yield executor
+
+
+def _parse_file_task(
+    parser, file_path: str, collect: bool = False, sql_code: Optional[str] = None
+):
+    """Разбирает один файл в процессе пула (см. DirectoryParser.parse_directory).
+
+    Если collect, метрики файла собираются и возвращаются в meta["metrics"].
+    sql_code - уже прочитанный текст файла (см. DirectoryParser.parse_file_local).
+    """
+    if collect:
+        with metrics.collecting():
+            return parser.parse_file_local(file_path, sql_code=sql_code)
+    return parser.parse_file_local(file_path, sql_code=sql_code)
 
 
 class DirectoryParser:
     """Обрабатывает SQL-файлы в директории и возвращает результаты анализа.
 
+    Имена синтетических узлов строятся из пути к файлу и номера оператора
+    (см. SqlAst._synthetic_name), поэтому результат файла не зависит от того,
+    разобран он в текущем процессе, в пуле или взят из кеша.
+
     Attributes:
         sql_ast_cls (Type[SqlAst]): Класс для анализа SQL (можно заменить на кастомный).
+        cache (Optional[ParseCache]): Кеш результатов разбора файлов.
+        table_schema (Dict[str, Dict]): Схемы таблиц из CREATE-запросов всех разобранных файлов.
+        FILE_EXTENSIONS (tuple): Расширения обрабатываемых файлов.
+        STREAM_THRESHOLD (Optional[int]): Размер файла в байтах, начиная с которого
+            он читается частями. None - файлы всегда читаются целиком.
+        budget (TimeBudget): Бюджет времени разбора файла и оператора.
+        detector (DialectDetector): Диалекты, выученные на файлах текущего разбора.
+            Сбрасывается в начале iter_files() и aiter_files(), поэтому результат
+            не зависит от ранее разобранных файлов.
+        WATCHDOG_GRACE (float): На сколько секунд файл в пуле может превысить
+            бюджет, прежде чем рабочий процесс будет остановлен.
+        QUEUE_SIZE (int): Размер очередей конвейера aiter_files() по умолчанию.
 
     Example:
-        >>> parser = DirectoryParser()
-        >>> results = parser.parse_directory("/data/sql")
+        >>> parser = DirectoryParser(cache=ParseCache())
+        >>> results = parser.parse_directory("/data/sql", jobs=8)
         >>> results[0]  # (dependencies, corrections, "/data/sql/query.sql")
     """
 
-    def __init__(self, sql_ast_cls=SqlAst, ignore_io=False):
+    FILE_EXTENSIONS = (".sql", ".ddl")  # Support both SQL and DDL files
+    # Files larger than this (in bytes) are read in chunks, None - never
+    STREAM_THRESHOLD = 64 * 1024 * 1024
+    STREAM_CHUNK_SIZE = 1024 * 1024
+    # Seconds a pool worker may run over the file budget before it is killed
+    WATCHDOG_GRACE = 10.0
+    QUEUE_SIZE = 8
+
+    def __init__(
+        self,
+        sql_ast_cls=SqlAst,
+        ignore_io=False,
+        cache=None,
+        dialect=None,
+        column_mode=False,
+        prefilter=None,
+        budget=None,
+    ):
         """Инициализирует парсер директорий.
 
         Args:
             sql_ast_cls (type): Класс для анализа SQL. Можно заменить на кастомную реализацию.
+            ignore_io (bool): Передается в SqlAst.__init__().
+            cache (Optional[ParseCache]): Кеш результатов. None - без кеша.
+            dialect (str, optional): Диалект всех файлов. None - автоопределение.
+            column_mode (bool): Передается в SqlAst.__init__().
+            prefilter (StatementFilter, optional): Передается в SqlAst.__init__().
+            budget (TimeBudget, optional): Бюджет времени разбора файла и оператора.
+                None - без ограничений.
         """
         self.sql_ast_cls = sql_ast_cls
         self.ignore_io = ignore_io
+        self.dialect = dialect
+        self.column_mode = column_mode
+        self.prefilter = prefilter
+        self.budget = budget if budget is not None else TimeBudget()
+        self.detector = DialectDetector()
+        self.cache = cache
+        self.table_schema = {}
 
     def parse_directory(
-        self, directory: str, sep_parse: bool = False
+        self, directory: str, *, jobs: int = 1
     ) -> List[Tuple[defaultdict, List[str], str]]:
         """Парсит все SQL-файлы в указанной директории.
 
+        Собирает результаты iter_directory() в список. Для больших директорий
+        лучше использовать iter_directory() напрямую.
+
         Args:
             directory (str): Путь к директории (например, "/data/sql").
-            sep_parse (bool): Передается в SqlAst.__init__().
+            jobs (int): Количество процессов для разбора. 1 - разбор в текущем
+                процессе, 0 - по числу ядер.
 
         Returns:
             List[Tuple[defaultdict, List[str], str]:
                 Список кортежей: (зависимости, корректировки, путь_к_файлу).
-
-        Raises:
-            FileNotFoundError: Если директория не существует.
+                Порядок не зависит от jobs.
 
         Example:
             >>> parser = DirectoryParser()
@@ -973,36 +1047,563 @@ class DirectoryParser:
             >>> len(results[0][1])  # Количество корректировок
             0
         """
-        results = []
+        return list(self.iter_directory(directory, jobs=jobs))
+
+    def iter_directory(
+        self, directory: str, *, jobs: int = 1, pool: Optional[WorkerPool] = None
+    ) -> Iterator[Tuple[defaultdict, List[str], str]]:
+        """Парсит SQL-файлы директории, выдавая результат каждого файла по готовности.
+
+        В памяти одновременно находятся результаты только тех файлов, которые
+        сейчас разбираются, поэтому потребление памяти не растет с размером директории.
+
+        Args:
+            directory (str): Путь к директории.
+            jobs (int): Количество процессов для разбора (см. parse_directory).
+            pool (WorkerPool, optional): Уже запущенный пул (см. iter_files).
+
+        Yields:
+            Tuple[defaultdict, List[str], str]: (зависимости, корректировки, путь_к_файлу)
+                в порядке collect_files(). Несуществующая директория не дает результатов.
+
+        Example:
+            >>> for dependencies, corrections, path in parser.iter_directory("./sql"):
+            ...     storage.add_dependencies(dependencies)
+        """
+        if not self.check_directory(directory):
+            return
+        print(f"Processing files in directory: {directory}")
+        yield from self.iter_files(self.collect_files(directory), jobs=jobs, pool=pool)
+
+    @staticmethod
+    def check_directory(directory: str) -> bool:
+        """Проверяет, что директория существует, и сообщает об ошибке, если нет."""
         if not os.path.exists(directory):
             print(f"Error: Directory {directory} does not exist!")
-            return results
+            return False
         if not os.path.isdir(directory):
             print(f"Error: {directory} is not a directory!")
-            return results
+            return False
+        return True
+
+    def parse_files(
+        self, file_paths: List[str], *, jobs: int = 1
+    ) -> List[Tuple[defaultdict, List[str], str]]:
+        """Парсит указанные файлы (см. parse_directory).
+
+        Args:
+            file_paths (List[str]): Пути к файлам.
+            jobs (int): Количество процессов для разбора.
+
+        Returns:
+            List[Tuple[defaultdict, List[str], str]]: Результаты в порядке file_paths.
+        """
+        return list(self.iter_files(file_paths, jobs=jobs))
+
+    def iter_files(
+        self,
+        file_paths: List[str],
+        *,
+        jobs: int = 1,
+        pool: Optional[WorkerPool] = None,
+    ) -> Iterator[Tuple[defaultdict, List[str], str]]:
+        """Парсит указанные файлы, выдавая результаты по готовности (см. iter_directory).
+
+        Args:
+            file_paths (List[str]): Пути к файлам.
+            jobs (int): Количество процессов для разбора.
+            pool (WorkerPool, optional): Уже запущенный пул. Если задан, все файлы,
+                даже один, разбираются в его процессах, а jobs не используется.
+
+        Yields:
+            Tuple[defaultdict, List[str], str]: Результаты в порядке file_paths.
+                Пути приводятся к FileManifest.key (см. _source_paths).
+        """
+        file_paths = self._source_paths(file_paths)
+        self.detector.reset()
+        jobs = jobs or os.cpu_count() or 1
+        if pool is not None:
+            local_results = self._iter_files_parallel(file_paths, pool.jobs, pool)
+        elif jobs > 1 and len(file_paths) > 1:
+            local_results = self._iter_files_parallel(file_paths, jobs)
+        else:
+            local_results = (
+                self.parse_file_local(file_path) for file_path in file_paths
+            )
+        files = cache_hits = 0
+        for result, meta in local_results:
+            files += 1
+            cache_hits += meta.get("cached", False)
+            yield self._collect(result, meta)
+        if self.cache is not None:
+            logger.info(f"Parse cache: {cache_hits} of {files} files cached")
+
+    async def aiter_directory(
+        self, directory: str, jobs: int = 1, queue_size: Optional[int] = None
+    ) -> AsyncIterator[Tuple[defaultdict, List[str], str]]:
+        """Асинхронный вариант iter_directory() (см. aiter_files).
+
+        Example:
+            >>> async for dependencies, corrections, path in parser.aiter_directory("./sql"):
+            ...     storage.add_dependencies(dependencies)
+        """
+        if not self.check_directory(directory):
+            return
         print(f"Processing files in directory: {directory}")
-        for root, _, files in os.walk(directory):
+        file_paths = await asyncio.to_thread(self.collect_files, directory)
+        async for result in self.aiter_files(file_paths, jobs, queue_size):
+            yield result
+
+    async def aiter_files(
+        self, file_paths: List[str], jobs: int = 1, queue_size: Optional[int] = None
+    ) -> AsyncIterator[Tuple[defaultdict, List[str], str]]:
+        """Парсит файлы конвейером asyncio, выдавая результаты в порядке file_paths.
+
+        Стадии конвейера связаны ограниченными очередями:
+            - чтение: файлы читаются в отдельном потоке, пока идет разбор
+              предыдущих (файлы больше STREAM_THRESHOLD читаются при разборе);
+            - разбор: jobs задач отправляют прочитанные файлы в пул процессов
+              (при jobs = 1 - в отдельный поток);
+            - сохранение: вызывающий код получает результаты через async for.
+
+        Если стадии не успевают за предыдущими, очереди заполняются и чтение
+        приостанавливается. Прочитанных, но еще не выданных файлов не бывает
+        больше 2 * queue_size + jobs, поэтому память ограничена размером очередей.
+        В отличие от iter_files(), упавший рабочий процесс не перезапускается:
+        файлы, которые в нем разбирались, получают запись об ошибке.
+
+        Args:
+            file_paths (List[str]): Пути к файлам.
+            jobs (int): Количество процессов для разбора. 0 - по числу ядер.
+            queue_size (int, optional): Размер очередей. По умолчанию QUEUE_SIZE.
+
+        Yields:
+            Tuple[defaultdict, List[str], str]: (зависимости, корректировки, путь_к_файлу).
+
+        Example:
+            >>> async for dependencies, corrections, path in parser.aiter_files(paths, jobs=4):
+            ...     storage.add_dependencies(dependencies)
+        """
+        file_paths = self._source_paths(file_paths)
+        self.detector.reset()
+        jobs = jobs or os.cpu_count() or 1
+        queue_size = queue_size or self.QUEUE_SIZE
+        loop = asyncio.get_running_loop()
+        read_queue = asyncio.Queue(queue_size)
+        parsed_queue = asyncio.Queue(queue_size)
+        # Also bounds the results that wait for a slower earlier file
+        window = asyncio.Semaphore(2 * queue_size + jobs)
+        if jobs > 1:
+            executor = ProcessPoolExecutor(max_workers=jobs, mp_context=_POOL_CONTEXT)
+        else:
+            executor = ThreadPoolExecutor(max_workers=1)
+        collect = metrics.active()
+
+        async def read():
+            for index, file_path in enumerate(file_paths):
+                await window.acquire()
+                try:
+                    sql_code = await asyncio.to_thread(self._read_file, file_path)
+                except Exception as e:
+                    await parsed_queue.put((index, self._error_result(file_path, e)))
+                    continue
+                await read_queue.put((index, file_path, sql_code))
+            for _ in range(jobs):
+                await read_queue.put(None)
+
+        async def parse():
+            while (item := await read_queue.get()) is not None:
+                index, file_path, sql_code = item
+                try:
+                    result = await loop.run_in_executor(
+                        executor, _parse_file_task, self, file_path, collect, sql_code
+                    )
+                except Exception as e:
+                    result = self._error_result(file_path, e)
+                await parsed_queue.put((index, result))
+
+        tasks = [asyncio.create_task(read())]
+        tasks += [asyncio.create_task(parse()) for _ in range(jobs)]
+        finished = {}
+        next_index = files = cache_hits = 0
+        try:
+            while next_index < len(file_paths):
+                index, result = await parsed_queue.get()
+                finished[index] = result
+                while next_index in finished:
+                    result, meta = finished.pop(next_index)
+                    next_index += 1
+                    window.release()
+                    files += 1
+                    cache_hits += meta.get("cached", False)
+                    yield self._collect(result, meta)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+        if self.cache is not None:
+            logger.info(f"Parse cache: {cache_hits} of {files} files cached")
+
+    @staticmethod
+    def _source_paths(file_paths: List[str]) -> List[str]:
+        """Приводит пути файлов к одному виду - ключам FileManifest.
+
+        Путь входит в имена синтетических узлов, ключ кеша и происхождение ребер
+        в хранилище, поэтому полный разбор директории и обновление отдельных
+        файлов (см. GraphManager.update_files) дают одинаковые узлы.
+        """
+        return [FileManifest.key(file_path) for file_path in file_paths]
+
+    def _read_file(self, file_path: str) -> Optional[str]:
+        """Читает файл для aiter_files(). None - файл читается частями при разборе."""
+        if self._is_streamed(os.path.getsize(file_path)):
+            return None
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def collect_files(self, directory: str) -> List[str]:
+        """Собирает пути к обрабатываемым файлам в детерминированном порядке.
+
+        Args:
+            directory (str): Путь к директории.
+
+        Returns:
+            List[str]: Пути к файлам с расширениями из FILE_EXTENSIONS.
+        """
+        file_paths = []
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
             print(f"Processing directory: {root}")
-            for file in files:
-                if file.endswith((".sql", ".ddl")):  # Support both SQL and DDL files
-                    file_path = os.path.join(root, file)
-                    print(f"Reading file: {file_path}")
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            sql_code = f.read()
-                            ast = self.sql_ast_cls(
-                                sql_code, sep_parse, ignore_io=self.ignore_io
-                            )
-                            results.append(
-                                (
-                                    ast.get_dependencies(),
-                                    ast.get_corrections(),
-                                    file_path,
-                                )
-                            )
-                    except Exception as e:
-                        print(f"Error processing file {file_path}: {e}")
-                        results.append(
-                            (defaultdict(set), [f"Error: {str(e)}"], file_path)
+            for file in sorted(files):
+                if file.endswith(self.FILE_EXTENSIONS):
+                    file_paths.append(os.path.join(root, file))
+        return file_paths
+
+    def parse_file(self, file_path: str) -> Tuple[defaultdict, List[str], str]:
+        """Парсит один файл.
+
+        Args:
+            file_path (str): Путь к файлу.
+
+        Returns:
+            Tuple[defaultdict, List[str], str]: (зависимости, корректировки, путь_к_файлу).
+                Ошибки чтения и разбора попадают в корректировки.
+        """
+        return self._collect(*self.parse_file_local(file_path))
+
+    def parse_file_local(self, file_path: str, *, sql_code: Optional[str] = None):
+        """Парсит один файл, не изменяя состояние парсера.
+
+        Если собираются метрики (см. util.metrics.collecting), счетчики и
+        длительности фаз файла возвращаются в meta["metrics"] и не кешируются.
+
+        Сначала проверяет кеш, и только при промахе строит SqlAst. Файлы больше
+        STREAM_THRESHOLD не загружаются в память целиком: операторы читаются
+        частями (см. read_statements) и анализируются по одному, а диалект
+        определяется по первой части файла.
+
+        Args:
+            file_path (str): Путь к файлу.
+            sql_code (str, optional): Уже прочитанный текст файла (см. aiter_files).
+                None - файл читается здесь.
+
+        Returns:
+            Tuple:
+                - Tuple[defaultdict, List[str], str]: (зависимости, корректировки, путь_к_файлу)
+                - dict: {"table_schema": схемы таблиц файла,
+                  "cached": взят ли результат из кеша,
+                  "metrics": метрики файла (Metrics.as_dict())}
+        """
+        if not metrics.active():
+            return self._parse_file(file_path, sql_code)
+        with metrics.collecting() as file_metrics:
+            with metrics.timer("file"):
+                result, meta = self._parse_file(file_path, sql_code)
+        file_metrics.count("files")
+        if meta.get("cached"):
+            file_metrics.count("files.cached")
+        file_metrics.count("edges", sum(len(edges) for edges in result[0].values()))
+        return result, dict(meta, metrics=file_metrics.as_dict())
+
+    def _parse_file(self, file_path: str, sql_code: Optional[str] = None):
+        """Парсит один файл (см. parse_file_local), без сбора метрик."""
+        print(f"Reading file: {file_path}")
+        started = time.perf_counter()
+        statements = None
+        statement_count = [0]
+        if sql_code is not None:
+            size = len(sql_code)
+        else:
+            try:
+                size = os.path.getsize(file_path)
+                with open(file_path, "r", encoding="utf-8") as f:
+                    if self._is_streamed(size):
+                        sql_code = f.read(self.STREAM_CHUNK_SIZE)
+                        statements = self._stream_statements(
+                            file_path,
+                            statement_count,
+                            uses_backslash_escapes(self.dialect, sql_code),
+                        )
+                    else:
+                        sql_code = f.read()
+            except Exception as e:
+                return self._error_result(file_path, e)
+
+        key = None
+        if self.cache is not None:
+            try:
+                digest = file_hash(file_path) if statements is not None else None
+            except Exception as e:
+                return self._error_result(file_path, e)
+            key = self.cache.make_key(
+                sql_code,
+                dialect=self.dialect,
+                ignore_io=self.ignore_io,
+                namespace=self._cache_namespace(),
+                digest=digest,
+                source_path=file_path,
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                dependencies, corrections, meta = cached
+                return (dependencies, corrections, file_path), dict(meta, cached=True)
+
+        try:
+            with self.budget.file():
+                dependencies, corrections, table_schema = self.analyze_code(
+                    sql_code, source_path=file_path, statements=statements
+                )
+            meta = {"table_schema": table_schema}
+        except BudgetExceeded as e:
+            return self._timeout_result(file_path, e)
+        except Exception as e:
+            return self._error_result(file_path, e)
+
+        self._log_throughput(
+            file_path,
+            size,
+            statement_count[0] if statements is not None else None,
+            time.perf_counter() - started,
+        )
+        # Timeouts depend on the machine load and are not cached
+        timed_out = any(c.startswith(TIMEOUT_PREFIX) for c in corrections)
+        if key is not None and not timed_out:
+            self.cache.put(key, (dependencies, corrections, meta))
+        return (dependencies, corrections, file_path), meta
+
+    def analyze_code(
+        self,
+        sql_code: str,
+        source_path: Optional[str] = None,
+        statements=None,
+    ) -> Tuple[defaultdict, List[str], Dict[str, Dict]]:
+        """Анализирует содержимое одного файла.
+
+        Args:
+            sql_code (str): Содержимое файла (или его начало, если переданы statements).
+            source_path (str, optional): Путь к файлу, передается в SqlAst.__init__().
+            statements (Iterable[Tuple[int, str]], optional): Операторы большого
+                файла, передаются в SqlAst.__init__().
+
+        Returns:
+            Tuple[defaultdict, List[str], Dict]: (зависимости, корректировки, схемы_таблиц).
+        """
+        ast = self.sql_ast_cls(
+            sql_code,
+            ignore_io=self.ignore_io,
+            dialect=self.dialect,
+            source_path=source_path,
+            statements=statements,
+            column_mode=self.column_mode,
+            prefilter=self.prefilter,
+            budget=self.budget,
+            detector=self.detector,
+        )
+        if ast.skipped_statements:
+            logger.debug(
+                f"Skipped {ast.skipped_statements} statements of {source_path} "
+                "that cannot produce requested edges"
+            )
+        return ast.get_dependencies(), ast.get_corrections(), ast.get_table_schema()
+
+    def _is_streamed(self, size: int) -> bool:
+        """True, если файл размера size читается частями (см. STREAM_THRESHOLD)."""
+        return self.STREAM_THRESHOLD is not None and size > self.STREAM_THRESHOLD
+
+    def _stream_statements(
+        self, file_path: str, statement_count: List[int], backslash_escapes: bool
+    ):
+        """Читает операторы большого файла, считая их в statement_count[0]."""
+        for statement in read_statements(
+            file_path, self.STREAM_CHUNK_SIZE, backslash_escapes
+        ):
+            statement_count[0] += 1
+            yield statement
+
+    @staticmethod
+    def _log_throughput(
+        file_path: str, size: int, statements: Optional[int], seconds: float
+    ):
+        megabytes = size / (1024 * 1024)
+        seconds = max(seconds, 1e-9)
+        message = (
+            f"Parsed {file_path}: {megabytes:.1f} MB in {seconds:.2f}s "
+            f"({megabytes / seconds:.1f} MB/s"
+        )
+        if statements is None:
+            logger.debug(message + ")")
+        else:
+            logger.info(
+                message + f", {statements} statements, "
+                f"{statements / seconds:.0f} statements/s)"
+            )
+
+    def _cache_namespace(self) -> str:
+        columns = ":columns" if self.column_mode else ""
+        prefilter = ""
+        if self.prefilter is not None and self.prefilter.active:
+            prefilter = f":prefilter={self.prefilter.key()}"
+        return f"{type(self).__name__}:{self.sql_ast_cls.__name__}{columns}{prefilter}"
+
+    def _collect(self, result, meta):
+        """Добавляет схемы таблиц и метрики файла к общим и возвращает его результат."""
+        self.table_schema.update(meta.get("table_schema", {}))
+        metrics.record_file(result[2], meta.get("metrics"))
+        return result
+
+    def _iter_files_parallel(
+        self, file_paths: List[str], jobs: int, pool: Optional[WorkerPool] = None
+    ):
+        """Парсит файлы в пуле процессов, выдавая результаты в порядке file_paths.
+
+        Отправленные в пул и готовые, но еще не выданные файлы вместе занимают
+        не больше 2 * jobs мест. Если рабочий процесс падает, все файлы, которые
+        были в работе, повторно разбираются по одному в отдельном процессе:
+        упавший файл получает запись об ошибке, остальные - обычный результат.
+
+        При заданном бюджете файла в пул отправляется не больше jobs файлов.
+        Если файл не разобран за бюджет и WATCHDOG_GRACE секунд (рабочий процесс
+        не прервался сам, см. TimeBudget), он получает запись о превышении
+        бюджета, рабочие процессы останавливаются, а остальные файлы, бывшие
+        в работе, разбираются в новом пуле.
+
+        Args:
+            file_paths (List[str]): Пути к файлам.
+            jobs (int): Количество процессов.
+            pool (WorkerPool, optional): Пул, в котором разбирать файлы вместо
+                нового. Остановленные сторожем процессы заменяются в нем.
+
+        Yields:
+            Tuple: Результаты parse_file_local в порядке file_paths.
+        """
+        finished = {}  # индекс файла -> готовый, еще не выданный результат
+        watchdog = self._watchdog_seconds()
+        next_index = 0
+        pending = deque(range(len(file_paths)))
+        while pending or next_index < len(file_paths):
+            suspects = []
+            with _pool_executor(jobs, pool) as executor:
+                in_flight = {}
+                started = {}  # задача -> время отправки в пул
+                while (pending or in_flight) and not suspects:
+                    while (
+                        pending
+                        and len(in_flight) + len(finished) < 2 * jobs
+                        and (watchdog is None or len(in_flight) < jobs)
+                    ):
+                        i = pending.popleft()
+                        future = executor.submit(
+                            _parse_file_task, self, file_paths[i], metrics.active()
                         )
-        return results
+                        in_flight[future] = i
+                        started[future] = time.perf_counter()
+                    timeout = None
+                    if watchdog is not None and in_flight:
+                        oldest = min(started[future] for future in in_flight)
+                        timeout = max(oldest + watchdog - time.perf_counter(), 0)
+                    done, _ = wait(in_flight, timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        i = in_flight.pop(future)
+                        try:
+                            finished[i] = future.result()
+                        except BrokenProcessPool:
+                            suspects.append(i)
+                        except Exception as e:
+                            finished[i] = self._error_result(file_paths[i], e)
+                    overdue = self._collect_overdue(
+                        in_flight, started, watchdog, file_paths, finished
+                    )
+                    if overdue:
+                        # Other files of the stopped workers go to a new pool
+                        pending.extendleft(sorted(in_flight.values(), reverse=True))
+                        in_flight.clear()
+                        if pool is not None:
+                            pool.discard(executor)
+                        else:
+                            _terminate_workers(executor)
+                    while next_index in finished:
+                        yield finished.pop(next_index)
+                        next_index += 1
+                    if overdue:
+                        break
+                suspects.extend(in_flight.values())
+            for i in sorted(suspects):
+                finished[i] = self._parse_file_isolated(file_paths[i])
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+
+    def _watchdog_seconds(self) -> Optional[float]:
+        """Время, после которого файл в пуле считается зависшим. None - не ограничено."""
+        if not self.budget.file_seconds:
+            return None
+        return self.budget.file_seconds + self.WATCHDOG_GRACE
+
+    def _collect_overdue(self, in_flight, started, watchdog, file_paths, finished):
+        """Записывает превышение бюджета для файлов пула, разбираемых дольше watchdog."""
+        if watchdog is None:
+            return []
+        now = time.perf_counter()
+        overdue = [f for f in in_flight if now - started[f] >= watchdog]
+        for future in overdue:
+            i = in_flight.pop(future)
+            error = BudgetExceeded(
+                "file", self.budget.file_seconds, now - started.pop(future)
+            )
+            finished[i] = self._timeout_result(file_paths[i], error)
+        return overdue
+
+    def _parse_file_isolated(self, file_path: str):
+        """Парсит файл в отдельном процессе, чтобы найти файл, роняющий пул."""
+        with ProcessPoolExecutor(max_workers=1, mp_context=_POOL_CONTEXT) as executor:
+            future = executor.submit(
+                _parse_file_task, self, file_path, metrics.active()
+            )
+            started = time.perf_counter()
+            try:
+                return future.result(timeout=self._watchdog_seconds())
+            except TimeoutError:
+                _terminate_workers(executor)
+                error = BudgetExceeded(
+                    "file", self.budget.file_seconds, time.perf_counter() - started
+                )
+                return self._timeout_result(file_path, error)
+            except BrokenProcessPool:
+                return self._error_result(
+                    file_path, RuntimeError("worker process crashed")
+                )
+            except Exception as e:
+                return self._error_result(file_path, e)
+
+    @staticmethod
+    def _error_result(file_path: str, error: Exception):
+        print(f"Error processing file {file_path}: {error}")
+        metrics.count("files.errors")
+        return (defaultdict(set), [f"Error: {str(error)}"], file_path), {}
+
+    @staticmethod
+    def _timeout_result(file_path: str, error: BudgetExceeded):
+        print(f"Timeout processing file {file_path}: {error}")
+        metrics.count("timeouts.file")
+        return (defaultdict(set), [f"{TIMEOUT_PREFIX} {error}"], file_path), {}
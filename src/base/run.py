@@ -1,8 +1,10 @@
 import os
 from logging import Logger
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from base.manager import GraphManager
 from base.storage import GraphStorage
+from util.budget import TimeBudget
+from util.cache import ParseCache
 from logger_config import logger  # Добавляем импорт логгера
 
 
@@ -21,6 +23,9 @@ def process_args(args):
                 - directory_path (str): Путь к директории с SQL-файлами
                 - operators (List[str]): Фильтр операторов для зависимостей
                 - separate_graph (str): "True"/"False" - раздельная визуализация файлов
+                - watch (bool): Обновлять граф директории при изменении файлов
+                - serve (str): Адрес "[HOST:]PORT" сервера запросов к графу
+                - output (str): Файл для выгрузки графа вместо визуализации
 
     Returns:
         None
@@ -43,7 +48,16 @@ def process_args(args):
         - INFO: Выводит список корректировок SQL
         - DEBUG: Детали обработки файлов
     """
-    manager = GraphManager(operators=args.operators, ignore_io=args.ignore_io)
+    ignore_io = args.ignore_io.lower() == "true"
+    manager = GraphManager(
+        operators=args.operators,
+        ignore_io=ignore_io,
+        cache=ParseCache.from_args(args),
+        budget=TimeBudget.from_args(args),
+        dialect=args.dialect,
+        columnar=args.storage == "columnar",
+    )
+    manager.headless = args.headless
     separate = args.separate_graph.lower() == "true"
 
     if args.sql_code:
@@ -53,30 +67,148 @@ def process_args(args):
             logger.info("\nCorrections made:")
             for i, correction in enumerate(corrections, 1):
                 logger.info(f"{i}. {correction}")
-        manager.visualize("Dependencies Graph")
+        if args.cycles is not None:
+            logger.info(manager.report_cycles(args.cycles).format())
+        show_graph(manager, args, "Dependencies Graph")
         return
 
     if args.directory_path:
         directory = args.directory_path
-        if separate:
-            parse_results = manager.parser.parse_directory(directory, sep_parse=True)
+        if args.serve:
+            serve_directory(manager, args)
+        elif args.watch:
+            watch_directory(manager, args, "Full Dependencies Graph")
+        elif separate:
+            parse_results = manager.parser.iter_directory(directory, jobs=args.jobs)
             for dependencies, corrections, file_path in parse_results:
                 logger.debug(f"\nFile: {file_path}")
                 if corrections:
                     logger.info("Corrections made:")
                     for i, correction in enumerate(corrections, 1):
                         logger.info(f"{i}. {correction}")
-                temp_storage = GraphStorage(args.ignore_io)
+                temp_storage = GraphStorage(ignore_io)
                 temp_storage.add_dependencies(dependencies)
-                manager.visualize(
-                    f"Dependencies for {os.path.basename(file_path)}", temp_storage
+                show_graph(
+                    manager,
+                    args,
+                    f"Dependencies for {os.path.basename(file_path)}",
+                    temp_storage,
+                    file_path,
                 )
         else:
-            results = manager.process_directory(directory)
+            if args.incremental:
+                manager.load_state(args.incremental)
+            results = manager.process_directory(
+                directory, jobs=args.jobs, incremental=bool(args.incremental)
+            )
+            if args.incremental:
+                manager.save_state(args.incremental)
             for file_path, corrections in results:
                 logger.debug(f"\nFile: {file_path}")
                 if corrections:
                     logger.info("Corrections made:")
                     for i, correction in enumerate(corrections, 1):
                         logger.info(f"{i}. {correction}")
-            manager.visualize("Full Dependencies Graph")
+            if args.cycles is not None:
+                logger.info(manager.report_cycles(args.cycles).format())
+            show_graph(manager, args, "Full Dependencies Graph")
+
+
+def watch_directory(manager: GraphManager, args, title: str):
+    """Режим --watch: держит граф директории в памяти и перерисовывает его при изменениях.
+
+    После первого разбора заново разбираются только сохраненные, добавленные
+    и удаленные файлы (см. GraphManager.watch), а окно графа обновляется без
+    блокировки (с --output заново выгружается файл). Работает до прерывания (Ctrl+C).
+
+    Args:
+        manager (GraphManager): Менеджер режима (table, field или functional).
+        args: Аргументы командной строки (directory_path, jobs, watch_interval,
+            incremental, cycles, output).
+        title (str): Заголовок графа.
+    """
+    if args.incremental:
+        manager.load_state(args.incremental)
+
+    def refresh(results: List[Tuple[str, List[str]]]):
+        for file_path, corrections in results:
+            logger.debug(f"\nFile: {file_path}")
+            if corrections:
+                logger.info(f"Corrections made in {file_path}:")
+                for i, correction in enumerate(corrections, 1):
+                    logger.info(f"{i}. {correction}")
+        if args.incremental:
+            manager.save_state(args.incremental)
+        if args.cycles is not None:
+            logger.info(manager.report_cycles(args.cycles).format())
+        show_graph(manager, args, title, live=True)
+
+    try:
+        manager.watch(
+            args.directory_path,
+            jobs=args.jobs,
+            interval=args.watch_interval,
+            on_update=refresh,
+            # Only a live window needs its events processed between updates
+            on_idle=(
+                None
+                if manager.headless or args.output
+                else manager.visualizer.flush_events
+            ),
+        )
+    except KeyboardInterrupt:
+        logger.info("Watch stopped")
+
+
+def serve_directory(manager: GraphManager, args):
+    """Режим --serve: отвечает на HTTP-запросы к графу директории (см. LineageServer).
+
+    Args:
+        manager (GraphManager): Менеджер режима (table, field или functional).
+        args: Аргументы командной строки (serve, directory_path, jobs, watch,
+            watch_interval, incremental).
+    """
+    from base.server import LineageServer, parse_address
+
+    if args.incremental:
+        manager.load_state(args.incremental)
+    with LineageServer(
+        manager,
+        args.directory_path,
+        jobs=args.jobs,
+        watch=args.watch,
+        interval=args.watch_interval,
+    ) as server:
+        server.start(parse_address(args.serve))
+        server.wait()
+    if args.incremental:
+        manager.save_state(args.incremental)
+
+
+def show_graph(
+    manager: GraphManager,
+    args,
+    title: str,
+    storage: Optional[GraphStorage] = None,
+    file_path: Optional[str] = None,
+    live: bool = False,
+):
+    """Выгружает граф в --output или, если он не задан, рисует его.
+
+    Args:
+        manager (GraphManager): Менеджер режима.
+        args: Аргументы командной строки (output, output_format).
+        title (str): Заголовок графа.
+        storage (GraphStorage, optional): Хранилище. По умолчанию граф менеджера.
+        file_path (str, optional): SQL-файл раздельного графа: выгрузка пишется
+            в файл рядом с --output, например graph.load.sql.jsonl.
+        live (bool): Перерисовать окно без блокировки (см. GraphManager.visualize).
+    """
+    if not args.output:
+        manager.visualize(title, storage, live=live)
+        return
+    path = args.output
+    if file_path is not None:
+        root, extension = os.path.splitext(path)
+        path = f"{root}.{os.path.basename(file_path)}{extension}"
+    manager.export(path, args.output_format, storage)
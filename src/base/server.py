@@ -0,0 +1,368 @@
+import json
+import os
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from base.parse import WorkerPool
+from logger_config import logger
+from util.lineage import LineageIndex
+from util.metrics import LatencyWindow
+from util.watch import WATCH_INTERVAL
+
+# Имя "файла" для SQL-кода из запросов /sql (синтетические узлы и ключ кеша)
+REQUEST_PATH = "<request>"
+DEFAULT_HOST = "127.0.0.1"
+
+# Parser of a warm pool worker, set once by _init_worker
+_worker_parser = None
+
+
+def _init_worker(parser):
+    """Запоминает парсер в процессе пула и прогревает sqlglot."""
+    global _worker_parser
+    _worker_parser = parser
+    parser.parse_file_local(REQUEST_PATH, sql_code="SELECT 1")
+
+
+def _parse_request(sql_code: str):
+    """Разбирает SQL-код запроса в процессе пула (см. LineageServer.analyze_sql)."""
+    return _worker_parser.parse_file_local(REQUEST_PATH, sql_code=sql_code)
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    """Разбирает адрес вида "[HOST:]PORT" (по умолчанию HOST - 127.0.0.1).
+
+    Raises:
+        ValueError: Если порт не число.
+    """
+    host, _, port = value.rpartition(":")
+    return host or DEFAULT_HOST, int(port)
+
+
+class LineageServer:
+    """HTTP/JSON-сервер, отвечающий на запросы к графу директории из памяти.
+
+    Директория разбирается один раз при запуске, после чего запросы читают
+    LineageIndex - неизменяемый снимок графа. Обновление графа (POST /reload
+    или изменения файлов в режиме watch) выполняется отдельным потоком:
+    он заново разбирает только измененные файлы и подменяет снимок, поэтому
+    читатели не ждут обновления и всегда видят целый граф.
+
+    Файлы при запуске и при каждом обновлении разбираются в пуле процессов
+    (WorkerPool), который запускается один раз, поэтому обновление не ждет
+    запуска интерпретаторов и импорта sqlglot, а бюджет времени оператора
+    и файла соблюдается так же, как при разборе директории с --jobs.
+    SQL-код из /sql при jobs > 1 разбирается в том же пуле.
+
+    Запросы:
+        GET /health - состояние, размер графа и номер снимка;
+        GET /upstream?table=T[&depth=N], GET /downstream?table=T[&depth=N] -
+            узлы выше/ниже по потоку с расстоянием в рёбрах;
+        GET /impact?table=T[&depth=N] - узлы ниже по потоку и читающие их файлы;
+        POST /sql {"sql": "..."} - рёбра и корректировки SQL-кода (граф не меняется);
+        POST /reload - обновить граф по измененным файлам (ответ 202 сразу);
+        GET /stats - перцентили задержки по каждому запросу.
+
+    Attributes:
+        manager (GraphManager): Менеджер, граф которого обслуживается.
+        index (LineageIndex): Текущий снимок графа.
+        generation (int): Номер снимка (растет после каждого обновления).
+        latency (Dict[str, LatencyWindow]): Запрос -> длительности.
+
+    Example:
+        >>> with LineageServer(manager, "./sql_scripts", jobs=4) as server:
+        ...     host, port = server.start()
+        ...     server.wait()
+    """
+
+    ENDPOINTS = ("health", "upstream", "downstream", "impact", "sql", "reload", "stats")
+
+    def __init__(
+        self,
+        manager,
+        directory_path: str,
+        jobs: int = 1,
+        watch: bool = False,
+        interval: float = WATCH_INTERVAL,
+    ):
+        """Создает сервер; граф строится в start().
+
+        Args:
+            manager (GraphManager): Менеджер режима (table, field или functional).
+            directory_path (str): Путь к директории с SQL-файлами.
+            jobs (int): Размер пула для разбора файлов и запросов /sql,
+                0 - по числу ядер. При 1 запросы /sql разбираются в потоке запроса.
+            watch (bool): Обновлять граф при изменении файлов (см. GraphManager.watch).
+            interval (float): Период проверки запросов /reload и опроса
+                файлов в режиме watch, в секундах.
+        """
+        self.manager = manager
+        self.directory_path = directory_path
+        self.jobs = jobs
+        self.watch = watch
+        self.interval = interval
+        self.index = LineageIndex()
+        self.generation = 0
+        self.latency = {endpoint: LatencyWindow() for endpoint in self.ENDPOINTS}
+        self._reload = threading.Event()
+        self._stop = threading.Event()
+        self._reloading = False
+        self._pool = None
+        self._httpd = None
+        self._threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self, address: Tuple[str, int] = (DEFAULT_HOST, 0)) -> Tuple[str, int]:
+        """Строит граф, запускает пул, поток обновлений и HTTP-сервер в фоне.
+
+        Args:
+            address (Tuple[str, int]): (хост, порт); порт 0 - любой свободный.
+
+        Returns:
+            Tuple[str, int]: Адрес, на котором принимаются запросы.
+        """
+        self._pool = WorkerPool(
+            self.jobs or os.cpu_count() or 1,
+            initializer=_init_worker,
+            initargs=(self.manager.parser,),
+        )
+        # Start every worker now instead of on the first files or requests
+        self._pool.start()
+        results = self.manager.process_directory(
+            self.directory_path, jobs=self.jobs, incremental=True, pool=self._pool
+        )
+        self._publish(results)
+
+        self._httpd = ThreadingHTTPServer(address, _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.lineage = self
+        self._threads = [
+            threading.Thread(target=self._update_loop, name="lineage-update"),
+            threading.Thread(target=self._httpd.serve_forever, name="lineage-http"),
+        ]
+        for thread in self._threads:
+            thread.start()
+        host, port = self._httpd.server_address[:2]
+        logger.info(f"Lineage server listening on http://{host}:{port}")
+        return host, port
+
+    def wait(self):
+        """Блокирует поток до close() или прерывания (Ctrl+C)."""
+        try:
+            while not self._stop.wait(self.interval):
+                pass
+        except KeyboardInterrupt:
+            logger.info("Lineage server stopped")
+
+    def close(self):
+        """Останавливает HTTP-сервер, поток обновлений и пул."""
+        self._stop.set()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def _publish(self, results=None):
+        """Строит новый снимок графа и подменяет им текущий."""
+        index = LineageIndex.from_storage(self.manager.storage)
+        self.index = index
+        self.generation += 1
+        logger.info(
+            f"Lineage snapshot {self.generation}: {len(index.nodes)} nodes, "
+            f"{index.edges} edges"
+        )
+
+    def _update_loop(self):
+        """Единственный поток, изменяющий граф менеджера."""
+        if self.watch:
+            self.manager.watch(
+                self.directory_path,
+                jobs=self.jobs,
+                interval=self.interval,
+                on_update=self._publish,
+                on_idle=self._reload_if_requested,
+                stop=self._stop,
+                pool=self._pool,
+            )
+            return
+        while not self._stop.is_set():
+            if self._reload.wait(self.interval):
+                self._reload_if_requested()
+
+    def _reload_if_requested(self):
+        if not self._reload.is_set():
+            return
+        self._reload.clear()
+        self._reloading = True
+        try:
+            results = self.manager.process_directory(
+                self.directory_path, jobs=self.jobs, incremental=True, pool=self._pool
+            )
+            self._publish(results)
+        except Exception as e:
+            logger.error(f"Reload of {self.directory_path} failed: {e}")
+        finally:
+            self._reloading = False
+
+    def request_reload(self):
+        """Просит поток обновлений перечитать измененные файлы (не ждет его)."""
+        self._reload.set()
+
+    def analyze_sql(self, sql_code: str) -> dict:
+        """Разбирает SQL-код, не изменяя граф.
+
+        Returns:
+            dict: {"edges": [{"source", "target", "operation"}, ...],
+                "corrections": [...]}.
+        """
+        if self._pool is not None and self._pool.jobs > 1:
+            result, _ = self._pool.executor.submit(_parse_request, sql_code).result()
+        else:
+            result, _ = self.manager.parser.parse_file_local(
+                REQUEST_PATH, sql_code=sql_code
+            )
+        dependencies, corrections, _ = result
+        edges = sorted(
+            {
+                (str(edge.source), str(target), edge.op_type.__name__)
+                for target, target_edges in dependencies.items()
+                for edge in target_edges
+            }
+        )
+        return {
+            "edges": [
+                {"source": source, "target": target, "operation": operation}
+                for source, target, operation in edges
+            ],
+            "corrections": corrections,
+        }
+
+    def health(self) -> dict:
+        index = self.index
+        return {
+            "status": "ok",
+            "nodes": len(index.nodes),
+            "edges": index.edges,
+            "generation": self.generation,
+            "reloading": self._reloading or self._reload.is_set(),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "latency": {
+                endpoint: {"count": window.count, **window.percentiles()}
+                for endpoint, window in self.latency.items()
+            },
+        }
+
+
+class _RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Обработчик HTTP-запросов LineageServer."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _handle(self, method: str):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        endpoint = url.path.strip("/")
+        server = self.server.lineage
+        try:
+            status, body = self._dispatch(server, method, endpoint, parse_qs(url.query))
+        except _RequestError as e:
+            status, body = e.status, {"error": str(e)}
+        except Exception as e:
+            logger.error(f"Lineage request {self.path} failed: {e}")
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if endpoint in server.latency:
+            server.latency[endpoint].record(time.perf_counter() - started)
+
+    def _dispatch(self, server: LineageServer, method: str, endpoint: str, query):
+        if method == "POST":
+            payload = self._read_json()
+            if endpoint == "sql":
+                sql_code = payload.get("sql")
+                if not isinstance(sql_code, str):
+                    raise _RequestError(HTTPStatus.BAD_REQUEST, "'sql' is required")
+                return HTTPStatus.OK, server.analyze_sql(sql_code)
+            if endpoint == "reload":
+                server.request_reload()
+                return HTTPStatus.ACCEPTED, {"status": "reloading"}
+        elif endpoint == "health":
+            return HTTPStatus.OK, server.health()
+        elif endpoint == "stats":
+            return HTTPStatus.OK, server.stats()
+        elif endpoint in ("upstream", "downstream", "impact"):
+            # One snapshot per request even if a reload publishes a new one
+            index = server.index
+            table, depth = self._table_query(query)
+            if table not in index:
+                raise _RequestError(HTTPStatus.NOT_FOUND, f"unknown table {table!r}")
+            if endpoint == "impact":
+                return HTTPStatus.OK, {"table": table, **index.impact(table, depth)}
+            return HTTPStatus.OK, {
+                "table": table,
+                endpoint: getattr(index, endpoint)(table, depth),
+            }
+        raise _RequestError(
+            HTTPStatus.NOT_FOUND, f"unknown request {method} /{endpoint}"
+        )
+
+    @staticmethod
+    def _table_query(query) -> Tuple[str, Optional[int]]:
+        table = query.get("table", [None])[0]
+        if not table:
+            raise _RequestError(HTTPStatus.BAD_REQUEST, "'table' is required")
+        depth = query.get("depth", [None])[0]
+        try:
+            return table, None if depth is None else int(depth)
+        except ValueError:
+            raise _RequestError(HTTPStatus.BAD_REQUEST, f"invalid depth {depth!r}")
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise _RequestError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise _RequestError(HTTPStatus.BAD_REQUEST, "JSON object expected")
+        return payload
@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
 from sqlglot.expressions import (
     Update,
     Insert,
@@ -33,6 +33,7 @@ class GraphStorage:
         nodes (set): Множество узлов графа (имена таблиц/сущностей).
         edges (list): Список рёбер графа в формате (источник, цель, метаданные).
         operator_filter (set): Фильтр типов операторов для отображения.
+        file_edges (defaultdict): Рёбра, добавленные из каждого файла (источник рёбер).
 
         COLORS (dict): Сопоставление типов операторов с цветами для визуализации.
             Пример: `{Insert: "red", Select: "purple"}`
@@ -87,6 +88,9 @@ class GraphStorage:
         self.edges = []
         self.operator_filter = None
         self.ignore_io = ignore_io
+        self.file_edges = defaultdict(list)
+        self.file_nodes = defaultdict(Counter)
+        self._node_refs = Counter()
         logger.debug("GraphStorage initialized")
 
     def set_operator_filter(self, operators: Optional[str] = None):
@@ -116,12 +120,16 @@ class GraphStorage:
 
         logger.info(f"Operator filter set to: {', '.join(operator_names)}")
 
-    def add_dependencies(self, dependencies: defaultdict):
+    def add_dependencies(
+        self, dependencies: defaultdict, source_file: Optional[str] = None
+    ):
         """Добавляет зависимости в хранилище.
 
         Args:
             dependencies (defaultdict): Зависимости в формате:
                 {цель: [Edge(source, target, op), ...]}
+            source_file (str, optional): Файл, из которого получены зависимости.
+                Позволяет потом удалить его вклад через remove_files().
 
         Example:
             >>> dependencies = defaultdict(set)
@@ -129,46 +137,103 @@ class GraphStorage:
             >>> storage.add_dependencies(dependencies)
         """
         for to_table, edges in dependencies.items():
-            if self.ignore_io and "unknown" in to_table:
+            if self.ignore_io and "unknown" in str(to_table):
                 continue
-            self.nodes.add(to_table)
+            self._add_node(to_table, source_file)
             for edge in edges:
-                if self.ignore_io and "unknown" in edge.source:
+                if self.ignore_io and "unknown" in str(edge.source):
                     continue
                 if (
                     hasattr(self, "operator_filter")  # Check if attribute exists
                     and self.operator_filter is not None
-                    and type(edge.op) not in self.operator_filter
+                    and edge.op_type not in self.operator_filter
                 ):
                     logger.debug(f"Skipping edge {edge} due to operator filter")
                     continue
-                self.nodes.add(edge.source)
-                op = edge.op
-                op_name = type(op).__name__
-                op_color = self.COLORS.get(type(op), "gray")
-
-                edge_data = {"operation": op_name, "color": op_color}
-
-                if edge.is_internal_update:
-                    edge_data["operation"] = "InternalUpdate"
-                    edge_data["style"] = (
-                        "dashed"  # Use dashed line style for self-updates
-                    )
-
-                elif isinstance(op, Join):
-                    edge_data["operation"] = "Join"
-                elif isinstance(op, Table):
-                    edge_data["operation"] = "Reference"
-
-                if edge.is_recursive:
-                    edge_data["style"] = (
-                        "dotted"  # Use dotted line for recursive relationships
-                    )
-                    edge_data["operation"] = "Recursive"
-
-                self.edges.append((edge.source, to_table, edge_data))
+                self._add_node(edge.source, source_file)
+                edge_data = self._edge_data(
+                    edge.op_type, edge.is_internal_update, edge.is_recursive
+                )
+                self._add_edge(edge.source, to_table, edge_data, source_file)
         logger.info(f"Added {len(dependencies)} dependencies")
 
+    def _edge_data(
+        self, op_type: Type, is_internal_update: bool, is_recursive: bool
+    ) -> dict:
+        """Строит метаданные ребра для визуализации.
+
+        Returns:
+            dict: {"operation": имя операции, "color": цвет, ["style": стиль линии]}
+        """
+        edge_data = {
+            "operation": op_type.__name__,
+            "color": self.COLORS.get(op_type, "gray"),
+        }
+
+        if is_internal_update:
+            edge_data["operation"] = "InternalUpdate"
+            edge_data["style"] = "dashed"  # Use dashed line style for self-updates
+
+        elif issubclass(op_type, Join):
+            edge_data["operation"] = "Join"
+        elif issubclass(op_type, Table):
+            edge_data["operation"] = "Reference"
+
+        if is_recursive:
+            edge_data["style"] = "dotted"  # Use dotted line for recursive relationships
+            edge_data["operation"] = "Recursive"
+        return edge_data
+
+    def _add_node(self, node: str, source_file: Optional[str] = None):
+        self.nodes.add(node)
+        self._node_refs[node] += 1
+        self.file_nodes[source_file][node] += 1
+
+    def _add_edge(
+        self, source: str, target: str, data: dict, source_file: Optional[str] = None
+    ):
+        edge = (source, target, data)
+        self.edges.append(edge)
+        self.file_edges[source_file].append(edge)
+
+    def remove_files(self, source_files):
+        """Удаляет из графа узлы и рёбра, добавленные из указанных файлов.
+
+        Узел удаляется, только если его не добавлял ни один другой файл.
+
+        Args:
+            source_files (Iterable[str]): Файлы, переданные ранее в add_dependencies().
+
+        Example:
+            >>> storage.add_dependencies(deps, source_file="etl/load.sql")
+            >>> storage.remove_files(["etl/load.sql"])
+        """
+        removed_edges = set()
+        for source_file in source_files:
+            removed_edges.update(map(id, self.file_edges.pop(source_file, [])))
+            for node, count in self.file_nodes.pop(source_file, {}).items():
+                self._node_refs[node] -= count
+                if self._node_refs[node] <= 0:
+                    del self._node_refs[node]
+                    self.nodes.discard(node)
+        if removed_edges:
+            self.edges[:] = [e for e in self.edges if id(e) not in removed_edges]
+        logger.debug(f"Removed {len(removed_edges)} edges from {source_files}")
+
+    def iter_file_edges(self):
+        """Перебирает рёбра вместе с файлами, из которых они добавлены.
+
+        Фильтры не применяются: рёбра, которые видны на графе, перебирает
+        iter_filtered_edges().
+
+        Yields:
+            Tuple[Optional[str], Hashable, Hashable, dict]: (файл, источник,
+                цель, метаданные). Файл None - ребро добавлено без source_file.
+        """
+        for source_file, edges in self.file_edges.items():
+            for source, target, data in edges:
+                yield source_file, source, target, data
+
     def clear(self):
         """Очищает все данные хранилища.
 
@@ -177,6 +242,9 @@ class GraphStorage:
         """
         self.nodes.clear()
         self.edges.clear()
+        self.file_edges.clear()
+        self.file_nodes.clear()
+        self._node_refs.clear()
         logger.debug("GraphStorage cleared")
 
     def get_filtered_nodes_edges(self):
@@ -192,15 +260,7 @@ class GraphStorage:
             return self.nodes, self.edges
 
         # If we have a filter, we need to recalculate the nodes that should be visible
-        filtered_edges = []
-        for source, target, data in self.edges:
-            # Check if this edge's operation type is in our filter
-            # The operation name is stored in the data dict
-            op_name = data.get("operation", "")
-            for op_class in self.operator_filter:
-                if op_class.__name__ == op_name:
-                    filtered_edges.append((source, target, data))
-                    break
+        filtered_edges = list(self.iter_filtered_edges())
 
         # Only include nodes that are connected by at least one visible edge
         visible_nodes = set()
@@ -210,43 +270,143 @@ class GraphStorage:
 
         return visible_nodes, filtered_edges
 
+    def iter_filtered_edges(self):
+        """Перебирает рёбра get_filtered_nodes_edges(), не строя их список.
+
+        Yields:
+            Tuple[Hashable, Hashable, dict]: (источник, цель, метаданные).
+        """
+        if not self.operator_filter:
+            yield from self.edges
+            return
+        # The operation name is stored in the data dict
+        names = {op_class.__name__ for op_class in self.operator_filter}
+        for edge in self.edges:
+            if edge[2].get("operation", "") in names:
+                yield edge
+
+    def get_filtered_nodes(self) -> set:
+        """Узлы get_filtered_nodes_edges() без построения списка рёбер."""
+        if not self.operator_filter:
+            return self.nodes
+        return {
+            node
+            for source, target, _ in self.iter_filtered_edges()
+            for node in (source, target)
+        }
+
 
 class Edge:
     """Представляет ребро графа зависимостей между двумя сущностями.
 
+    Ребро не ссылается на AST: вместо узла операции хранится ее тип, а для
+    режима колонок - уже извлеченные колонки. Ребра сравниваются и хешируются
+    по значению, поэтому множество ребер не содержит дубликатов. Ребро
+    неизменяемо по смыслу: для изменения используется replace().
+
     Attributes:
         source (str): Источник зависимости (таблица/сущность).
         target (str): Цель зависимости.
-        op (Union[DML, Select]): Операция, вызывающая зависимость.
+        op_type (type): Тип операции, вызывающей зависимость (например, Insert).
+        columns (Optional[tuple]): Колонки операции (см. field.columns.edge_columns).
         is_internal_update (bool): Флаг внутреннего обновления.
         is_recursive (bool): Флаг рекурсивной зависимости.
 
     Example:
         >>> edge = Edge("users", "orders", Insert())
-        >>> edge.is_recursive = True
+        >>> edge.op_type
+        <class 'sqlglot.expressions.Insert'>
+        >>> edge.replace(is_recursive=True) == edge
+        False
     """
 
+    __slots__ = (
+        "source",
+        "target",
+        "op_type",
+        "columns",
+        "is_internal_update",
+        "is_recursive",
+    )
+
     def __init__(
         self,
         from_table: str,
         to_table: str,
-        op: Union[DML, Select],
+        op: Union[DML, Select, Type],
         is_internal_update=False,
+        is_recursive=False,
+        columns=None,
     ):
         """Инициализирует ребро зависимости.
 
         Args:
             from_table (str): Источник зависимости.
             to_table (str): Цель зависимости.
-            op (Union[DML, Select]): Операция (например, Insert, Select).
+            op (Union[DML, Select, type]): Операция (например, Insert, Select) или ее тип.
+                Сохраняется только тип.
             is_internal_update (bool, optional): Внутреннее обновление. По умолчанию False.
+            is_recursive (bool, optional): Рекурсивная зависимость. По умолчанию False.
+            columns (tuple, optional): Колонки операции для режима колонок.
         """
-        self.source = from_table  # Изменяем имя атрибута для согласованности
-        self.target = to_table  # Изменяем имя атрибута для согласованности
-        self.op = op
+        self.source = from_table
+        self.target = to_table
+        self.op_type = op if isinstance(op, type) else type(op)
+        self.columns = columns
         self.is_internal_update = is_internal_update
-        self.is_recursive = False
-        logger.debug(f"Edge created: {from_table} -> {to_table}")
+        self.is_recursive = is_recursive
+
+    def replace(self, **changes) -> "Edge":
+        """Возвращает копию ребра с измененными полями.
+
+        Example:
+            >>> Edge("a", "b", Insert()).replace(source="c")
+            Edge(c -> b, Insert, normal)
+        """
+        values = {
+            "from_table": self.source,
+            "to_table": self.target,
+            "op": self.op_type,
+            "is_internal_update": self.is_internal_update,
+            "is_recursive": self.is_recursive,
+            "columns": self.columns,
+        }
+        for name, value in changes.items():
+            values[{"source": "from_table", "target": "to_table"}.get(name, name)] = (
+                value
+            )
+        return Edge(**values)
+
+    def _key(self):
+        return (
+            self.source,
+            self.target,
+            self.op_type,
+            self.columns,
+            self.is_internal_update,
+            self.is_recursive,
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, Edge):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __getstate__(self):
+        return self._key()
+
+    def __setstate__(self, state):
+        (
+            self.source,
+            self.target,
+            self.op_type,
+            self.columns,
+            self.is_internal_update,
+            self.is_recursive,
+        ) = state
 
     def __repr__(self):
         """Возвращает строковое представление ребра.
@@ -259,7 +419,7 @@ class Edge:
             >>> print(Edge("a", "b", Insert()))
             Edge(a -> b, Insert, normal)
         """
-        op_type = type(self.op).__name__
+        op_type = self.op_type.__name__
         status = "internal" if self.is_internal_update else "normal"
         recursive_status = " (recursive)" if self.is_recursive else ""
         return f"Edge({self.source} -> {self.target}, {op_type}, {status}{recursive_status})"
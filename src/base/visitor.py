@@ -0,0 +1,169 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from sqlglot.expressions import CTE, Expression, Merge, Select, Subquery, Table
+
+from util import metrics
+
+# Clauses of a processed query whose whole subtree is searched for table
+# references and nested queries.
+_DEFAULT_REGION_ARGS = ("where", "group", "having", "order")
+_REGION_ARGS = {
+    Select: _DEFAULT_REGION_ARGS + ("expressions",),
+    Merge: _DEFAULT_REGION_ARGS + ("on",),
+}
+
+
+class DependencyVisitor:
+    """Извлекает зависимости оператора за один обход его AST.
+
+    Каждый узел посещается один раз. Для узла хранится набор контекстов
+    (целевая таблица, внутри ли узел "области поиска"). Контекст оператора
+    создается для корня, контекст CTE - при входе в тело зарегистрированного CTE,
+    поэтому тела CTE не обходятся повторно.
+
+    Правила:
+        - обрабатываемый запрос (корень, Select или тело Subquery внутри области)
+          дает ребра из FROM, USING (MERGE) и JOIN;
+        - WHERE, GROUP BY, HAVING, ORDER BY, список SELECT, условия JOIN и ON
+          (MERGE) обрабатываемого запроса становятся областью поиска;
+        - таблица внутри области, а также ссылка на CTE в любом месте дают ребро
+          с узлом Table в качестве операции.
+
+    Attributes:
+        ast (SqlAst): Анализатор, чьи имена таблиц, CTE и счетчики используются.
+        dependencies (defaultdict): Граф зависимостей для заполнения.
+
+    Example:
+        >>> visitor = DependencyVisitor(ast, dependencies)
+        >>> visitor.visit(statement, "orders", roots=[statement.expression])
+    """
+
+    def __init__(self, ast, dependencies: defaultdict):
+        self.ast = ast
+        self.dependencies = dependencies
+        self._node_handlers = {
+            Table: self._visit_table,
+            CTE: self._visit_cte,
+        }
+
+    def visit(
+        self,
+        statement: Expression,
+        to_table: Optional[str],
+        roots: Iterable[Expression] = (),
+    ):
+        """Обходит оператор и добавляет найденные зависимости.
+
+        Args:
+            statement (Expression): Корневой узел оператора.
+            to_table (str, optional): Цель оператора. None - учитываются только
+                тела CTE (оператор сам по себе зависимостей не дает).
+            roots (Iterable[Expression]): Дополнительные узлы оператора, которые
+                обрабатываются как запросы с той же целью (например, SELECT в
+                INSERT ... SELECT).
+        """
+        self._roots: Dict[int, Set[str]] = defaultdict(set)
+        self._regions: Dict[int, Set[str]] = defaultdict(set)
+        self._recursive_targets = set()
+
+        contexts = ()
+        if to_table is not None:
+            contexts = ((to_table, False),)
+            for root in (statement, *roots):
+                if root is not None:
+                    self._roots[id(root)].add(to_table)
+        elif not self.ast.cte_definitions:
+            return
+
+        metrics.count("walk.visits")
+        nodes = 0
+        stack = [(statement, contexts)]
+        while stack:
+            node, contexts = stack.pop()
+            nodes += 1
+            regions = self._regions.get(id(node))
+            if regions:
+                contexts = tuple(
+                    (target, in_region or target in regions)
+                    for target, in_region in contexts
+                )
+            handler = self._node_handlers.get(type(node))
+            if handler is not None:
+                contexts = handler(node, contexts)
+
+            query_targets = self._roots.get(id(node), ())
+            for target, in_region in contexts:
+                if target in query_targets or (in_region and self._is_query(node)):
+                    self._process_query(node, target)
+
+            stack.extend(
+                (child, contexts) for child in node.iter_expressions(reverse=True)
+            )
+        metrics.count("walk.nodes", nodes)
+
+        for target in self._recursive_targets:
+            edges = self.dependencies[target]
+            for edge in [edge for edge in edges if edge.source == target]:
+                edges.discard(edge)
+                edges.add(edge.replace(is_recursive=True))
+
+    @staticmethod
+    def _is_query(node: Expression) -> bool:
+        return isinstance(node, Select) or (
+            isinstance(node.parent, Subquery) and node.arg_key == "this"
+        )
+
+    def _process_query(self, query: Expression, target: str):
+        """Добавляет ребра FROM/USING/JOIN запроса и отмечает его области поиска."""
+        ast = self.ast
+        args = query.args
+
+        if args.get("from") is not None:
+            self._add(ast.make_edge(ast.get_table_name(args["from"]), target, query))
+
+        if isinstance(query, Merge) and args.get("using"):
+            self._add(ast.make_edge(ast.get_table_name(args["using"]), target, query))
+
+        for join_node in args.get("joins") or ():
+            if "this" in join_node.args:
+                join_table = ast.get_table_name(join_node.args["this"])
+                self._add(ast.make_edge(join_table, target, join_node))
+                if join_node.args.get("on"):
+                    self._regions[id(join_node.args["on"])].add(target)
+
+        for arg in _REGION_ARGS.get(type(query), _DEFAULT_REGION_ARGS):
+            value = args.get(arg)
+            if not value:
+                continue
+            for region in value if isinstance(value, list) else (value,):
+                if isinstance(region, Expression):
+                    self._regions[id(region)].add(target)
+
+    def _add(self, edge):
+        self.dependencies[edge.target].add(edge)
+
+    def _visit_table(self, node: Table, contexts):
+        if not contexts:
+            return contexts
+        table_name = self.ast.get_table_name(node)
+        is_cte = table_name in self.ast.cte_definitions
+        for target, in_region in contexts:
+            if is_cte or in_region:
+                self._add(self.ast.make_edge(table_name, target, node))
+            if is_cte and target == table_name and target in self.ast.recursive_ctes:
+                self._recursive_targets.add(target)
+        return contexts
+
+    def _visit_cte(self, node: CTE, contexts):
+        cte_name = node.args["alias"].args["this"]
+        definition = node.args.get("this")
+        if self.ast.cte_definitions.get(cte_name) is not node:
+            return contexts
+
+        if definition:
+            self._roots[id(definition)].add(cte_name)
+        if cte_name in self.ast.recursive_ctes:
+            recursive_edge = self.ast.make_edge(cte_name, cte_name, node)
+            self._add(recursive_edge.replace(is_recursive=True))
+        return contexts + ((cte_name, False),)
@@ -1,3 +1,4 @@
+import time
 from collections import defaultdict
 import networkx as nx
 import matplotlib.pyplot as plt
@@ -5,6 +6,7 @@ import numpy as np
 from typing import Optional
 from base.storage import GraphStorage
 from logger_config import logger
+from util import metrics
 from matplotlib.patches import FancyArrowPatch
 
 
@@ -63,6 +65,7 @@ class GraphVisualizer:
         seed: Optional[int] = 42,
         central_spread: float = 2.0,
         peripheral_spread: float = 1.5,
+        live: bool = False,
     ):
         """Визуализирует граф зависимостей и отображает/сохраняет результат.
 
@@ -74,6 +77,8 @@ class GraphVisualizer:
             seed (int, optional): Seed для воспроизводимости расположения узлов.
             central_spread (float): Коэффициент расстояния между центральными узлами.
             peripheral_spread (float): Коэффициент расстояния для периферийных узлов.
+            live (bool): Не блокировать выполнение: окно графа остается открытым,
+                а следующий вызов с live=True перерисовывает его (режим --watch).
 
         Returns:
             None
@@ -89,8 +94,7 @@ class GraphVisualizer:
             >>> visualizer.render(storage, title="Data Pipeline", save_path="pipeline.png", figsize=(15, 10), seed=123, central_spread=3.0)
         """
         self.pressed = None
-        self.fig, self.ax = plt.subplots(figsize=figsize)
-        self.fig.canvas.mpl_connect("pick_event", self._on_pick)
+        self._open_figure(figsize, live)
         nodes, edges = storage.get_filtered_nodes_edges()
 
         if not storage.nodes:
@@ -108,6 +112,7 @@ class GraphVisualizer:
             f"Created graph with {self.G.number_of_nodes()} nodes and {self.G.number_of_edges()} edges"
         )
 
+        layout_started = time.perf_counter()
         # Классификация узлов
         central_nodes = [
             n
@@ -157,6 +162,9 @@ class GraphVisualizer:
                 if norm > 0:
                     self.pos[node] = (x * peripheral_spread, y * peripheral_spread)
 
+        metrics.add_time("render.layout", time.perf_counter() - layout_started)
+
+        draw_started = time.perf_counter()
         # настройка визуальных параметров
         edge_colors = [
             data["color"] for u, v, k, data in self.G.edges(keys=True, data=True)
@@ -220,6 +228,7 @@ class GraphVisualizer:
         }
         for txt in self.node_labels.values():
             txt.set_picker(5)
+        metrics.add_time("render.draw", time.perf_counter() - draw_started)
 
         # Set title
         plt.title(title or "SQL Dependency Graph")
@@ -227,8 +236,12 @@ class GraphVisualizer:
 
         # Save or show
         if save_path:
-            plt.savefig(save_path, format="png", dpi=300, bbox_inches="tight")
+            with metrics.timer("render.save"):
+                plt.savefig(save_path, format="png", dpi=300, bbox_inches="tight")
             logger.info(f"Graph saved to {save_path}")
+        elif live:
+            self._show_live()
+            return
         else:
             plt.tight_layout()
             plt.show()
@@ -236,6 +249,29 @@ class GraphVisualizer:
         plt.close()
         logger.debug("Graph rendering completed")
 
+    def _open_figure(self, figsize: tuple, live: bool = False):
+        """Создает холст графа; в режиме live очищает уже открытое окно."""
+        if live and self.fig is not None and plt.fignum_exists(self.fig.number):
+            # Redraw the open window instead of opening a new one on every update
+            plt.figure(self.fig.number)
+            self.fig.clear()
+            self.ax = self.fig.add_subplot()
+            return
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+        self.fig.canvas.mpl_connect("pick_event", self._on_pick)
+
+    def _show_live(self):
+        """Показывает окно графа без блокировки."""
+        plt.tight_layout()
+        plt.show(block=False)
+        plt.pause(0.001)
+        logger.debug("Graph rendering completed")
+
+    def flush_events(self):
+        """Обрабатывает события открытого окна графа между обновлениями (режим live)."""
+        if self.fig is not None and plt.fignum_exists(self.fig.number):
+            self.fig.canvas.flush_events()
+
     def _on_pick(self, event):
         art = event.artist
         # реагируем только на полностью непрозрачные текст-лейблы нод
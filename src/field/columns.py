@@ -77,6 +77,29 @@ def parse_columns(op: Expression) -> Tuple[Optional[List[str]], Optional[List[st
         return (None, None)
 
 
+def edge_columns(op: Expression) -> Optional[Tuple[Optional[tuple], Optional[tuple]]]:
+    """Извлекает колонки операции в виде, пригодном для хранения в ребре.
+
+    То же, что parse_columns(), но списки заменены кортежами, поэтому
+    результат можно хешировать и он не ссылается на AST.
+
+    Args:
+        op (Expression): SQL-выражение для анализа.
+
+    Returns:
+        Optional[tuple]: (колонки | None, колонки WHERE | None) или None,
+            если тип операции не поддерживается.
+
+    Example:
+        >>> edge_columns(sqlglot.parse_one("INSERT INTO t (a) VALUES (1)"))
+        (('a:input',), None)
+    """
+    columns = parse_columns(op)
+    if columns is None:
+        return None
+    return tuple(None if part is None else tuple(part) for part in columns)
+
+
 def _this_deep_parse(op, prior=None, typesearch=str, star_except=True) -> str:
     """Рекурсивно извлекает имя колонки/таблицы из выражения.
 
@@ -10,7 +10,6 @@ from sqlglot.expressions import (
     Join,
     Expression,
 )
-from field.columns import parse_columns
 from logger_config import logger
 
 
@@ -27,12 +26,13 @@ class ColumnStorage(GraphStorage):
         COLORS (dict): Цвета для визуализации операций (наследуется от GraphStorage)
     """
 
-    def add_dependencies(self, dependencies: defaultdict):
+    def add_dependencies(self, dependencies: defaultdict, source_file=None):
         """Добавляет зависимости в хранилище с анализом колонок.
 
         Args:
             dependencies (defaultdict): Зависимости в формате:
                 {"target_table": [Edge(source, target, op),...]}
+            source_file (str, optional): Файл, из которого получены зависимости.
 
         Raises:
             TypeError: Если передан неверный тип зависимостей
@@ -45,12 +45,12 @@ class ColumnStorage(GraphStorage):
         """
 
         for to_table, edges in dependencies.items():
-            self.nodes.add(to_table)
+            self._add_node(to_table, source_file)
             for edge in edges:
-                self.nodes.add(edge.source)
-                op = edge.op
-                op_name = type(op).__name__
-                op_color = self.COLORS.get(type(op), "gray")
+                self._add_node(edge.source, source_file)
+                op_type = edge.op_type
+                op_name = op_type.__name__
+                op_color = self.COLORS.get(op_type, "gray")
 
                 # Создаем словарь с метаданными для ребра
                 edge_data = {"operation": op_name, "color": op_color}
@@ -60,11 +60,11 @@ class ColumnStorage(GraphStorage):
                         "dashed"  # Use dashed line style for self-updates
                     )
                 # Упрощаем отображение для JOIN - всегда "Join"
-                elif isinstance(op, Join):
+                elif issubclass(op_type, Join):
                     edge_data["operation"] = "Join"
 
                 # Упрощаем отображение для прямых ссылок на таблицы
-                elif isinstance(op, Table):
+                elif issubclass(op_type, Table):
                     edge_data["operation"] = "Reference"
 
                 if edge.is_recursive:
@@ -73,9 +73,10 @@ class ColumnStorage(GraphStorage):
                     )
                     edge_data["operation"] = "Recursive"
 
-                if isinstance(op, Expression) and not isinstance(op, Table):
-                    edge_data["columns"] = parse_columns(op)
+                if issubclass(op_type, Expression) and not issubclass(op_type, Table):
+                    # Columns are extracted by SqlAst(columns=True)
+                    edge_data["columns"] = edge.columns
                     if edge_data["columns"] is None:
-                        logger.warning(f"Type of invalid input: {type(op)}")
+                        logger.warning(f"Type of invalid input: {op_type}")
 
-                self.edges.append((edge.source, to_table, edge_data))
+                self._add_edge(edge.source, to_table, edge_data, source_file)
@@ -1,3 +1,5 @@
+import time
+
 import networkx as nx
 from typing import Optional
 from matplotlib import pyplot as plt
@@ -5,6 +7,7 @@ import numpy as np
 from base.storage import GraphStorage
 from base.visualize import GraphVisualizer
 from logger_config import logger
+from util import metrics
 from matplotlib.patches import FancyArrowPatch
 
 
@@ -35,6 +38,7 @@ class ColumnVisualizer(GraphVisualizer):
         seed: Optional[int] = 42,
         central_spread: float = 2.0,
         peripheral_spread: float = 1.5,
+        live: bool = False,
     ):
         """Визуализирует граф зависимостей с возможностью интерактивного взаимодействия.
 
@@ -46,6 +50,8 @@ class ColumnVisualizer(GraphVisualizer):
             seed (int, optional): Seed для воспроизводимости расположения узлов.
             central_spread (float): Коэффициент расстояния между центральными узлами.
             peripheral_spread (float): Коэффициент расстояния для периферийных узлов.
+            live (bool): Не блокировать выполнение и перерисовывать открытое окно
+                (см. GraphVisualizer.render).
 
         Raises:
             RuntimeError: Если визуализация невозможна в текущем окружении
@@ -67,8 +73,7 @@ class ColumnVisualizer(GraphVisualizer):
         self.last_uv = ()
         self.last_ann = None
         self.pressed_edge = None
-        self.fig, self.ax = plt.subplots(figsize=figsize)
-        self.fig.canvas.mpl_connect("pick_event", self._on_pick)
+        self._open_figure(figsize, live)
         nodes, edges = storage.get_filtered_nodes_edges()
 
         if not storage.nodes:
@@ -86,6 +91,7 @@ class ColumnVisualizer(GraphVisualizer):
             f"Created graph with {self.G.number_of_nodes()} nodes and {self.G.number_of_edges()} edges"
         )
 
+        layout_started = time.perf_counter()
         # Классификация узлов
         central_nodes = [
             n
@@ -135,6 +141,9 @@ class ColumnVisualizer(GraphVisualizer):
                 if norm > 0:
                     self.pos[node] = (x * peripheral_spread, y * peripheral_spread)
 
+        metrics.add_time("render.layout", time.perf_counter() - layout_started)
+
+        draw_started = time.perf_counter()
         # стиль рёбер
         edge_colors = [
             data["color"] for u, v, k, data in self.G.edges(keys=True, data=True)
@@ -199,14 +208,19 @@ class ColumnVisualizer(GraphVisualizer):
             txt.set_picker(5)
         for txt in self.edge_label_texts.values():
             txt.set_picker(5)
+        metrics.add_time("render.draw", time.perf_counter() - draw_started)
 
         plt.title(title or "SQL Dependency Graph with columns")
         plt.axis("off")
 
         # Save or show
         if save_path:
-            plt.savefig(save_path, format="png", dpi=300, bbox_inches="tight")
+            with metrics.timer("render.save"):
+                plt.savefig(save_path, format="png", dpi=300, bbox_inches="tight")
             logger.info(f"Graph saved to {save_path}")
+        elif live:
+            self._show_live()
+            return
         else:
             plt.tight_layout()
             plt.show()
@@ -1,16 +1,22 @@
-import re
 import os
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import Optional, List, Tuple, Set, Dict
 from base.storage import BuffRead, BuffWrite, Edge, GraphStorage
-from base.parse import DirectoryParser, SqlAst
-from base.visualize import GraphVisualizer
+from base.parse import _POOL_CONTEXT, DirectoryParser, SqlAst, WorkerPool
 from base.manager import GraphManager
+from util import metrics
+from util.procedures import scan_procedures
+from logger_config import logger
 
 
 class Procedure:  # TODO mode it to different files.
     """Представляет SQL-процедуру/функцию и её связи с буферными таблицами.
 
+    Тело хранится как ссылка на исходный код файла и границы в нем,
+    и копируется только при обращении к code.
+
     Attributes:
         name (str): Название процедуры
         code (str): Тело процедуры (код между BEGIN и END)
@@ -30,7 +36,30 @@ class Procedure:  # TODO mode it to different files.
             code: SQL-код между BEGIN и END (без внешних блоков)
         """
         self.name = name
-        self.code = code
+        self._source = code
+        self._start = 0
+        self._end = len(code)
+
+    @classmethod
+    def from_source(cls, name: str, source: str, start: int, end: int) -> "Procedure":
+        """Создает процедуру, тело которой - source[start:end], без копирования текста.
+
+        Args:
+            name: Название процедуры
+            source: Исходный код, из которого извлечена процедура
+            start: Начало тела в source
+            end: Конец тела в source (не включительно)
+        """
+        procedure = cls(name, "")
+        procedure._source, procedure._start, procedure._end = source, start, end
+        return procedure
+
+    @property
+    def code(self) -> str:
+        """Тело процедуры (код между BEGIN и END)."""
+        if self._start == 0 and self._end == len(self._source):
+            return self._source
+        return self._source[self._start : self._end]
 
     def get_graph_name(self) -> str:
         """Генерирует специальное имя для визуализации в графе.
@@ -46,31 +75,19 @@ class Procedure:  # TODO mode it to different files.
 
         return f"\\${self.name}\\$"
 
-    @staticmethod
-    def __extract_procedure_code(sql: str) -> str:
-
-        if not ("BEGIN" in sql and "END" in sql):
-            return sql
-
-        sql = sql.split("BEGIN", 1)[1]
-        sql = sql.rsplit("END", 1)[0]
-        sql = sql.strip()
-
-        return sql
-
     @staticmethod
     def extract_procedures(sql_code: str) -> List["Procedure"]:
         """Извлекает все процедуры из SQL-кода.
 
+        Процедуры находятся за один линейный проход (см. scan_procedures):
+        учитываются долларовые кавычки с тегами ($body$), комментарии и строки.
+
         Args:
             sql_code: Полный текст SQL-запроса
 
         Returns:
             Список объектов Procedure (пустой, если процедур нет)
 
-        Raises:
-            ValueError: При некорректном формате SQL
-
         Example:
             >>> sql = "CREATE FUNCTION test() AS $$ BEGIN ... END $$"
             >>> procedures = Procedure.extract_procedures(sql)
@@ -78,26 +95,14 @@ class Procedure:  # TODO mode it to different files.
             1
         """
 
-        found = re.findall(
-            r"[?:PROCEDURE|FUNCTION]\s+[\"\'?]?(\w+)[\"\'?]?\s*\(.*?\)\s*[^$]+?\$\$(.*?)\$\$",
-            sql_code,
-            re.DOTALL,
-        )
-
-        if not found:
+        # Procedure bodies are always in dollar quotes
+        if "$" not in sql_code:
             return []
 
-        procedures = []
-
-        for i in found:
-            if len(i) == 2:
-                procedures.append(
-                    Procedure(i[0], Procedure.__extract_procedure_code(i[1]))
-                )
-            else:
-                print(f"Error parsing procedure: {i}")
-
-        return procedures
+        return [
+            Procedure.from_source(span.name, sql_code, span.start, span.end)
+            for span in scan_procedures(sql_code)
+        ]
 
     def __repr__(self) -> str:
         return f"{self.name}: '{self.code}'"
@@ -160,12 +165,23 @@ class BufferTable:
     def find_buffer_tables(
         procedures: List[Procedure],
         known_buff_tables: List["BufferTable"] | Set["BufferTable"],
+        dialect: Optional[str] = None,
+        source_path: Optional[str] = None,
+        cache=None,
+        jobs: int = 1,
     ) -> List["BufferTable"]:
         """Идентифицирует буферные таблицы по их использованию.
 
+        Таблицы, которые читает и пишет каждая процедура, берутся из кеша по
+        хешу ее тела, если он передан (см. analyze_procedures).
+
         Args:
             procedures: Список процедур для анализа
             known_buff_tables: Ранее обнаруженные таблицы
+            dialect: Диалект процедур (None - автоопределение)
+            source_path: Файл, из которого извлечены процедуры
+            cache: Кеш результатов анализа процедур (ParseCache). None - без кеша
+            jobs: Количество процессов для анализа процедур, которых нет в кеше
 
         Returns:
             Отфильтрованный список реальных буферных таблиц
@@ -178,22 +194,23 @@ class BufferTable:
         for table in known_buff_tables:
             buff_tables[table.name] = table
 
-        all_edges = []
-
-        for proc in procedures:
-            ast = SqlAst(proc.code)
+        analyzed = BufferTable.analyze_procedures(
+            [proc.code for proc in procedures],
+            dialect=dialect,
+            source_paths=_procedure_paths(procedures, source_path),
+            cache=cache,
+            jobs=jobs,
+        )
 
-            for to_table, edges in ast.get_dependencies().items():
-                all_edges.extend(edges)
+        for proc, pairs in zip(procedures, analyzed):
+            for source, to_table in pairs:
                 if to_table not in buff_tables:
                     buff_tables[to_table] = BufferTable(to_table)
+                if source not in buff_tables:
+                    buff_tables[source] = BufferTable(source)
 
-                for edge in edges:
-                    if edge.source not in buff_tables:
-                        buff_tables[edge.source] = BufferTable(edge.source)
-
-                    buff_tables[to_table].write_procedures.add(proc)
-                    buff_tables[edge.source].read_procedures.add(proc)
+                buff_tables[to_table].write_procedures.add(proc)
+                buff_tables[source].read_procedures.add(proc)
 
         real_buff_tables = set()
         for _, table in buff_tables.items():
@@ -202,10 +219,160 @@ class BufferTable:
 
         return real_buff_tables
 
+    @staticmethod
+    def analyze_procedures(
+        codes: List[str],
+        dialect: Optional[str] = None,
+        source_paths: Optional[List[str]] = None,
+        cache=None,
+        jobs: int = 1,
+    ) -> List[Tuple[Tuple[str, str], ...]]:
+        """Находит таблицы, которые читают и пишут процедуры.
+
+        Результат каждой процедуры кешируется по хешу ее тела, диалекту и
+        пути (путь входит в имена синтетических узлов, см. _procedure_paths).
+        Одинаковые пары (тело, путь) анализируются один раз, а те, которых нет
+        в кеше, при jobs > 1 анализируются в пуле процессов.
+
+        Args:
+            codes: Тела процедур
+            dialect: Диалект процедур (None - автоопределение)
+            source_paths: Путь каждой процедуры для имен синтетических узлов
+                (None - без пути)
+            cache: Кеш результатов (ParseCache). None - без кеша
+            jobs: Количество процессов для анализа. 1 - в текущем процессе
+
+        Returns:
+            Для каждого тела - пары (источник, цель) его зависимостей
+        """
+        if source_paths is None:
+            source_paths = [None] * len(codes)
+        procedures = list(zip(codes, source_paths))
+        results = {}  # (тело, путь) -> пары (источник, цель)
+        keys = {}
+        for procedure in procedures:
+            if procedure in results or procedure in keys:
+                continue
+            if cache is None:
+                keys[procedure] = None
+                continue
+            code, source_path = procedure
+            key = cache.make_key(
+                code,
+                dialect=dialect,
+                namespace=f"Procedure:{SqlAst.__name__}",
+                source_path=source_path,
+            )
+            cached = cache.get(key)
+            if cached is None:
+                keys[procedure] = key
+            else:
+                results[procedure] = cached
+
+        misses = list(keys)
+        if jobs > 1 and len(misses) > 1:
+            workers = min(jobs, len(misses))
+            with ProcessPoolExecutor(workers, mp_context=_POOL_CONTEXT) as executor:
+                analyzed = executor.map(
+                    _procedure_tables,
+                    [code for code, _ in misses],
+                    repeat(dialect),
+                    [source_path for _, source_path in misses],
+                    chunksize=max(len(misses) // (4 * workers), 1),
+                )
+                analyzed = list(analyzed)
+        else:
+            analyzed = [_procedure_tables(c, dialect, p) for c, p in misses]
+
+        for procedure, pairs in zip(misses, analyzed):
+            results[procedure] = pairs
+            if keys[procedure] is not None:
+                cache.put(keys[procedure], pairs)
+
+        metrics.count("procedures", len(codes))
+        metrics.count("procedures.analyzed", len(misses))
+        if cache is not None:
+            logger.debug(
+                f"Procedures: {len(codes) - len(misses)} of "
+                f"{len(codes)} served from cache"
+            )
+        return [results[procedure] for procedure in procedures]
+
+    @staticmethod
+    def procedure_dependencies(
+        procedures: List[Procedure],
+        dialect: Optional[str] = None,
+        source_path: Optional[str] = None,
+        cache=None,
+        jobs: int = 1,
+    ) -> Dict[str, Set[Edge]]:
+        """Строит ребра между процедурами и всеми таблицами, которые они читают и пишут.
+
+        В отличие от build_dependencies, таблицы не отбираются: буферной таблица
+        может оказаться только вместе с процедурами других файлов (см. BufferTableIndex).
+
+        Args:
+            procedures: Список процедур для анализа
+            dialect: Диалект процедур (None - автоопределение)
+            source_path: Файл, из которого извлечены процедуры
+            cache: Кеш результатов анализа процедур (ParseCache). None - без кеша
+            jobs: Количество процессов для анализа процедур, которых нет в кеше
+
+        Returns:
+            Словарь в формате: {target_node: set_of_edges}
+        """
+        analyzed = BufferTable.analyze_procedures(
+            [proc.code for proc in procedures],
+            dialect=dialect,
+            source_paths=_procedure_paths(procedures, source_path),
+            cache=cache,
+            jobs=jobs,
+        )
+        dependencies = defaultdict(set)
+        for proc, pairs in zip(procedures, analyzed):
+            name = proc.get_graph_name()
+            for source, to_table in pairs:
+                dependencies[name].add(Edge(source, name, BuffRead()))
+                dependencies[to_table].add(Edge(name, to_table, BuffWrite()))
+        return dependencies
+
     def __repr__(self) -> str:
         return f"{self.name}:\nreaders: {(self.read_procedures)}\nwriters: {self.write_procedures}"
 
 
+def _procedure_paths(
+    procedures: List[Procedure], source_path: Optional[str]
+) -> List[str]:
+    """Путь каждой процедуры для имен синтетических узлов (см. SqlAst._synthetic_name).
+
+    Операторы нумеруются в каждой процедуре заново, поэтому к файлу добавляется
+    имя процедуры, а при повторном объявлении того же имени - его номер:
+    "etl/load.ddl#load_stage", "etl/load.ddl#load_stage#2". Иначе узлы
+    "result etl/load.ddl:1" разных процедур совпали бы и связали их.
+    """
+    seen = Counter()
+    paths = []
+    for proc in procedures:
+        seen[proc.name] += 1
+        path = f"{source_path}#{proc.name}" if source_path else proc.name
+        if seen[proc.name] > 1:
+            path = f"{path}#{seen[proc.name]}"
+        paths.append(path)
+    return paths
+
+
+def _procedure_tables(
+    code: str, dialect: Optional[str], source_path: Optional[str]
+) -> Tuple[Tuple[str, str], ...]:
+    """Пары (источник, цель) зависимостей тела процедуры (выполняется и в пуле)."""
+    ast = SqlAst(code, dialect=dialect, source_path=source_path)
+    return tuple(
+        (edge.source, to_table)
+        for to_table, edges in ast.get_dependencies().items()
+        for edge in edges
+    )
+
+
 class BufferTableGraphStorage(GraphStorage):
     """Специализированное хранилище для графа зависимостей буферных таблиц.
 
@@ -218,9 +385,8 @@ class BufferTableGraphStorage(GraphStorage):
     def __init__(self):
         """Инициализирует хранилище с пустыми данными."""
 
+        super().__init__()
         self.buff_tables = []
-        self.nodes = set()
-        self.edges = []
 
     def set_buff_tables(self, buff_tables):
         """Инициализирует данные из списка BufferTable.
@@ -284,82 +450,188 @@ class BufferTableGraphStorage(GraphStorage):
         self.edges.clear()
 
 
-class BufferTableDirectoryParser:
-    """Парсер DDL-файлов для анализа временных таблиц."""
+class BufferTableIndex(GraphStorage):
+    """Хранилище связей процедур с таблицами и инвертированный индекс по таблицам.
 
-    def __init__(self, sql_ast_cls):
-        self.sql_ast_cls = sql_ast_cls
+    Хранит все ребра BuffRead/BuffWrite между процедурами и таблицами (см.
+    BufferTable.procedure_dependencies) с файлами, из которых они получены, и
+    для каждой таблицы - счетчики читающих и пишущих ее процедур. Буферная
+    таблица - та, у которой есть и читатели, и писатели, в том числе из разных
+    файлов. Индекс обновляется по файлам (add_dependencies/remove_files), поэтому
+    при изменении процедуры заново анализируется только ее файл, а поиск
+    буферных таблиц не требует повторного анализа процедур.
 
-    def parse_directory(self, directory: str) -> List[BufferTable]:
-        """Обрабатывает все .ddl файлы в директории.
+    Attributes:
+        readers (Dict[str, Counter]): Таблица -> {имя процедуры в графе: число ребер}.
+        writers (Dict[str, Counter]): Таблица -> {имя процедуры в графе: число ребер}.
 
-        Args:
-            directory (str): Путь к анализируемой директории
+    Example:
+        >>> index = BufferTableIndex()
+        >>> index.add_dependencies(load_deps, source_file="load.ddl")
+        >>> index.add_dependencies(mart_deps, source_file="mart.ddl")
+        >>> index.buffer_tables()
+        {'stage'}
+    """
+
+    def __init__(self, ignore_io=False):
+        super().__init__(ignore_io=ignore_io)
+        self.readers = defaultdict(Counter)
+        self.writers = defaultdict(Counter)
+
+    def _add_edge(
+        self, source: str, target: str, data: dict, source_file: Optional[str] = None
+    ):
+        super()._add_edge(source, target, data, source_file)
+        self._count(source, target, data, 1)
+
+    def _count(self, source: str, target: str, data: dict, delta: int):
+        if data["operation"] == BuffRead.__name__:
+            table, procedures, procedure = source, self.readers, target
+        elif data["operation"] == BuffWrite.__name__:
+            table, procedures, procedure = target, self.writers, source
+        else:
+            return
+        counter = procedures[table]
+        counter[procedure] += delta
+        if counter[procedure] <= 0:
+            del counter[procedure]
+            if not counter:
+                del procedures[table]
+
+    def remove_files(self, source_files):
+        source_files = list(source_files)
+        for source_file in source_files:
+            for source, target, data in self.file_edges.get(source_file, []):
+                self._count(source, target, data, -1)
+        super().remove_files(source_files)
+
+    def clear(self):
+        super().clear()
+        self.readers.clear()
+        self.writers.clear()
+
+    def buffer_tables(self) -> Set[str]:
+        """Таблицы, которые читает и пишет хотя бы одна процедура."""
+        return {table for table in self.writers if table in self.readers}
+
+    def get_filtered_nodes_edges(self):
+        """Возвращает узлы и ребра буферных таблиц и их процедур.
 
         Returns:
-            List[Tuple]:
-                - defaultdict: Зависимости
-                - list: Ошибки
-                - str: Путь к файлу
+            Tuple[set, list]: (узлы, рёбра) после применения фильтра.
+        """
+        edges = list(self.iter_filtered_edges())
+        nodes = {node for source, target, _ in edges for node in (source, target)}
+        return nodes, edges
+
+    def iter_filtered_edges(self):
+        """Перебирает рёбра буферных таблиц (см. get_filtered_nodes_edges)."""
+        buffer_tables = self.buffer_tables()
+        for edge in super().iter_filtered_edges():
+            if (
+                edge[0] if edge[2]["operation"] == BuffRead.__name__ else edge[1]
+            ) in buffer_tables:
+                yield edge
+
+    def get_filtered_nodes(self) -> set:
+        """Узлы рёбер буферных таблиц."""
+        return {
+            node
+            for source, target, _ in self.iter_filtered_edges()
+            for node in (source, target)
+        }
+
+
+class BufferTableDirectoryParser(DirectoryParser):
+    """Парсер DDL-файлов для анализа временных таблиц.
+
+    Обход директории и параллельный разбор наследуются от DirectoryParser,
+    переопределяется только обработка одного файла. Результаты анализа
+    процедур кешируются в том же кеше, что и результаты файлов, поэтому
+    в измененном файле заново анализируются только измененные процедуры.
 
-        Raises:
-            FileNotFoundError: При несуществующей директории
+    Attributes:
+        procedure_jobs (int): Количество процессов для анализа процедур одного
+            файла. Больше 1, только если разбирается один файл: несколько
+            файлов разбираются в пуле по файлам (см. iter_files).
 
-        Example:
-            >>> parser = BufferTableDirectoryParser(SqlAst)
-            >>> results = parser.parse_directory("./ddl_files")
+    Example:
+        >>> parser = BufferTableDirectoryParser(SqlAst)
+        >>> results = parser.parse_directory("./ddl_files")
+    """
+
+    FILE_EXTENSIONS = (".ddl",)
+    # Procedures are extracted from the whole file text
+    STREAM_THRESHOLD = None
+
+    def __init__(self, sql_ast_cls, cache=None, dialect=None, budget=None):
+        super().__init__(sql_ast_cls, cache=cache, dialect=dialect, budget=budget)
+        self.procedure_jobs = 1
+
+    def iter_files(
+        self,
+        file_paths: List[str],
+        *,
+        jobs: int = 1,
+        pool: Optional[WorkerPool] = None,
+    ):
+        """Парсит файлы (см. DirectoryParser.iter_files).
+
+        Один файл без pool разбирается в текущем процессе, а его процедуры -
+        в пуле из jobs процессов.
         """
+        jobs = jobs or os.cpu_count() or 1
+        self.procedure_jobs = jobs if len(file_paths) == 1 and pool is None else 1
+        return super().iter_files(file_paths, jobs=jobs, pool=pool)
+
+    def analyze_code(
+        self,
+        sql_code: str,
+        source_path: Optional[str] = None,
+        statements=None,
+    ) -> Tuple[defaultdict, List[str], Dict[str, Dict]]:
+        """Находит таблицы, которые читают и пишут процедуры одного .ddl файла.
+
+        Буферные таблицы среди них отбирает BufferTableIndex по всем файлам.
+
+        Args:
+            sql_code (str): Содержимое файла.
+            source_path (str, optional): Путь к файлу.
+            statements: Не используется (файл всегда читается целиком).
 
-        results = []  # maybe hashmap better??
-        known_buff_tables = []
-        if not os.path.exists(directory):
-            print(f"Error: Directory {directory} does not exist!")
-            return results
-        if not os.path.isdir(directory):
-            print(f"Error: {directory} is not a directory!")
-            return results
-        print(f"Processing files in directory: {directory}")
-        for root, _, files in os.walk(directory):
-            print(f"Processing directory: {root}")
-
-            for file in files:
-                known_buff_tables = []
-                if file.endswith(".ddl"):
-                    file_path = os.path.join(root, file)
-                    print(f"Reading file: {file_path}")
-                    try:  # TODO with заменяет трай кетч блок, насколько я знаю, заменить
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            sql_code = f.read()
-                            procs = Procedure.extract_procedures(sql_code)
-                            known_buff_tables = BufferTable.find_buffer_tables(
-                                procs, known_buff_tables
-                            )
-                            # if not sep_parse:
-                            #     known_buff_tables = tables
-                            dependencies = BufferTable.build_dependencies(
-                                known_buff_tables
-                            )
-                            results.append(
-                                (
-                                    dependencies,
-                                    [],
-                                    file_path,
-                                )
-                            )
-                    except Exception as e:
-                        results.append(
-                            (defaultdict(set), [f"Error: {str(e)}"], file_path)
-                        )
-        return results
+        Returns:
+            Tuple:
+                - defaultdict: Зависимости (см. BufferTable.procedure_dependencies)
+                - list: Ошибки
+                - dict: Схемы таблиц (не извлекаются, всегда пустой)
+        """
+        dependencies = BufferTable.procedure_dependencies(
+            Procedure.extract_procedures(sql_code),
+            dialect=self.dialect,
+            source_path=source_path,
+            cache=self.cache,
+            jobs=self.procedure_jobs,
+        )
+        return dependencies, [], {}
 
 
 class NewBuffGraphManager(GraphManager):
-    """Менеджер процессов для работы с буферными таблицами."""
+    """Менеджер процессов для работы с буферными таблицами.
 
-    def __init__(self):
-        self.storage = GraphStorage()
-        self.visualizer = GraphVisualizer()
-        self.parser = BufferTableDirectoryParser(SqlAst)
+    Хранилище - BufferTableIndex, поэтому буферные таблицы находятся по всем
+    файлам директории, а с --incremental индекс сохраняется между запусками
+    и обновляется только по измененным файлам.
+    """
+
+    def __init__(self, cache=None, dialect=None, budget=None):
+        self.storage = BufferTableIndex()
+        self._visualizer = None
+        self.column_mode = False
+        self.dialect = dialect
+        self.parser = BufferTableDirectoryParser(
+            SqlAst, cache=cache, dialect=dialect, budget=budget
+        )
+        self.manifest = None
 
     def process_sql(self, sql_code: str) -> List[str]:
         """Анализирует SQL-код и возвращает предупреждения.
@@ -377,6 +649,9 @@ class NewBuffGraphManager(GraphManager):
         """
 
         procs = Procedure.extract_procedures(sql_code)
-        tables = BufferTable.find_buffer_tables(procs, [])
-        self.storage.add_dependencies(BufferTable.build_dependencies(tables))
+        self.storage.add_dependencies(
+            BufferTable.procedure_dependencies(
+                procs, dialect=self.dialect, cache=self.parser.cache
+            )
+        )
         return []
@@ -1,6 +1,9 @@
 import os
-from func.buff_tables import NewBuffGraphManager, BufferTableGraphStorage
+from base.run import serve_directory, show_graph, watch_directory
+from func.buff_tables import NewBuffGraphManager, BufferTableIndex
 from logger_config import logger
+from util.budget import TimeBudget
+from util.cache import ParseCache
 
 
 def process_args(args):
@@ -23,7 +26,12 @@ def process_args(args):
     Вызывает:
         func.buff_tables.run() для выполнения основной логики.
     """
-    manager = NewBuffGraphManager()
+    manager = NewBuffGraphManager(
+        cache=ParseCache.from_args(args),
+        dialect=args.dialect,
+        budget=TimeBudget.from_args(args),
+    )
+    manager.headless = args.headless
     separate = args.separate_graph.lower() == "true"
     if args.sql_code:
         sql_code = args.sql_code
@@ -32,11 +40,17 @@ def process_args(args):
             print("\nCorrections made:")
             for i, correction in enumerate(corrections, 1):
                 print(f"{i}. {correction}")
-        manager.visualize("Dependencies Graph")
+        if args.cycles is not None:
+            logger.info(manager.report_cycles(args.cycles).format())
+        show_graph(manager, args, "Dependencies Graph")
     else:
-        if separate:
-            parse_results = manager.parser.parse_directory(
-                args.directory_path, sep_parse=True
+        if args.serve:
+            serve_directory(manager, args)
+        elif args.watch:
+            watch_directory(manager, args, "Full Dependencies Graph")
+        elif separate:
+            parse_results = manager.parser.iter_directory(
+                args.directory_path, jobs=args.jobs
             )
             for dependencies, corrections, file_path in parse_results:
                 logger.debug(f"\nFile: {file_path}")
@@ -44,19 +58,30 @@ def process_args(args):
                     logger.info("Corrections made:")
                     for i, correction in enumerate(corrections, 1):
                         logger.info(f"{i}. {correction}")
-                temp_storage = BufferTableGraphStorage()
+                temp_storage = BufferTableIndex()
                 temp_storage.add_dependencies(dependencies)
-                manager.visualizer.render(
-                    temp_storage,
+                show_graph(
+                    manager,
+                    args,
                     f"Dependencies for {os.path.basename(file_path)}",
+                    temp_storage,
+                    file_path,
                 )
         else:
-            results = manager.process_directory(args.directory_path)
+            if args.incremental:
+                manager.load_state(args.incremental)
+            results = manager.process_directory(
+                args.directory_path, jobs=args.jobs, incremental=bool(args.incremental)
+            )
+            if args.incremental:
+                manager.save_state(args.incremental)
             for file_path, corrections in results:
                 logger.debug(f"\nFile: {file_path}")
                 if corrections:
                     logger.info("Corrections made:")
                     for i, correction in enumerate(corrections, 1):
                         logger.info(f"{i}. {correction}")
-            manager.visualize("Full Dependencies Graph")
+            if args.cycles is not None:
+                logger.info(manager.report_cycles(args.cycles).format())
+            show_graph(manager, args, "Full Dependencies Graph")
             return
@@ -0,0 +1,14 @@
+"""Точка входа без графического стека (CI, серверы, выгрузки).
+
+Принимает те же аргументы, что и main.py, но всегда работает как с --headless:
+графы не рисуются, а matplotlib, networkx, numpy и PyQt6 не импортируются,
+поэтому запуск не тратит время на их загрузку.
+
+Example:
+    >>> python headless.py --mode table --directory_path ./sql --cycles
+"""
+
+from main import main
+
+if __name__ == "__main__":
+    main(headless=True)
@@ -1,13 +1,20 @@
 import sys
+import importlib
 import logging
+from contextlib import nullcontext
 from logging import StreamHandler, FileHandler
 
-import field.run
-import func.run
-import table.run
+from util import metrics
 from util.cli import parse_arguments
 from logger_config import logger, setup_logger
 
+# Модули режимов импортируются только для выбранного режима
+MODE_MODULES = {
+    "table": "table.run",
+    "field": "field.run",
+    "functional": "func.run",
+}
+
 
 def configure_logging(mode: str, log_file: str = None):  # перенести по умолчанию
     """Настраивает глобальный логгер в соответствии с выбранным режимом.
@@ -69,7 +76,7 @@ def configure_logging(mode: str, log_file: str = None):  # перенести п
                 logger.debug("Console handler set to INFO level")
 
 
-def main():
+def main(headless: bool = False):
     """Основная точка входа в приложение.
 
     Выполняет последовательность:
@@ -78,6 +85,10 @@ def main():
         3. Запуск соответствующего модуля обработки
         4. Обработка ошибок режима выполнения
 
+    Args:
+        headless (bool): Не рисовать графы и не загружать matplotlib
+            (как --headless, см. headless.py).
+
     Returns:
         None
 
@@ -89,7 +100,8 @@ def main():
         >>> python main.py --mode functional --sql_code "SELECT * FROM table"
 
     Notes:
-        - Зависит от модулей table.run, field.run, func.run
+        - Зависит от модулей table.run, field.run, func.run; импортируется
+          только модуль выбранного режима
         - Использует глобальный логгер "dependency_graph"
         - Коды завершения:
             * 0: Успешное выполнение
@@ -101,17 +113,18 @@ def main():
 
     # 4) собираем argv для parse_arguments
     args = parse_arguments()
-
-    # 6) делегируем выполнение
-    if args.mode == "table":
-        table.run.process_args(args)
-    elif args.mode == "field":
-        field.run.process_args(args)
-    elif args.mode == "functional":
-        func.run.process_args(args)
-    else:
-        logger.error(f"Неизвестный режим программы: {args.mode}")
-        sys.exit(1)
+    args.headless = args.headless or headless
+
+    # 6) делегируем выполнение, собирая метрики при --metrics
+    collecting = metrics.collecting() if args.metrics else nullcontext()
+    with collecting as run_metrics:
+        if args.mode not in MODE_MODULES:
+            logger.error(f"Неизвестный режим программы: {args.mode}")
+            sys.exit(1)
+        importlib.import_module(MODE_MODULES[args.mode]).process_args(args)
+    if run_metrics is not None:
+        run_metrics.write(args.metrics, args.metrics_format)
+        logger.info(f"Metrics saved to {args.metrics}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Начало корректировки о превышении бюджета времени
+TIMEOUT_PREFIX = "Timeout:"
+
+
+class BudgetExceeded(BaseException):
+    """Превышен бюджет времени разбора файла или оператора.
+
+    Наследуется от BaseException, чтобы обработчики ошибок разбора
+    (except Exception) не принимали его за синтаксическую ошибку.
+
+    Attributes:
+        scope (str): "file" или "statement".
+        limit (float): Бюджет в секундах.
+        elapsed (float): Время, прошедшее до прерывания, в секундах.
+    """
+
+    def __init__(self, scope: str, limit: float, elapsed: float):
+        super().__init__(
+            f"{scope} exceeded {limit:g}s time budget after {elapsed:.1f}s"
+        )
+        self.scope = scope
+        self.limit = limit
+        self.elapsed = elapsed
+
+
+class _BudgetState(threading.local):
+    """Сроки разбора файла и оператора в одном потоке."""
+
+    def __init__(self):
+        self.file_started = self.file_deadline = None
+        self.statement_started = self.statement_deadline = None
+        self.installed = 0  # вложенность контекстов с обработчиком SIGALRM
+        self.previous_handler = None
+
+
+class TimeBudget:
+    """Ограничивает время разбора одного файла и одного оператора.
+
+    Если в процессе доступен SIGALRM и код выполняется в главном потоке,
+    разбор прерывается таймером (signal.setitimer) в момент истечения бюджета.
+    Иначе бюджет файла проверяется только между операторами, а долгий
+    оператор не прерывается. Сроки хранятся отдельно для каждого потока,
+    поэтому один бюджет можно использовать из нескольких потоков.
+
+    Attributes:
+        file_seconds (Optional[float]): Бюджет файла. None - без ограничения.
+        statement_seconds (Optional[float]): Бюджет оператора. None - без ограничения.
+
+    Example:
+        >>> budget = TimeBudget(file_seconds=60, statement_seconds=5)
+        >>> with budget.file():
+        ...     for statement in statements:
+        ...         with budget.statement():
+        ...             analyze(statement)
+    """
+
+    def __init__(
+        self,
+        file_seconds: Optional[float] = None,
+        statement_seconds: Optional[float] = None,
+    ):
+        self.file_seconds = file_seconds or None
+        self.statement_seconds = statement_seconds or None
+        self._state = _BudgetState()
+
+    @classmethod
+    def from_args(cls, args) -> "TimeBudget":
+        """Создает бюджет по аргументам командной строки (--file-timeout, --statement-timeout)."""
+        return cls(
+            getattr(args, "file_timeout", None),
+            getattr(args, "statement_timeout", None),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """True, если задан хотя бы один бюджет."""
+        return bool(self.file_seconds or self.statement_seconds)
+
+    def __getstate__(self):
+        # В рабочий процесс передаются только настройки
+        return {
+            "file_seconds": self.file_seconds,
+            "statement_seconds": self.statement_seconds,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["file_seconds"], state["statement_seconds"])
+
+    @contextmanager
+    def file(self):
+        """Ограничивает время разбора файла бюджетом file_seconds.
+
+        Raises:
+            BudgetExceeded: Если бюджет файла исчерпан.
+        """
+        if not self.file_seconds:
+            yield
+            return
+        state = self._state
+        state.file_started = time.perf_counter()
+        state.file_deadline = state.file_started + self.file_seconds
+        try:
+            with self._alarm():
+                yield
+        finally:
+            state.file_started = state.file_deadline = None
+
+    @contextmanager
+    def statement(self):
+        """Ограничивает время разбора оператора бюджетом statement_seconds.
+
+        Перед началом оператора проверяет бюджет файла.
+
+        Raises:
+            BudgetExceeded: Если исчерпан бюджет оператора или файла.
+        """
+        if not self.enabled:
+            yield
+            return
+        self.check()
+        if not self.statement_seconds:
+            yield
+            return
+        state = self._state
+        state.statement_started = time.perf_counter()
+        state.statement_deadline = state.statement_started + self.statement_seconds
+        try:
+            with self._alarm():
+                yield
+        finally:
+            state.statement_started = state.statement_deadline = None
+            if state.installed:
+                self._arm()
+
+    def check(self):
+        """Проверяет бюджет файла без таймера.
+
+        Raises:
+            BudgetExceeded: Если бюджет файла исчерпан.
+        """
+        state = self._state
+        if state.file_deadline is not None:
+            now = time.perf_counter()
+            if now >= state.file_deadline:
+                raise BudgetExceeded(
+                    "file", self.file_seconds, now - state.file_started
+                )
+
+    @staticmethod
+    def can_interrupt() -> bool:
+        """True, если разбор в текущем потоке можно прервать таймером."""
+        return (
+            hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        )
+
+    @contextmanager
+    def _alarm(self):
+        if not self.can_interrupt():
+            yield
+            return
+        state = self._state
+        if not state.installed:
+            state.previous_handler = signal.signal(signal.SIGALRM, self._on_alarm)
+        state.installed += 1
+        self._arm()
+        try:
+            yield
+        finally:
+            state.installed -= 1
+            if not state.installed:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, state.previous_handler)
+                state.previous_handler = None
+
+    def _arm(self):
+        """Заводит таймер до ближайшего из сроков файла и оператора."""
+        state = self._state
+        deadlines = [
+            d for d in (state.file_deadline, state.statement_deadline) if d is not None
+        ]
+        if not deadlines:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            return
+        delay = min(deadlines) - time.perf_counter()
+        signal.setitimer(signal.ITIMER_REAL, max(delay, 1e-4))
+
+    def _on_alarm(self, signum, frame):
+        state = self._state
+        now = time.perf_counter()
+        # The timer may fire slightly before the deadline
+        if state.file_deadline is not None and now >= state.file_deadline - 1e-3:
+            raise BudgetExceeded("file", self.file_seconds, now - state.file_started)
+        if (
+            state.statement_deadline is not None
+            and now >= state.statement_deadline - 1e-3
+        ):
+            raise BudgetExceeded(
+                "statement", self.statement_seconds, now - state.statement_started
+            )
+        self._arm()
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any, Optional
+
+import sqlglot
+
+from logger_config import logger
+
+# Bump when the layout of cached results changes.
+CACHE_FORMAT_VERSION = 6
+
+
+def content_hash(text: str) -> str:
+    """Возвращает SHA-256 хеш текста файла.
+
+    Args:
+        text (str): Содержимое файла.
+
+    Returns:
+        str: Шестнадцатеричный хеш. Пример: "9f86d08..."
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Возвращает хеш содержимого файла, читая его частями.
+
+    Результат совпадает с content_hash() от прочитанного текста файла,
+    но файл целиком в память не загружается.
+
+    Args:
+        file_path (str): Путь к файлу в кодировке UTF-8.
+        chunk_size (int): Размер читаемой части в символах.
+
+    Returns:
+        str: Шестнадцатеричный хеш.
+
+    Raises:
+        OSError, UnicodeDecodeError: Если файл не удалось прочитать.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "r", encoding="utf-8") as f:
+        for chunk in iter(lambda: f.read(chunk_size), ""):
+            digest.update(chunk.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def default_cache_dir() -> str:
+    """Возвращает каталог кеша по умолчанию ($XDG_CACHE_HOME/etl-addictions-graph)."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "etl-addictions-graph")
+
+
+class ParseCache:
+    """Персистентный кеш результатов разбора файлов, адресуемый по содержимому.
+
+    Каждая запись - отдельный pickle-файл, имя которого - хеш от содержимого
+    файла, его пути, версии sqlglot, диалекта, ignore_io и пространства имен парсера.
+    Общий размер ограничен max_bytes: при переполнении удаляются записи,
+    к которым дольше всего не обращались (LRU по mtime).
+
+    Attributes:
+        cache_dir (str): Каталог с записями.
+        max_bytes (int): Максимальный суммарный размер записей.
+
+    Example:
+        >>> cache = ParseCache("/tmp/parse-cache")
+        >>> key = cache.make_key(sql_code, namespace="DirectoryParser")
+        >>> cache.get(key) is None
+        True
+        >>> cache.put(key, {"dependencies": deps})
+    """
+
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+    def __init__(
+        self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None
+    ):
+        """Инициализирует кеш и создает каталог при необходимости.
+
+        Args:
+            cache_dir (str, optional): Каталог кеша. По умолчанию default_cache_dir().
+            max_bytes (int, optional): Ограничение размера. По умолчанию 512 МБ.
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes or self.DEFAULT_MAX_BYTES
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # суммарный размер, считается лениво
+        logger.debug(f"ParseCache initialized in {self.cache_dir}")
+
+    @classmethod
+    def from_args(cls, args) -> Optional["ParseCache"]:
+        """Создает кеш по аргументам командной строки (--cache-dir, --no-cache).
+
+        Returns:
+            Optional[ParseCache]: None, если кеш отключен.
+        """
+        if getattr(args, "no_cache", False) or not getattr(
+            args, "directory_path", None
+        ):
+            return None
+        return cls(getattr(args, "cache_dir", None))
+
+    def make_key(
+        self,
+        sql_code: str,
+        dialect: Optional[str] = None,
+        ignore_io: bool = False,
+        namespace: str = "",
+        digest: Optional[str] = None,
+        source_path: Optional[str] = None,
+    ) -> str:
+        """Строит ключ записи.
+
+        Args:
+            sql_code (str): Содержимое файла. Не используется, если передан digest.
+            dialect (str, optional): Диалект разбора (None - автоопределение).
+            ignore_io (bool): Значение флага ignore_io.
+            namespace (str): Тип анализа (например, имя класса парсера).
+            digest (str, optional): Готовый хеш содержимого (см. file_hash()).
+            source_path (str, optional): Путь к файлу. Входит в имена синтетических
+                узлов, поэтому одинаковые файлы по разным путям кешируются отдельно.
+
+        Returns:
+            str: Ключ записи.
+        """
+        parts = [
+            str(CACHE_FORMAT_VERSION),
+            sqlglot.__version__,
+            namespace,
+            dialect or "auto",
+            str(bool(ignore_io)),
+            source_path or "",
+            digest or content_hash(sql_code),
+        ]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Возвращает сохраненный результат или None при промахе."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # отмечаем использование для LRU
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping corrupted cache entry {path}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """Сохраняет результат и вытесняет старые записи при переполнении."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            return
+        if self._size is not None:
+            self._size += os.path.getsize(path)
+        if self.size() > self.max_bytes:
+            self.evict()
+
+    def size(self) -> int:
+        """Возвращает суммарный размер записей в байтах."""
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока размер превышает 90% лимита."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        self._size = total
+        logger.debug(f"ParseCache evicted {removed} entries")
+
+    def clear(self):
+        """Удаляет все записи кеша."""
+        for path, _, _ in self._entries():
+            self._remove(path)
+        self._size = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".pkl")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if not file.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
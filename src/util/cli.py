@@ -1,5 +1,7 @@
 import argparse
 
+from util.dialect import DIALECTS
+
 
 def parse_arguments():
     """Парсит и валидирует аргументы командной строки для инструмента анализа SQL.
@@ -18,6 +20,18 @@ def parse_arguments():
                 - sql_code (str|None): Строка с SQL-кодом
                 - separate_graph (str): Режим отображения графиков
                 - operators (str|None): Фильтр SQL-операторов
+                - dialect (str|None): Диалект SQL (None - автоопределение)
+                - jobs (int): Количество процессов для разбора директории
+                - cache_dir (str|None): Каталог кеша результатов разбора
+                - no_cache (bool): Отключить кеш результатов разбора
+                - incremental (str|None): Файл состояния для инкрементального разбора
+                - storage (str): Хранилище графа режима таблиц ("default"/"columnar")
+                - file_timeout (float|None): Бюджет времени разбора одного файла в секундах
+                - statement_timeout (float|None): Бюджет времени разбора одного оператора
+                - cycles (int|None): Сколько примеров циклов выводить на компоненту
+                  (None - отчет о циклах не выводится)
+                - metrics (str|None): Файл для счетчиков и длительностей фаз разбора
+                - metrics_format (str): Формат файла метрик ("json"/"prometheus")
 
     Примеры использования:
         >>> python cli.py --mode functional --directory_path ./sql --separate_graph true
@@ -72,4 +86,118 @@ def parse_arguments():
         default="false",
         help="Don't parse and show Input/Output/Unknown nodes.",
     )
+    parser.add_argument(
+        "--dialect",
+        choices=list(DIALECTS),
+        help="SQL dialect of the input. Skips dialect detection; "
+        "by default the dialect is detected per file.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to parse files in --directory_path "
+        "(0 - one per CPU core).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="Directory of the on-disk parse cache "
+        "(default: $XDG_CACHE_HOME/etl-addictions-graph).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every file from scratch without reading or writing the parse cache.",
+    )
+    parser.add_argument(
+        "--file-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Time budget for parsing one file. A file that exceeds it is reported "
+        "as a timeout in its corrections and the rest of the directory continues.",
+    )
+    parser.add_argument(
+        "--statement-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Time budget for parsing one statement. A statement that exceeds it is "
+        "reported as a timeout and skipped.",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["default", "columnar"],
+        default="default",
+        help="Graph storage backend for table mode. 'columnar' keeps nodes in a string "
+        "table and edges in typed arrays, using much less memory on large graphs.",
+    )
+    parser.add_argument(
+        "--incremental",
+        type=str,
+        metavar="STATE_FILE",
+        help="Load the graph saved by the previous run from STATE_FILE, re-parse only "
+        "added or modified files of --directory_path and save the updated graph back.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep the graph of --directory_path in memory after the first parse, "
+        "re-parse only the files that change on disk and redraw the graph.",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="Polling period of --watch when inotify is unavailable (default: 0.5).",
+    )
+    parser.add_argument(
+        "--serve",
+        type=str,
+        metavar="[HOST:]PORT",
+        help="Parse --directory_path once and answer HTTP/JSON lineage queries "
+        "(/upstream, /downstream, /impact, /sql, /reload, /stats) from memory "
+        "(default host: 127.0.0.1). With --watch the graph follows file changes.",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Do not render graphs and never load matplotlib or networkx "
+        "(CI runs, --serve, --cycles and --metrics only).",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        metavar="PATH",
+        help="Write the dependency graph to PATH instead of rendering it. "
+        "With --separate_graph true one file per SQL file is written next to PATH.",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["jsonl", "graphml", "dot", "csv"],
+        help="Format of --output (default: from the PATH extension, else jsonl).",
+    )
+    parser.add_argument(
+        "--cycles",
+        type=int,
+        nargs="?",
+        const=3,
+        metavar="N",
+        help="Print strongly connected components of the whole dependency graph "
+        "that contain cycles, with up to N example cycles each (default: 3).",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        metavar="PATH",
+        help="Write per-file and aggregate phase timings and counters "
+        "(statements, edges, dialect fallbacks, tree walks) to PATH.",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=["json", "prometheus"],
+        default="json",
+        help="Format of the --metrics file: JSON with per-file numbers or "
+        "aggregate Prometheus text exposition.",
+    )
     return parser.parse_args()
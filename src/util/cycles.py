@@ -0,0 +1,196 @@
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+# Сколько примеров циклов выводится для одной компоненты по умолчанию
+MAX_EXAMPLE_CYCLES = 3
+
+
+class _Graph:
+    """Ориентированный граф над целыми номерами узлов.
+
+    Attributes:
+        names (List[Hashable]): Номер узла -> узел.
+        ids (Dict[Hashable, int]): Узел -> номер.
+        successors (List[List[int]]): Номер узла -> номера узлов, в которые идут ребра.
+    """
+
+    def __init__(self, edges: Iterable[Tuple[Hashable, Hashable]]):
+        self.names: List[Hashable] = []
+        self.ids: Dict[Hashable, int] = {}
+        self.successors: List[List[int]] = []
+        seen = set()
+        for source, target in edges:
+            edge = (self._id(source), self._id(target))
+            if edge not in seen:
+                seen.add(edge)
+                self.successors[edge[0]].append(edge[1])
+
+    def _id(self, node: Hashable) -> int:
+        node_id = self.ids.get(node)
+        if node_id is None:
+            node_id = self.ids[node] = len(self.names)
+            self.names.append(node)
+            self.successors.append([])
+        return node_id
+
+    def components(self) -> List[List[int]]:
+        """Сильно связные компоненты (алгоритм Тарьяна без рекурсии), O(V + E).
+
+        Returns:
+            List[List[int]]: Компоненты в порядке, обратном топологическому.
+        """
+        index = [-1] * len(self.names)
+        lowlink = [0] * len(self.names)
+        on_stack = [False] * len(self.names)
+        stack = []
+        components = []
+        counter = 0
+        for root in range(len(self.names)):
+            if index[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, position = work[-1]
+                if position == 0:
+                    index[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                successors = self.successors[node]
+                while position < len(successors):
+                    child = successors[position]
+                    position += 1
+                    if index[child] == -1:
+                        work[-1] = (node, position)
+                        work.append((child, 0))
+                        break
+                    if on_stack[child]:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        return components
+
+    def is_cyclic(self, component: List[int]) -> bool:
+        """True, если компонента содержит цикл (больше одного узла или петля)."""
+        return len(component) > 1 or component[0] in self.successors[component[0]]
+
+    def shortest_cycle(self, start: int, members: set) -> List[int]:
+        """Кратчайший цикл через start внутри компоненты members (поиск в ширину)."""
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for child in self.successors[node]:
+                if child == start:
+                    cycle = [node]
+                    while parents[cycle[-1]] is not None:
+                        cycle.append(parents[cycle[-1]])
+                    return cycle[::-1]
+                if child in members and child not in parents:
+                    parents[child] = node
+                    queue.append(child)
+        return []
+
+
+def _rotate(cycle: list) -> tuple:
+    """Приводит цикл к виду, начинающемуся с наименьшего узла."""
+    start = min(range(len(cycle)), key=lambda i: str(cycle[i]))
+    return tuple(cycle[start:] + cycle[:start])
+
+
+class CycleReport:
+    """Отчет о циклах графа зависимостей на основе сильно связных компонент.
+
+    Число простых циклов растет экспоненциально, поэтому они не перечисляются.
+    Вместо этого граф раскладывается на сильно связные компоненты за O(V + E),
+    и для каждой компоненты с циклом приводится не больше max_cycles примеров:
+    кратчайшие циклы через разные узлы компоненты.
+
+    Attributes:
+        components (List[Tuple[List, List[List]]]): (узлы компоненты, примеры циклов)
+            для компонент с циклами, от больших к меньшим. Цикл - список узлов
+            без повтора первого узла в конце.
+
+    Example:
+        >>> report = CycleReport.from_edges([("a", "b"), ("b", "a"), ("b", "c")])
+        >>> report.components
+        [(['a', 'b'], [['a', 'b']])]
+    """
+
+    def __init__(self, components: List[Tuple[List, List[List]]]):
+        self.components = components
+
+    @classmethod
+    def from_edges(
+        cls,
+        edges: Iterable[Tuple[Hashable, Hashable]],
+        max_cycles: int = MAX_EXAMPLE_CYCLES,
+    ) -> "CycleReport":
+        """Строит отчет по ребрам графа.
+
+        Args:
+            edges (Iterable[Tuple[Hashable, Hashable]]): Пары (источник, цель).
+            max_cycles (int): Наибольшее количество примеров циклов на компоненту.
+
+        Returns:
+            CycleReport: Отчет.
+        """
+        graph = _Graph(edges)
+        components = []
+        for component in graph.components():
+            if not graph.is_cyclic(component):
+                continue
+            members = set(component)
+            examples = []
+            covered = set()
+            for start in sorted(component, key=lambda i: str(graph.names[i])):
+                if len(examples) >= max_cycles:
+                    break
+                # A start outside the found cycles always gives a new cycle,
+                # so at most max_cycles searches are made per component
+                if start in covered:
+                    continue
+                cycle = graph.shortest_cycle(start, members)
+                covered.update(cycle)
+                examples.append(list(_rotate([graph.names[i] for i in cycle])))
+            nodes = sorted((graph.names[i] for i in component), key=str)
+            components.append((nodes, examples))
+        components.sort(key=lambda item: (-len(item[0]), str(item[0][0])))
+        return cls(components)
+
+    def cyclic_nodes(self) -> set:
+        """Все узлы, лежащие на каком-либо цикле."""
+        return {node for nodes, _ in self.components for node in nodes}
+
+    def cycles(self) -> List[List]:
+        """Примеры циклов всех компонент."""
+        return [cycle for _, cycles in self.components for cycle in cycles]
+
+    def format(self) -> str:
+        """Текст отчета для вывода в консоль."""
+        if not self.components:
+            return "No cycles found"
+        lines = [
+            f"Found {len(self.components)} strongly connected components with cycles"
+        ]
+        for number, (nodes, cycles) in enumerate(self.components, 1):
+            lines.append(f"{number}. {len(nodes)} nodes: {', '.join(map(str, nodes))}")
+            for cycle in cycles:
+                path = " -> ".join(map(str, [*cycle, cycle[0]]))
+                lines.append(f"   cycle: {path}")
+        return "\n".join(lines)
+
+    def __bool__(self) -> bool:
+        return bool(self.components)
@@ -1,19 +1,306 @@
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, Iterator, List, Optional, Tuple
+
 from sqlglot import parse
+from sqlglot.dialects.dialect import Dialect
+
+from util import metrics
+from util.cache import content_hash
+
+# Порядок перебора диалектов, если ни один признак не сработал
+DIALECTS = ("postgres", "oracle", "mysql")
+
+# Лексемы, характерные только для одного из поддерживаемых диалектов
+_MARKERS = {
+    "oracle": (
+        r"\bN?VARCHAR2\b",
+        r"\bNUMBER\s*\(",
+        r"\bNVL2?\s*\(",
+        r"\bSYSDATE\b",
+        r"\bSYSTIMESTAMP\b",
+        r"\bROWNUM\b",
+        r"\bFROM\s+DUAL\b",
+        r"\bCONNECT\s+BY\b",
+        r"\bDECODE\s*\(",
+        r"\bMINUS\b",
+        r"\bPLS_INTEGER\b",
+        r"\bBINARY_INTEGER\b",
+        r"\bNOCOPY\b",
+        r"^\s*/\s*$",
+    ),
+    "postgres": (
+        r"::",
+        r"\$\w*\$",
+        r"\bILIKE\b",
+        r"\b(?:BIG)?SERIAL\b",
+        r"\bRETURNING\b",
+        r"\bLANGUAGE\s+'?plpgsql\b",
+        r"\bON\s+CONFLICT\b",
+        r"\bJSONB\b",
+        r"\bDISTINCT\s+ON\b",
+        r"\bBYTEA\b",
+    ),
+    "mysql": (
+        r"`",
+        r"\bAUTO_INCREMENT\b",
+        r"\bENGINE\s*=",
+        r"\bUNSIGNED\b",
+        r"\bIFNULL\s*\(",
+        r"\bON\s+DUPLICATE\s+KEY\b",
+        r"\bLIMIT\s+\d+\s*,\s*\d+",
+        r"\bTINYINT\b",
+        r"\bMEDIUMTEXT\b",
+        r"\bLONGTEXT\b",
+    ),
+}
+
+_MARKER_RE = re.compile(
+    "|".join(
+        f"(?P<{dialect}_{i}>{marker})"
+        for dialect, markers in _MARKERS.items()
+        for i, marker in enumerate(markers)
+    ),
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def detect_dialect(sql: str) -> Optional[str]:
+    """Определяет вероятный диалект SQL-кода по характерным лексемам, без разбора.
+
+    Args:
+        sql (str): SQL-код.
+
+    Returns:
+        Optional[str]: "postgres", "oracle", "mysql" или None, если признаков нет
+            или они равновесны.
+
+    Examples:
+        >>> detect_dialect("CREATE TABLE t (name VARCHAR2(10))")
+        'oracle'
+        >>> detect_dialect("SELECT 1") is None
+        True
+    """
+    scores = Counter(
+        match.lastgroup.rsplit("_", 1)[0] for match in _MARKER_RE.finditer(sql)
+    )
+    ranked = scores.most_common(2)
+    if not ranked or (len(ranked) == 2 and ranked[0][1] == ranked[1][1]):
+        return None
+    return ranked[0][0]
+
+
+def uses_backslash_escapes(dialect: Optional[str], sql: str = "") -> bool:
+    """Проверяет, экранирует ли "\\" символы в строках диалекта (MySQL, BigQuery и т.п.).
+
+    Args:
+        dialect (str, optional): Диалект. None - определяется по sql (см. detect_dialect()).
+        sql (str): SQL-код или его начало.
+
+    Returns:
+        bool: True, если "\\'" внутри '...' - кавычка, а не конец строки.
+
+    Examples:
+        >>> uses_backslash_escapes("mysql")
+        True
+        >>> uses_backslash_escapes(None, "SELECT 'a\\' FROM t")
+        False
+    """
+    dialect = dialect or detect_dialect(sql)
+    if dialect is None:
+        return False
+    try:
+        tokenizer = Dialect.get_or_raise(dialect).tokenizer_class
+    except ValueError:
+        return False
+    return "\\" in tokenizer.STRING_ESCAPES
+
+
+class DialectDetector:
+    """Выбирает порядок диалектов для разбора и запоминает успешные результаты.
+
+    Порядок кандидатов:
+        1. Диалект, которым уже был разобран код с тем же хешем.
+        2. Диалект, определенный detect_dialect().
+        3. Диалект, чаще всего успешный для файлов той же директории.
+        4. Остальные диалекты в порядке DIALECTS.
 
+    Выученное состояние влияет на выбор диалекта, поэтому детектор принадлежит
+    одному парсеру (см. DirectoryParser.detector) и сбрасывается перед каждым
+    разбором файлов (reset()). Методы можно вызывать из нескольких потоков.
+    В рабочий процесс детектор передается без выученного состояния.
 
-def safe_parse(sql):
-    """Пытается распарсить SQL-код, автоматически определяя диалект (PostgreSQL/Oracle).
+    Attributes:
+        by_hash (Dict[str, str]): Хеш кода -> успешный диалект (не больше MAX_REMEMBERED).
+        by_directory (Dict[str, Counter]): Директория -> счетчик успешных диалектов.
+        attempts (int): Количество вызовов sqlglot.parse.
+        parses (int): Количество разобранных фрагментов кода.
+    """
+
+    MAX_REMEMBERED = 100_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def reset(self):
+        """Забывает выученные диалекты и обнуляет счетчики."""
+        with self._lock:
+            self.by_hash = {}
+            self.by_directory = defaultdict(Counter)
+            self.attempts = 0
+            self.parses = 0
+
+    def candidates(self, sql: str, digest: str, directory: Optional[str]) -> List[str]:
+        """Возвращает диалекты в порядке попыток разбора."""
+        with self._lock:
+            order = [self.by_hash.get(digest)]
+            counts = self.by_directory.get(directory)
+            learned = counts.most_common(1)[0][0] if counts else None
+        order += [detect_dialect(sql), learned]
+        order.extend(DIALECTS)
+        return list(dict.fromkeys(d for d in order if d))
+
+    def parse(
+        self,
+        sql: str,
+        dialect: Optional[str] = None,
+        source_path: Optional[str] = None,
+    ):
+        """Разбирает код, начиная с наиболее вероятного диалекта.
+
+        Args:
+            sql (str): SQL-код.
+            dialect (str, optional): Принудительный диалект. Определение и
+                перебор других диалектов не выполняются.
+            source_path (str, optional): Путь к файлу с кодом, для учета директории.
+
+        Returns:
+            tuple: (список AST-узлов | None, название диалекта | "Unknown")
+        """
+        self.parses += 1
+        if dialect:
+            self.attempts += 1
+            metrics.count("dialect.attempts")
+            try:
+                with metrics.timer("parse"):
+                    return parse(sql, dialect=dialect), dialect
+            except Exception:
+                return None, "Unknown"
+
+        digest = content_hash(sql)
+        directory = self._directory(source_path)
+        for attempt, candidate in enumerate(self.candidates(sql, digest, directory)):
+            self.attempts += 1
+            metrics.count("dialect.attempts")
+            try:
+                with metrics.timer("parse"):
+                    parsed = parse(sql, dialect=candidate)
+            except Exception:  # catch error
+                continue
+            if attempt:
+                metrics.count("dialect.fallbacks")
+            self._remember(digest, directory, candidate)
+            return parsed, candidate
+
+        return None, "Unknown"
+
+    def parse_statements(
+        self,
+        sql: str,
+        statements: Iterable[str],
+        dialect: Optional[str] = None,
+        source_path: Optional[str] = None,
+    ) -> Iterator[Tuple[Optional[list], str, Optional[Exception]]]:
+        """Разбирает операторы кода по отдельности, по мере их поступления.
+
+        Все операторы разбираются диалектом, выбранным для всего кода
+        (см. candidates()). Другие диалекты пробуются только для операторов,
+        которые этим диалектом не разобрались. Выбранный диалект запоминается,
+        когда операторы закончились.
 
-    Последовательно проверяет поддержку диалектов. Если парсинг для диалекта завершается успешно,
-    возвращает результат и название диалекта. В противном случае пробует следующий диалект.
+        Args:
+            sql (str): SQL-код, из которого получены операторы (для больших
+                файлов - его начало). По нему определяется диалект.
+            statements (Iterable[str]): Тексты операторов (см. split_statements()).
+            dialect (str, optional): Принудительный диалект, без перебора других.
+            source_path (str, optional): Путь к файлу с кодом.
+
+        Yields:
+            tuple: Для каждого оператора (список AST-узлов | None,
+                диалект | "Unknown", первая ошибка разбора | None).
+        """
+        self.parses += 1
+        digest = directory = None
+        if dialect:
+            order = [dialect]
+        else:
+            digest = content_hash(sql)
+            directory = self._directory(source_path)
+            order = self.candidates(sql, digest, directory)
+
+        used = Counter()
+        for statement in statements:
+            error = None
+            for attempt, candidate in enumerate(order):
+                self.attempts += 1
+                metrics.count("dialect.attempts")
+                try:
+                    with metrics.timer("parse"):
+                        parsed = parse(statement, dialect=candidate)
+                except Exception as e:
+                    error = error or e
+                    continue
+                if attempt:
+                    metrics.count("dialect.fallbacks")
+                used[candidate] += 1
+                yield parsed, candidate, None
+                break
+            else:
+                yield None, "Unknown", error
+
+        if used and not dialect:
+            self._remember(digest, directory, used.most_common(1)[0][0])
+
+    @staticmethod
+    def _directory(source_path: Optional[str]) -> Optional[str]:
+        return os.path.dirname(os.path.abspath(source_path)) if source_path else None
+
+    def _remember(self, digest: str, directory: Optional[str], dialect: str):
+        with self._lock:
+            if len(self.by_hash) >= self.MAX_REMEMBERED:
+                del self.by_hash[next(iter(self.by_hash))]
+            self.by_hash[digest] = dialect
+            if directory is not None:
+                self.by_directory[directory][dialect] += 1
+
+
+def safe_parse(sql, dialect=None, source_path=None, detector=None):
+    """Парсит SQL-код, автоматически определяя диалект (PostgreSQL/Oracle/MySQL).
+
+    Диалект сначала угадывается по характерным лексемам и по ранее разобранным
+    файлам (см. DialectDetector), поэтому обычно код разбирается один раз.
+    Если разбор не удался, пробуются остальные диалекты.
 
     Args:
         sql (str): SQL-код для анализа. Должен быть синтаксически корректным для одного из поддерживаемых диалектов.
+        dialect (str, optional): Принудительный диалект, без определения и перебора.
+        source_path (str, optional): Путь к файлу с кодом.
+        detector (DialectDetector, optional): Детектор с выученными диалектами.
+            None - новый детектор для этого вызова.
 
     Returns:
         tuple: Кортеж из двух элементов:
             - Список AST-узлов (sqlglot.expressions.Expression) | None: Результат парсинга.
-            - str: Название диалекта ("postgres", "oracle") или "Unknown" при неудаче.
+            - str: Название диалекта ("postgres", "oracle", "mysql") или "Unknown" при неудаче.
 
     Examples:
         >>> ast, dialect = safe_parse("SELECT * FROM users")
@@ -22,15 +309,27 @@ def safe_parse(sql):
         >>> ast, dialect = safe_parse("INVALID SQL")
         >>> print(ast, dialect)  # None, "Unknown"
     """
+    if detector is None:
+        detector = DialectDetector()
+    return detector.parse(sql, dialect=dialect, source_path=source_path)
 
-    try:
-        return parse(sql, dialect="postgres"), "postgres"
-    except:  # catch error
-        pass
 
-    try:
-        return parse(sql, dialect="oracle"), "oracle"
-    except:
-        pass
+def parse_statements(sql, statements, dialect=None, source_path=None, detector=None):
+    """Разбирает операторы SQL-кода по отдельности (см. DialectDetector.parse_statements).
 
-    return None, "Unknown"
+    Args:
+        sql (str): SQL-код или его начало, по которому определяется диалект.
+        statements (Iterable[str]): Тексты операторов.
+        dialect (str, optional): Принудительный диалект.
+        source_path (str, optional): Путь к файлу с кодом.
+        detector (DialectDetector, optional): См. safe_parse().
+
+    Yields:
+        tuple: (список AST-узлов | None, диалект | "Unknown", ошибка | None)
+            для каждого оператора.
+    """
+    if detector is None:
+        detector = DialectDetector()
+    return detector.parse_statements(
+        sql, statements, dialect=dialect, source_path=source_path
+    )
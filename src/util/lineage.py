@@ -0,0 +1,118 @@
+from collections import defaultdict, deque
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class LineageIndex:
+    """Снимок графа зависимостей для запросов происхождения данных.
+
+    Строится по хранилищу один раз после каждого обновления графа и дальше
+    не изменяется, поэтому запросы читают его без блокировок, а новый снимок
+    подменяет старый одним присваиванием (см. base.server.LineageServer).
+    Узлы приводятся к строкам, как в ответах сервера.
+
+    Attributes:
+        nodes (Set[str]): Узлы графа.
+        edges (int): Число рёбер.
+
+    Example:
+        >>> index = LineageIndex.from_storage(manager.storage)
+        >>> index.downstream("raw.orders", depth=2)
+        {'stage.orders': 1, 'mart.sales': 2}
+    """
+
+    def __init__(
+        self,
+        file_edges: Iterable[Tuple[Optional[str], Hashable, Hashable]] = (),
+        nodes: Iterable[Hashable] = (),
+    ):
+        """Строит индекс.
+
+        Args:
+            file_edges (Iterable[Tuple[Optional[str], Hashable, Hashable]]):
+                Рёбра (файл, источник, цель), см. from_storage().
+            nodes (Iterable[Hashable]): Узлы, в том числе без рёбер.
+        """
+        self._downstream: Dict[str, Set[str]] = defaultdict(set)
+        self._upstream: Dict[str, Set[str]] = defaultdict(set)
+        # Files whose statements read a table: they are affected when it changes
+        self._readers: Dict[str, Set[str]] = defaultdict(set)
+        self.edges = 0
+        for source_file, source, target in file_edges:
+            source, target = str(source), str(target)
+            self._downstream[source].add(target)
+            self._upstream[target].add(source)
+            if source_file is not None:
+                self._readers[source].add(source_file)
+            self.edges += 1
+        self.nodes = {str(node) for node in nodes}
+        self.nodes.update(self._downstream, self._upstream)
+
+    @classmethod
+    def from_storage(cls, storage) -> "LineageIndex":
+        """Строит индекс по хранилищу любого режима.
+
+        Узлы и рёбра те же, что у визуализации и выгрузки (iter_filtered_edges(),
+        get_filtered_nodes()): учитываются фильтр операторов и отбор буферных
+        таблиц функционального режима. Фильтры зависят только от концов ребра
+        и операции, поэтому файл видимого ребра берется из iter_file_edges()
+        у ребра с теми же источником, целью и операцией.
+        """
+        files = defaultdict(list)
+        for source_file, source, target, data in storage.iter_file_edges():
+            files[source, target, data["operation"]].append(source_file)
+        file_edges = (
+            (files[source, target, data["operation"]].pop(), source, target)
+            for source, target, data in storage.iter_filtered_edges()
+        )
+        return cls(file_edges, storage.get_filtered_nodes())
+
+    def __contains__(self, table: str) -> bool:
+        return table in self.nodes
+
+    @staticmethod
+    def _walk(
+        adjacency: Dict[str, Set[str]], table: str, depth: Optional[int]
+    ) -> Dict[str, int]:
+        """Обход в ширину от table: узел -> наименьшее число рёбер до него."""
+        distances = {table: 0}
+        queue = deque([table])
+        while queue:
+            node = queue.popleft()
+            distance = distances[node] + 1
+            if depth is not None and distance > depth:
+                continue
+            for neighbour in adjacency.get(node, ()):
+                if neighbour not in distances:
+                    distances[neighbour] = distance
+                    queue.append(neighbour)
+        del distances[table]
+        return distances
+
+    def upstream(self, table: str, depth: Optional[int] = None) -> Dict[str, int]:
+        """Узлы, из которых данные попадают в table.
+
+        Args:
+            table (str): Узел.
+            depth (int, optional): Наибольшее число рёбер. None - без ограничения.
+
+        Returns:
+            Dict[str, int]: Узел -> расстояние до table в рёбрах.
+        """
+        return self._walk(self._upstream, table, depth)
+
+    def downstream(self, table: str, depth: Optional[int] = None) -> Dict[str, int]:
+        """Узлы, в которые данные попадают из table (см. upstream())."""
+        return self._walk(self._downstream, table, depth)
+
+    def impact(self, table: str, depth: Optional[int] = None) -> dict:
+        """Что затрагивает изменение table.
+
+        Returns:
+            dict: {"tables": узлы ниже по потоку -> расстояние,
+                "files": отсортированные файлы, читающие table или эти узлы}.
+        """
+        tables = self.downstream(table, depth)
+        files = set(self._readers.get(table, ()))
+        for node in tables:
+            files.update(self._readers.get(node, ()))
+        return {"tables": tables, "files": sorted(files)}
@@ -0,0 +1,103 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from util.cache import file_hash
+
+
+class FileManifest:
+    """Снимок состояния файлов директории: путь, mtime, размер и хеш содержимого.
+
+    Используется для инкрементального анализа: сравнение двух снимков дает
+    добавленные, измененные и удаленные файлы. Хеш пересчитывается только для
+    файлов, у которых изменились mtime или размер.
+
+    Attributes:
+        entries (Dict[str, dict]): Абсолютный путь -> {"mtime", "size", "sha256"}.
+
+    Example:
+        >>> manifest = FileManifest.scan(paths, previous=old_manifest)
+        >>> added, modified, deleted = manifest.diff(old_manifest)
+        >>> manifest.save("manifest.json")
+    """
+
+    def __init__(self, entries: Optional[Dict[str, dict]] = None):
+        self.entries = entries or {}
+
+    @staticmethod
+    def key(file_path) -> str:
+        """Нормализует путь к файлу для использования в качестве ключа."""
+        return os.path.abspath(file_path)
+
+    @classmethod
+    def scan(
+        cls, file_paths: Iterable[str], previous: Optional["FileManifest"] = None
+    ) -> "FileManifest":
+        """Строит снимок для списка файлов.
+
+        Args:
+            file_paths (Iterable[str]): Пути к файлам.
+            previous (FileManifest, optional): Предыдущий снимок. Хеши файлов
+                с неизменными mtime и размером берутся из него.
+
+        Returns:
+            FileManifest: Новый снимок. Недоступные файлы пропускаются.
+        """
+        old = previous.entries if previous else {}
+        entries = {}
+        for file_path in file_paths:
+            path = cls.key(file_path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = old.get(path)
+            if (
+                entry is None
+                or entry["mtime"] != stat.st_mtime
+                or entry["size"] != stat.st_size
+            ):
+                try:
+                    digest = file_hash(path)
+                except (OSError, UnicodeDecodeError):
+                    digest = None
+                entry = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": digest}
+            entries[path] = entry
+        return cls(entries)
+
+    def diff(
+        self, previous: Optional["FileManifest"]
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """Сравнивает снимок с предыдущим.
+
+        Args:
+            previous (FileManifest, optional): Предыдущий снимок (None - пустой).
+
+        Returns:
+            Tuple[List[str], List[str], List[str]]: (добавленные, измененные, удаленные) пути.
+                Файл с новым mtime, но прежним содержимым считается неизменным.
+        """
+        old = previous.entries if previous else {}
+        added = [path for path in self.entries if path not in old]
+        modified = [
+            path
+            for path, entry in self.entries.items()
+            if path in old
+            and (entry["sha256"] != old[path]["sha256"] or entry["sha256"] is None)
+        ]
+        deleted = [path for path in old if path not in self.entries]
+        return added, modified, deleted
+
+    def save(self, path: str):
+        """Сохраняет снимок в JSON-файл."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> "FileManifest":
+        """Загружает снимок из JSON-файла."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,252 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, Optional
+
+# Префикс имен метрик в формате Prometheus
+PROMETHEUS_PREFIX = "etl_graph"
+
+_current: ContextVar[Optional["Metrics"]] = ContextVar("metrics", default=None)
+
+
+class Metrics:
+    """Счетчики и таймеры фаз разбора одного файла или всего запуска.
+
+    Метрики пишутся в текущий сборщик (см. collecting()) функциями count(),
+    add_time() и контекстом timer(). Если сборщика нет, они ничего не делают,
+    поэтому инструментированный код не замедляется без --metrics.
+
+    Attributes:
+        counters (Counter): Имя счетчика -> значение. Пример: {"statements": 120}
+        timers (Dict[str, list]): Имя фазы -> [секунды, количество замеров].
+        files (Dict[str, Metrics]): Путь к файлу -> метрики файла
+            (только у сборщика запуска, см. record_file()).
+
+    Example:
+        >>> with collecting() as run_metrics:
+        ...     manager.process_directory("./sql")
+        >>> run_metrics.write("metrics.json")
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.timers: Dict[str, list] = {}
+        self.files: Dict[str, "Metrics"] = {}
+
+    def count(self, name: str, value: int = 1):
+        """Увеличивает счетчик name на value."""
+        self.counters[name] += value
+
+    def add_time(self, name: str, seconds: float):
+        """Добавляет замер длительности фазы name."""
+        timer = self.timers.get(name)
+        if timer is None:
+            self.timers[name] = [seconds, 1]
+        else:
+            timer[0] += seconds
+            timer[1] += 1
+
+    def merge(self, other: "Metrics"):
+        """Добавляет к метрикам значения other (без метрик файлов)."""
+        self.counters.update(other.counters)
+        for name, (seconds, calls) in other.timers.items():
+            timer = self.timers.setdefault(name, [0.0, 0])
+            timer[0] += seconds
+            timer[1] += calls
+
+    def as_dict(self) -> dict:
+        """Возвращает метрики без метрик файлов в виде словаря для JSON.
+
+        Returns:
+            dict: {"counters": {имя: значение},
+                "timers": {имя: {"seconds": секунды, "calls": замеры}}}
+        """
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "timers": {
+                name: {"seconds": round(seconds, 6), "calls": calls}
+                for name, (seconds, calls) in sorted(self.timers.items())
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Metrics":
+        """Восстанавливает метрики из словаря as_dict()."""
+        metrics = cls()
+        metrics.counters.update(data.get("counters", {}))
+        for name, timer in data.get("timers", {}).items():
+            metrics.timers[name] = [timer["seconds"], timer["calls"]]
+        return metrics
+
+    def to_json(self) -> str:
+        """Метрики запуска и его файлов в формате JSON.
+
+        Returns:
+            str: {"total": as_dict(), "files": {путь: as_dict()}}
+        """
+        return json.dumps(
+            {
+                "total": self.as_dict(),
+                "files": {path: m.as_dict() for path, m in self.files.items()},
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+
+    def to_prometheus(self) -> str:
+        """Суммарные метрики в текстовом формате Prometheus (без разбивки по файлам).
+
+        Счетчик "dialect.attempts" становится etl_graph_dialect_attempts_total,
+        фаза "parse" - сериями etl_graph_phase_seconds_total{phase="parse"}
+        и etl_graph_phase_calls_total{phase="parse"}.
+
+        Returns:
+            str: Текст для node_exporter textfile collector или pushgateway.
+        """
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{PROMETHEUS_PREFIX}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for suffix, index in (("seconds", 0), ("calls", 1)):
+            metric = f"{PROMETHEUS_PREFIX}_phase_{suffix}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, timer in sorted(self.timers.items()):
+                lines.append(f'{metric}{{phase="{name}"}} {timer[index]:g}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, output_format: str = "json"):
+        """Сохраняет метрики в файл.
+
+        Args:
+            path (str): Путь к файлу.
+            output_format (str): "json" (to_json()) или "prometheus" (to_prometheus()).
+        """
+        text = self.to_prometheus() if output_format == "prometheus" else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+@contextmanager
+def collecting(metrics: Optional[Metrics] = None) -> Iterator[Optional[Metrics]]:
+    """Делает metrics текущим сборщиком на время блока.
+
+    Args:
+        metrics (Metrics, optional): Сборщик. По умолчанию создается новый.
+
+    Yields:
+        Metrics: Текущий сборщик.
+    """
+    if metrics is None:
+        metrics = Metrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def active() -> bool:
+    """True, если метрики сейчас собираются."""
+    return _current.get() is not None
+
+
+def count(name: str, value: int = 1):
+    """Увеличивает счетчик текущего сборщика (см. Metrics.count)."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.counters[name] += value
+
+
+def add_time(name: str, seconds: float):
+    """Добавляет замер фазы в текущий сборщик (см. Metrics.add_time)."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_time(name, seconds)
+
+
+def record_file(path: str, data: Optional[dict]):
+    """Сохраняет метрики файла (Metrics.as_dict()) в текущем сборщике запуска."""
+    metrics = _current.get()
+    if metrics is None or not data:
+        return
+    file_metrics = Metrics.from_dict(data)
+    metrics.files[path] = file_metrics
+    metrics.merge(file_metrics)
+
+
+class timer:
+    """Замеряет длительность блока монотонными часами (time.perf_counter).
+
+    Example:
+        >>> with timer("parse"):
+        ...     parse(sql)
+    """
+
+    __slots__ = ("name", "metrics", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.metrics = _current.get()
+        if self.metrics is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.metrics is not None:
+            self.metrics.add_time(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class LatencyWindow:
+    """Длительности последних запросов для перцентилей задержки (режим --serve).
+
+    Хранит не больше size последних замеров, поэтому перцентили отражают
+    текущую нагрузку, а память не растет. Методы потокобезопасны.
+
+    Attributes:
+        count (int): Число замеров за все время, включая вытесненные из окна.
+
+    Example:
+        >>> window = LatencyWindow()
+        >>> window.record(0.004)
+        >>> window.percentiles()
+        {'p50': 0.004, 'p90': 0.004, 'p99': 0.004}
+    """
+
+    def __init__(self, size: int = 10_000):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        """Добавляет длительность запроса в секундах."""
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentiles(self, points: Iterable[int] = (50, 90, 99)) -> Dict[str, float]:
+        """Перцентили длительностей окна (по ближайшему рангу).
+
+        Returns:
+            Dict[str, float]: {"p50": секунды, ...}; пустой словарь без замеров.
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {}
+        return {
+            f"p{point}": samples[max(math.ceil(point / 100 * len(samples)) - 1, 0)]
+            for point in points
+        }
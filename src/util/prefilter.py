@@ -0,0 +1,145 @@
+import re
+from typing import FrozenSet, Iterable, Optional, Tuple
+
+# Ключевые слова, по которым определяются возможные операции оператора.
+# Комментарии, строки и идентификаторы в кавычках поглощаются без группы.
+_KEYWORD_RE = re.compile(
+    r"--[^\n]*|/\*.*?(?:\*/|\Z)|'(?:[^']|'')*'?|\"(?:[^\"]|\"\")*\"?|`[^`]*`?"
+    r"|(?<![\w$])(\$(?:[A-Za-z_]\w*)?\$).*?(?:\1|\Z)"
+    r"|\b(SELECT|INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|JOIN|FROM|USING|WITH|INTO|TABLE)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+# Первое слово оператора после комментариев и открывающих скобок
+_HEAD_RE = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/|\()*(\w+)", re.DOTALL)
+
+# Виды операторов, для которых известны все возможные операции ребер.
+# Остальные операторы (и операторы с другим первым словом) всегда разбираются.
+STATEMENT_KINDS = (
+    "SELECT",
+    "WITH",
+    "INSERT",
+    "UPDATE",
+    "DELETE",
+    "MERGE",
+    "ALTER",
+    "DROP",
+    "CREATE",
+)
+
+# Операции, ребра которых дает оператор с этим ключевым словом
+_KEYWORD_OPERATORS = {
+    "SELECT": ("SELECT", "TABLE"),
+    "WITH": ("TABLE",),
+    # Перечисление таблиц через запятую тоже дает ребро Join
+    "JOIN": ("JOIN",),
+    "FROM": ("JOIN",),
+    "USING": ("JOIN",),
+    "TABLE": ("TABLE",),
+    "INSERT": ("INSERT",),
+    "UPDATE": ("UPDATE",),
+    "DELETE": ("DELETE",),
+    "MERGE": ("MERGE",),
+    "ALTER": ("ALTER",),
+    "CREATE": ("CREATE",),
+}
+
+
+def statement_keywords(statement: str) -> Tuple[Optional[str], FrozenSet[str]]:
+    """Определяет вид оператора и его ключевые слова без разбора.
+
+    Ключевые слова внутри комментариев, строк, идентификаторов в кавычках
+    и блоков в долларовых кавычках не учитываются.
+
+    Args:
+        statement (str): Текст одного оператора.
+
+    Returns:
+        Tuple[Optional[str], FrozenSet[str]]: (первое слово оператора в верхнем
+            регистре | None, ключевые слова из _KEYWORD_RE в верхнем регистре).
+
+    Example:
+        >>> statement_keywords("/* load */ INSERT INTO t SELECT * FROM s")
+        ('INSERT', frozenset({'INSERT', 'INTO', 'SELECT', 'FROM'}))
+    """
+    head = _HEAD_RE.match(statement)
+    keywords = frozenset(
+        keyword.upper() for _, keyword in _KEYWORD_RE.findall(statement) if keyword
+    )
+    return (head[1].upper() if head else None), keywords
+
+
+class StatementFilter:
+    """Отбрасывает до разбора операторы, которые не могут дать нужных ребер.
+
+    Вид оператора и его ключевые слова определяются регулярным выражением
+    (см. statement_keywords()), поэтому проверка намного дешевле разбора sqlglot.
+    Проверка консервативная: оператор отбрасывается, только если ни одно
+    ключевое слово не может дать ребро с операцией из фильтра. Операторы
+    CREATE TABLE всегда разбираются, так как из них извлекается схема таблиц.
+
+    Правила:
+        - ignore_io: SELECT без WITH и INTO дает только узел "result N";
+        - operators: ребро с операцией X возможно, только если в операторе есть
+          ключевое слово X, ребро Table - если есть SELECT, WITH или TABLE,
+          ребро Join - если есть JOIN, FROM или USING;
+        - DROP ребер не дает.
+
+    Attributes:
+        operators (Optional[FrozenSet[str]]): Имена операций из
+            GraphStorage.OPERATOR_MAP. None - операции не фильтруются.
+        ignore_io (bool): Не строить узлы "input N" и "result N".
+
+    Example:
+        >>> prefilter = StatementFilter(operators=["INSERT"])
+        >>> prefilter.accepts("SELECT * FROM orders JOIN users USING (id)")
+        False
+    """
+
+    def __init__(
+        self, operators: Optional[Iterable[str]] = None, ignore_io: bool = False
+    ):
+        self.operators = (
+            frozenset(op.upper() for op in operators) if operators is not None else None
+        )
+        self.ignore_io = ignore_io
+
+    @property
+    def active(self) -> bool:
+        """True, если фильтр может отбросить хотя бы один оператор."""
+        return self.operators is not None or self.ignore_io
+
+    def key(self) -> str:
+        """Строка настроек фильтра для ключа кеша."""
+        operators = (
+            ",".join(sorted(self.operators)) if self.operators is not None else "*"
+        )
+        return f"{operators}:{self.ignore_io}"
+
+    def accepts(self, statement: str) -> bool:
+        """Проверяет, нужно ли разбирать оператор.
+
+        Args:
+            statement (str): Текст оператора.
+
+        Returns:
+            bool: False, если оператор не может дать ребер при текущих настройках.
+        """
+        if not self.active:
+            return True
+        kind, keywords = statement_keywords(statement)
+        if kind not in STATEMENT_KINDS or (kind == "CREATE" and "TABLE" in keywords):
+            return True
+        if kind == "DROP" or (
+            self.ignore_io
+            and kind == "SELECT"
+            and "WITH" not in keywords
+            and "INTO" not in keywords
+        ):
+            return False
+        if self.operators is not None and not any(
+            op in self.operators
+            for keyword in keywords
+            for op in _KEYWORD_OPERATORS.get(keyword, ())
+        ):
+            return False
+        return True
@@ -0,0 +1,179 @@
+import re
+from typing import List, NamedTuple, Optional
+
+# Лексемы, которые сканер обрабатывает: комментарии, строки, идентификаторы
+# в кавычках, открытие долларовой кавычки и ключевые слова заголовка.
+# The pattern starts with a character class so that the regex engine skips
+# ahead to candidate characters; word boundaries are checked by _is_word_start
+_TOKENS = (
+    r"(?<=-)-|(?<=/)\*|(?<=['\"])|(?<=\$)(?:[A-Za-z_]\w*)?\$"
+    r"|(?<=[Pp])(?i:ROCEDURE)(?![\w$])|(?<=[Ff])(?i:UNCTION)(?![\w$])"
+)
+_TOKEN_RE = re.compile(rf"[-/'\"$PpFf](?:{_TOKENS})")
+# В заголовке процедуры дополнительно учитывается конец оператора
+_HEADER_TOKEN_RE = re.compile(rf"[-/'\"$PpFf;](?:{_TOKENS}|(?<=;))")
+# Имя процедуры после ключевого слова (возможно, со схемой и в кавычках)
+_NAME_RE = re.compile(r"""\s+((?:["']?\w+["']?\s*\.\s*)*["']?\w+["']?)\s*(?=\()""")
+_NAME_QUOTES_RE = re.compile(r"""["'\s]""")
+
+
+class ProcedureSpan(NamedTuple):
+    """Процедура, найденная scan_procedures().
+
+    Attributes:
+        name (str): Имя процедуры без кавычек (со схемой, если она указана).
+        start (int): Начало тела процедуры в исходном коде.
+        end (int): Конец тела процедуры (не включительно).
+    """
+
+    name: str
+    start: int
+    end: int
+
+
+def _is_word_start(sql: str, pos: int) -> bool:
+    """True, если слово или долларовая кавычка в pos не продолжает идентификатор."""
+    if pos == 0:
+        return True
+    char = sql[pos - 1]
+    return not (char.isalnum() or char in "_$")
+
+
+def _skip(sql: str, token: str, pos: int) -> int:
+    """Возвращает позицию после комментария, строки или долларовой кавычки token.
+
+    Args:
+        sql (str): Код.
+        token (str): Открывающая лексема.
+        pos (int): Позиция сразу после открывающей лексемы.
+
+    Returns:
+        int: Позиция после закрытия или -1, если конструкция не закрыта.
+    """
+    if token == "--":
+        close = sql.find("\n", pos)
+        return -1 if close == -1 else close + 1
+    if token == "/*":
+        close = sql.find("*/", pos)
+        return -1 if close == -1 else close + 2
+    if token in "'\"":
+        close = pos - 1
+        while True:
+            close = sql.find(token, close + 1)
+            if close == -1:
+                return -1
+            if not sql.startswith(token, close + 1):
+                return close + 1
+            close += 1  # удвоенная кавычка
+    close = sql.find(token, pos)
+    return -1 if close == -1 else close + len(token)
+
+
+def _strip_block(sql: str, start: int, end: int):
+    """Границы кода между первым BEGIN и последним END тела, без пробелов по краям.
+
+    Если в теле нет BEGIN или END, возвращаются границы всего тела.
+    """
+    begin = sql.find("BEGIN", start, end)
+    if begin == -1 or sql.find("END", start, end) == -1:
+        return start, end
+    start = begin + len("BEGIN")
+    close = sql.rfind("END", start, end)
+    if close != -1:
+        end = close
+    while start < end and sql[start].isspace():
+        start += 1
+    while end > start and sql[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _header(sql: str, pos: int) -> Optional[tuple]:
+    """Разбирает заголовок процедуры после ключевого слова PROCEDURE/FUNCTION.
+
+    Args:
+        sql (str): Код.
+        pos (int): Позиция после ключевого слова.
+
+    Returns:
+        Optional[tuple]: (имя, позиция открытия тела, долларовая кавычка тела)
+            или (None, позиция продолжения сканирования, None), если это не
+            объявление процедуры с телом в долларовых кавычках.
+            None - код закончился внутри заголовка.
+    """
+    name_match = _NAME_RE.match(sql, pos)
+    if name_match is None:
+        return None, pos, None
+    name = _NAME_QUOTES_RE.sub("", name_match.group(1))
+    pos = name_match.end()
+    while True:
+        match = _HEADER_TOKEN_RE.search(sql, pos)
+        if match is None:
+            return None
+        token = match.group()
+        pos = match.end()
+        if token[0] in "$PpFf" and not _is_word_start(sql, match.start()):
+            continue
+        if token in ("--", "/*", "'", '"'):
+            pos = _skip(sql, token, pos)
+            if pos == -1:
+                return None
+        elif token[0] == "$":
+            # Parentheses are not balanced: headers like f(a INT)) or
+            # f(a DECIMAL(10,2) with a typo still open the body here
+            return name, pos, token
+        else:
+            # ";" or the next keyword: DROP FUNCTION f(int); EXECUTE FUNCTION f()
+            return None, match.start(), None
+
+
+def scan_procedures(sql: str) -> List[ProcedureSpan]:
+    """Находит процедуры и функции с телом в долларовых кавычках за один проход.
+
+    Ищет объявления вида PROCEDURE|FUNCTION имя(...) ... $tag$ тело $tag$.
+    Ключевые слова и кавычки внутри комментариев, строк и тел процедур не
+    учитываются, поэтому каждый символ кода просматривается не больше одного
+    раза, а время работы линейно по длине кода. Текст тел не копируется:
+    возвращаются только их границы.
+
+    Телом процедуры считается код между первым BEGIN и последним END блока
+    в долларовых кавычках без пробелов по краям (или весь блок, если их нет).
+
+    Args:
+        sql (str): SQL-код.
+
+    Returns:
+        List[ProcedureSpan]: Процедуры в порядке объявления.
+
+    Example:
+        >>> sql = "CREATE FUNCTION f() RETURNS void AS $body$ BEGIN SELECT 1; END $body$"
+        >>> span = scan_procedures(sql)[0]
+        >>> span.name, sql[span.start : span.end]
+        ('f', 'SELECT 1;')
+    """
+    procedures = []
+    pos = 0
+    while True:
+        match = _TOKEN_RE.search(sql, pos)
+        if match is None:
+            return procedures
+        token = match.group()
+        pos = match.end()
+        if token[0] in "$PpFf" and not _is_word_start(sql, match.start()):
+            continue
+        if token[0] in "PpFf":
+            header = _header(sql, pos)
+            if header is None:
+                return procedures
+            name, pos, quote = header
+            if name is None:
+                continue
+            close = sql.find(quote, pos)
+            if close == -1:
+                return procedures
+            procedures.append(ProcedureSpan(name, *_strip_block(sql, pos, close)))
+            pos = close + len(quote)
+            continue
+        pos = _skip(sql, token, pos)
+        if pos == -1:
+            return procedures
@@ -0,0 +1,387 @@
+import re
+from typing import Iterator, List, Optional, Tuple
+
+# Начало конструкций, внутри которых ";" не разделяет операторы
+_SPECIAL_RE = re.compile(r"--|/\*|['\"`;]|(?<![\w$])\$(?:[A-Za-z_]\w*)?\$")
+# Заголовок COPY ... FROM stdin: за ним до строки "\\." идут данные, а не SQL
+_COPY_STDIN_RE = re.compile(
+    r"COPY\s+(?P<target>[^;]+?)\s+FROM\s+STDIN\b", re.IGNORECASE | re.DOTALL
+)
+# Конец данных COPY ... FROM stdin
+_COPY_END = "\n\\."
+# Заголовок INSERT ... VALUES: таблица и необязательный список колонок
+_INSERT_VALUES_RE = re.compile(
+    r"INSERT\s+INTO\s+(?P<target>[^()';]+?(?:\s*\([^()';]*\))?)\s*VALUES\s*(?=\()",
+    re.IGNORECASE,
+)
+# Лексемы внутри кортежей VALUES
+_PAYLOAD_RE = re.compile(r"[()'\"]|--|/\*|\$")
+# Хвост буфера, который может оказаться началом лексемы из _SPECIAL_RE
+_PARTIAL_RE = re.compile(r"(?:[-/]|(?<![\w$])\$\w*)\Z")
+
+
+def split_statements(
+    sql: str, backslash_escapes: bool = False
+) -> List[Tuple[int, str]]:
+    """Делит SQL-код на отдельные операторы по ";" без разбора.
+
+    Точка с запятой внутри строк ('...'), идентификаторов ("..." и `...`),
+    блоков в долларовых кавычках ($$...$$, $tag$...$tag$) и комментариев
+    (-- и /* */) разделителем не считается. Кавычка экранируется удвоением,
+    как в стандартном SQL. Фрагменты из одних пробелов и комментариев пропускаются.
+    Данные после COPY ... FROM stdin (до строки "\\.") операторами не считаются.
+    Незакрытая строка или комментарий продолжаются до конца кода, как и в sqlglot.
+
+    Args:
+        sql (str): SQL-код.
+        backslash_escapes (bool): "\\" экранирует следующий символ в '...' и "..."
+            (MySQL, BigQuery и т.п., см. util.dialect.uses_backslash_escapes).
+
+    Returns:
+        List[Tuple[int, str]]: (номер строки начала оператора, текст оператора без ";").
+
+    Example:
+        >>> split_statements("SELECT ';';\\n-- note\\nSELECT 2;")
+        [(1, "SELECT ';'"), (3, 'SELECT 2')]
+    """
+    statements = []
+    length = len(sql)
+    pos = 0  # позиция, с которой продолжается поиск
+    start = None  # первый значимый символ текущего оператора
+    line, line_pos = 1, 0  # номер строки для позиции line_pos
+
+    def emit(end):
+        nonlocal line, line_pos
+        if start is None:
+            return
+        line += sql.count("\n", line_pos, start)
+        line_pos = start
+        statements.append((line, sql[start:end].rstrip()))
+
+    while pos < length:
+        match = _SPECIAL_RE.search(sql, pos)
+        end = match.start() if match else length
+        if start is None:
+            gap = sql[pos:end]
+            stripped = gap.lstrip()
+            if stripped:
+                start = pos + len(gap) - len(stripped)
+        if match is None:
+            break
+
+        token = match.group()
+        if token == ";":
+            emit(end)
+            pos = match.end()
+            if start is not None and _COPY_STDIN_RE.match(sql, start, end):
+                close = sql.find(_COPY_END, pos)
+                pos = length if close == -1 else close + len(_COPY_END)
+            start = None
+            continue
+
+        if token == "--":
+            close = sql.find("\n", end)
+            pos = length if close == -1 else close + 1
+            continue
+        if token == "/*":
+            close = sql.find("*/", end + 2)
+            pos = length if close == -1 else close + 2
+            continue
+
+        if start is None:
+            start = end
+        if token in "'\"`":
+            close, _ = _closing_quote(
+                sql, token, end + 1, backslash_escapes and token != "`"
+            )
+        else:
+            close = sql.find(token, match.end())
+            if close != -1:
+                close += len(token) - 1
+        pos = length if close == -1 else close + 1
+
+    emit(length)
+    return statements
+
+
+class StatementReader:
+    """Делит SQL-код на операторы по частям, по мере поступления текста.
+
+    Результат совпадает с split_statements() для всего кода, но в памяти
+    хранится только текущий, еще не законченный оператор. Состояние сканера
+    (открытая строка, комментарий или блок в долларовых кавычках) сохраняется
+    между частями, поэтому граница части может проходить где угодно.
+
+    Example:
+        >>> reader = StatementReader()
+        >>> reader.feed("SELECT ';")
+        []
+        >>> reader.feed("';\nSELECT 2")
+        [(1, "SELECT ';'")]
+        >>> reader.close()
+        [(2, 'SELECT 2')]
+    """
+
+    def __init__(self, backslash_escapes: bool = False):
+        self.backslash_escapes = backslash_escapes  # см. split_statements()
+        self._buffer = ""
+        self._pos = 0  # позиция, с которой продолжается поиск
+        self._start = None  # первый значимый символ текущего оператора
+        self._line, self._line_pos = 1, 0  # номер строки для позиции _line_pos
+        # Незакрытая конструкция: (открывающая лексема, позиция поиска закрытия)
+        self._pending: Optional[Tuple[str, int]] = None
+        self._statements: List[Tuple[int, str]] = []
+
+    @property
+    def buffered(self) -> int:
+        """Количество символов, ожидающих конца оператора."""
+        return len(self._buffer)
+
+    def feed(self, text: str) -> List[Tuple[int, str]]:
+        """Добавляет очередную часть кода.
+
+        Returns:
+            List[Tuple[int, str]]: Операторы, законченные в этой части.
+        """
+        self._buffer += text
+        self._scan(final=False)
+        return self._flush()
+
+    def close(self) -> List[Tuple[int, str]]:
+        """Завершает код: незакрытые конструкции продолжаются до его конца.
+
+        Returns:
+            List[Tuple[int, str]]: Оставшиеся операторы.
+        """
+        self._scan(final=True)
+        self._emit(len(self._buffer))
+        self._start = None
+        self._pos = len(self._buffer)
+        return self._flush()
+
+    def _emit(self, end: int):
+        if self._start is None:
+            return
+        self._line += self._buffer.count("\n", self._line_pos, self._start)
+        self._line_pos = self._start
+        self._statements.append((self._line, self._buffer[self._start : end].rstrip()))
+
+    def _close_pending(self, final: bool) -> bool:
+        """Ищет закрытие открытой конструкции. False - нужно больше текста."""
+        sql = self._buffer
+        length = len(sql)
+        token, search = self._pending
+        if token == "--":
+            close = sql.find("\n", search)
+            end = close + 1
+        elif token == "/*":
+            close = sql.find("*/", search)
+            end = close + 2
+        elif token in "'\"`":
+            close, search = _closing_quote(
+                sql, token, search, self.backslash_escapes and token != "`"
+            )
+            if close != -1 and close + 1 >= length and not final:
+                self._pending = (token, close)  # может оказаться удвоенной кавычкой
+                return False
+            end = close + 1
+        else:
+            close = sql.find(token, search)
+            end = close + len(token)
+
+        if close == -1:
+            if final:
+                self._pos = length
+                self._pending = None
+                return True
+            # Закрывающая лексема может начинаться в конце буфера
+            closer = "\n" if token == "--" else "*/" if token == "/*" else token
+            self._pending = (token, max(search, length - len(closer) + 1))
+            return False
+        self._pos = end
+        self._pending = None
+        return True
+
+    def _scan(self, final: bool):
+        sql = self._buffer
+        length = len(sql)
+        while True:
+            if self._pending is not None:
+                if not self._close_pending(final):
+                    return
+                continue
+            if self._pos >= length:
+                return
+
+            match = _SPECIAL_RE.search(sql, self._pos)
+            if match is None:
+                end = length
+                if not final:
+                    partial = _PARTIAL_RE.search(sql, self._pos)
+                    if partial is not None:
+                        end = partial.start()
+            else:
+                end = match.start()
+            if self._start is None:
+                gap = sql[self._pos : end]
+                stripped = gap.lstrip()
+                if stripped:
+                    self._start = self._pos + len(gap) - len(stripped)
+            if match is None:
+                self._pos = end
+                return
+
+            token = match.group()
+            if token == ";":
+                self._emit(end)
+                if self._start is not None and _COPY_STDIN_RE.match(
+                    sql, self._start, end
+                ):
+                    self._pending = (_COPY_END, match.end())
+                self._start = None
+                self._pos = match.end()
+                continue
+            if token not in ("--", "/*") and self._start is None:
+                self._start = end
+            self._pending = (token, match.end())
+            self._pos = match.end()
+
+    def _flush(self) -> List[Tuple[int, str]]:
+        """Отдает готовые операторы и отбрасывает обработанное начало буфера."""
+        # Символ перед _pos нужен для проверки начала долларовой кавычки
+        cut = self._pos - 1 if self._start is None else min(self._start, self._pos - 1)
+        if cut > 0:
+            self._line += self._buffer.count("\n", self._line_pos, cut)
+            self._line_pos = 0
+            self._buffer = self._buffer[cut:]
+            self._pos -= cut
+            if self._start is not None:
+                self._start -= cut
+            if self._pending is not None:
+                token, search = self._pending
+                self._pending = (token, search - cut)
+        statements, self._statements = self._statements, []
+        return statements
+
+
+def read_statements(
+    file_path: str, chunk_size: int = 1024 * 1024, backslash_escapes: bool = False
+) -> Iterator[Tuple[int, str]]:
+    """Читает операторы из файла частями (см. StatementReader).
+
+    Если один оператор больше chunk_size, размер чтения растет вместе
+    с буфером, поэтому общее время остается линейным.
+
+    Args:
+        file_path (str): Путь к файлу в кодировке UTF-8.
+        chunk_size (int): Минимальный размер читаемой части в символах.
+        backslash_escapes (bool): См. split_statements().
+
+    Yields:
+        Tuple[int, str]: (номер строки начала оператора, текст оператора без ";").
+    """
+    reader = StatementReader(backslash_escapes)
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(max(chunk_size, reader.buffered))
+            if not chunk:
+                break
+            yield from reader.feed(chunk)
+    yield from reader.close()
+
+
+def strip_bulk_data(statement: str, backslash_escapes: bool = False) -> str:
+    """Заменяет данные INSERT ... VALUES и COPY ... FROM stdin одним пустым кортежем.
+
+    Для таких операторов важны только таблица и список колонок, а разбор
+    сотен тысяч кортежей занимает почти все время анализа. Кортежи только
+    пролистываются (учитываются скобки и строки), без разбора выражений.
+    Если после кортежей есть что-то еще (ON CONFLICT, RETURNING и т.п.)
+    или в них встречаются комментарии, оператор не меняется.
+
+    Args:
+        statement (str): Текст оператора (см. split_statements()).
+        backslash_escapes (bool): См. split_statements().
+
+    Returns:
+        str: "INSERT INTO <таблица> [(<колонки>)] VALUES (NULL)" или исходный текст.
+
+    Examples:
+        >>> strip_bulk_data("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')")
+        'INSERT INTO t (a, b) VALUES (NULL)'
+        >>> strip_bulk_data("COPY public.t (a, b) FROM stdin")
+        'INSERT INTO public.t (a, b) VALUES (NULL)'
+    """
+    match = _COPY_STDIN_RE.match(statement)
+    if match is None:
+        match = _INSERT_VALUES_RE.match(statement)
+        if match is None or not _only_tuples(statement, match.end(), backslash_escapes):
+            return statement
+    return f"INSERT INTO {match.group('target')} VALUES (NULL)"
+
+
+def _only_tuples(sql: str, pos: int, backslash_escapes: bool) -> bool:
+    """Проверяет, что sql[pos:] - только кортежи "(...)" через запятую."""
+    length = len(sql)
+    while True:
+        if not sql.startswith("(", pos):
+            return False
+        depth = 0
+        while True:
+            match = _PAYLOAD_RE.search(sql, pos)
+            if match is None:
+                return False
+            token = match.group()
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif token in "'\"":
+                close, _ = _closing_quote(sql, token, match.end(), backslash_escapes)
+                if close == -1:
+                    return False
+                pos = close + 1
+                continue
+            else:
+                return False  # комментарий или долларовая кавычка
+            pos = match.end()
+            if depth == 0:
+                break
+        while pos < length and sql[pos].isspace():
+            pos += 1
+        if pos == length:
+            return True
+        if sql[pos] != ",":
+            return False
+        pos += 1
+        while pos < length and sql[pos].isspace():
+            pos += 1
+
+
+def _closing_quote(
+    sql: str, quote: str, pos: int, backslash_escapes: bool
+) -> Tuple[int, int]:
+    """Ищет кавычку, закрывающую строку, начиная с позиции pos.
+
+    Удвоенная кавычка, а при backslash_escapes и символ после "\\",
+    строку не закрывают.
+
+    Returns:
+        Tuple[int, int]: (позиция закрывающей кавычки или -1, позиция,
+            с которой продолжить поиск, если строка не закрыта).
+    """
+    close = sql.find(quote, pos)
+    slash = sql.find("\\", pos) if backslash_escapes else -1
+    while True:
+        if slash != -1 and (close == -1 or slash < close):
+            pos = slash + 2  # экранированный символ
+            slash = sql.find("\\", pos)
+            if close != -1 and close < pos:
+                close = sql.find(quote, pos)
+            continue
+        if close == -1:
+            return -1, max(pos, len(sql))
+        if not sql.startswith(quote, close + 1):
+            return close, close
+        pos = close + 2  # удвоенная кавычка
+        close = sql.find(quote, pos)
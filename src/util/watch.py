@@ -0,0 +1,248 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from logger_config import logger
+
+WATCH_INTERVAL = 0.5  # seconds between polls / wake-ups of the watch loop
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; the name follows
+
+
+class _Inotify:
+    """Минимальная обертка над inotify(7) через ctypes, без внешних зависимостей.
+
+    Attributes:
+        fd (int): Неблокирующий дескриптор inotify.
+        watches (Dict[int, str]): Дескриптор наблюдения -> директория.
+
+    Raises:
+        OSError: Если inotify недоступен (не Linux, исчерпан лимит наблюдений).
+    """
+
+    MASK = (
+        IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MOVE_SELF
+    )
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        try:
+            self._init = libc.inotify_init1
+            self._add_watch = libc.inotify_add_watch
+        except AttributeError as e:
+            raise OSError(f"inotify is not supported by libc: {e}")
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = self._init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            self._raise("inotify_init1")
+        self.watches: Dict[int, str] = {}
+
+    @staticmethod
+    def _raise(call: str):
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{call}: {os.strerror(errno)}")
+
+    def add_watch(self, directory: str):
+        """Начинает наблюдение за директорией (повторный вызов ничего не меняет)."""
+        wd = self._add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            self._raise("inotify_add_watch")
+        self.watches[wd] = directory
+
+    def read(self, timeout: float) -> List[Tuple[str, str, int]]:
+        """Ждет события не дольше timeout секунд.
+
+        Returns:
+            List[Tuple[str, str, int]]: События (директория, имя, маска).
+                Пустой список - событий за timeout не было.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((self.watches.get(wd, ""), name, mask))
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Отслеживает изменения SQL-файлов директории для режима --watch.
+
+    На Linux изменения приходят от inotify: после сохранения файла wait()
+    возвращается сразу, не дожидаясь следующего опроса. Если inotify
+    недоступен, директория опрашивается раз в timeout секунд и сравниваются
+    mtime и размеры файлов. Создание, удаление и переименование
+    поддиректорий, а также переполнение очереди событий inotify приводят
+    к полному пересканированию директории.
+
+    Watcher сообщает только о том, что файл мог измениться; совпадает ли
+    содержимое, решает FileManifest (см. GraphManager.update_files).
+
+    Attributes:
+        directory (str): Абсолютный путь к директории.
+        extensions (tuple): Расширения отслеживаемых файлов.
+        backend (str): "inotify" или "polling".
+
+    Example:
+        >>> with FileWatcher("./sql_scripts") as watcher:
+        ...     changed = watcher.wait(0.5)
+    """
+
+    # Editors save a file in several steps (truncate, write, rename), so events
+    # are collected until the directory is quiet for this many seconds
+    DEBOUNCE = 0.05
+
+    def __init__(
+        self,
+        directory: str,
+        extensions: Iterable[str] = (".sql", ".ddl"),
+        use_inotify: bool = True,
+    ):
+        """Запоминает текущее состояние файлов директории.
+
+        Args:
+            directory (str): Путь к директории.
+            extensions (Iterable[str]): Расширения отслеживаемых файлов.
+            use_inotify (bool): Использовать inotify, если он доступен.
+                False - всегда опрашивать директорию.
+        """
+        self.directory = os.path.abspath(directory)
+        self.extensions = tuple(extensions)
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except OSError as e:
+                logger.debug(f"inotify is unavailable, polling {directory}: {e}")
+        self.backend = "polling" if self._inotify is None else "inotify"
+        self._snapshot = self._scan()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Освобождает дескриптор inotify."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    @staticmethod
+    def _stamp(file_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """(mtime, размер) всех отслеживаемых файлов; в режиме inotify - и наблюдения."""
+        snapshot = {}
+        for root, _, files in os.walk(self.directory):
+            if self._inotify is not None:
+                try:
+                    self._inotify.add_watch(root)
+                except OSError as e:
+                    logger.warning(f"Cannot watch {root}: {e}")
+            for name in files:
+                if name.endswith(self.extensions):
+                    path = os.path.join(root, name)
+                    stamp = self._stamp(path)
+                    if stamp is not None:
+                        snapshot[path] = stamp
+        return snapshot
+
+    def _rescan(self) -> List[str]:
+        snapshot = self._scan()
+        changed = [
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        ]
+        self._snapshot = snapshot
+        return sorted(changed)
+
+    def _update(self, file_paths: Iterable[str]) -> List[str]:
+        changed = []
+        for path in file_paths:
+            stamp = self._stamp(path)
+            if stamp == self._snapshot.get(path):
+                continue
+            if stamp is None:
+                del self._snapshot[path]
+            else:
+                self._snapshot[path] = stamp
+            changed.append(path)
+        return sorted(changed)
+
+    def wait(self, timeout: float = WATCH_INTERVAL) -> List[str]:
+        """Ждет изменений не дольше timeout секунд.
+
+        Args:
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Returns:
+            List[str]: Абсолютные пути добавленных, измененных и удаленных
+                файлов. Пустой список - изменений не было.
+        """
+        if self._inotify is None:
+            time.sleep(timeout)
+            return self._rescan()
+        events = self._inotify.read(timeout)
+        if not events:
+            return []
+        while True:
+            more = self._inotify.read(self.DEBOUNCE)
+            if not more:
+                break
+            events.extend(more)
+
+        file_paths = set()
+        for directory, name, mask in events:
+            if mask & (IN_Q_OVERFLOW | IN_ISDIR | IN_DELETE_SELF | IN_MOVE_SELF):
+                # Lost events or a changed directory tree: compare everything
+                return self._rescan()
+            if name.endswith(self.extensions):
+                file_paths.add(os.path.join(directory, name))
+        return self._update(file_paths)
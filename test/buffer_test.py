@@ -1,12 +1,18 @@
 __all__ = []
 
+import os
+
 import pytest
 
 from src.base.storage import BuffWrite, Edge
 from src.func.buff_tables import (
     Procedure,
     BufferTable,
+    BufferTableIndex,
+    NewBuffGraphManager,
 )
+from src.settings import BASE_DIR
+from src.util.cache import ParseCache
 
 
 @pytest.mark.usefixtures("writer_proc", "reader_proc")
@@ -86,3 +92,133 @@ class TestBuffer:
             assert table.name in text
             for proc in table.read_procedures.union(table.write_procedures):
                 assert proc.name in text
+
+
+class TestProcedureCache:
+    SQL = """
+    CREATE PROCEDURE load_stage() AS $$ INSERT INTO stage SELECT * FROM src; $$;
+    CREATE PROCEDURE load_mart() AS $$ INSERT INTO mart SELECT * FROM stage; $$;
+    CREATE PROCEDURE load_copy() AS $$ INSERT INTO stage SELECT * FROM src; $$;
+    """
+
+    @staticmethod
+    def _tables(buff_tables):
+        return sorted(
+            (
+                table.name,
+                sorted(p.name for p in table.write_procedures),
+                sorted(p.name for p in table.read_procedures),
+            )
+            for table in buff_tables
+        )
+
+    def test_unchanged_procedures_are_cached(self, tmp_path):
+        cache = ParseCache(str(tmp_path))
+        procedures = Procedure.extract_procedures(self.SQL)
+
+        first = BufferTable.find_buffer_tables(procedures, [], cache=cache)
+        # Identical bodies of different procedures get different synthetic
+        # node names, so each procedure is analyzed
+        assert (cache.hits, cache.misses) == (0, 3)
+
+        changed = self.SQL.replace("FROM stage", "FROM stage WHERE 1 = 1")
+        second = BufferTable.find_buffer_tables(
+            Procedure.extract_procedures(changed), [], cache=cache
+        )
+
+        assert (cache.hits, cache.misses) == (2, 4)
+        assert self._tables(first) == self._tables(second)
+        assert self._tables(first) == [
+            ("stage", ["load_copy", "load_stage"], ["load_mart"])
+        ]
+
+    def test_pool_matches_serial(self):
+        with open(BASE_DIR / "buff_dml" / "FeedPurchase_Procedures.ddl") as f:
+            procedures = Procedure.extract_procedures(f.read())
+
+        serial = BufferTable.analyze_procedures([p.code for p in procedures])
+        pooled = BufferTable.analyze_procedures([p.code for p in procedures], jobs=2)
+
+        assert pooled == serial
+
+
+class TestBufferTableIndex:
+    LOAD = (
+        "CREATE PROCEDURE load_stage() AS $$ INSERT INTO stage SELECT * FROM src; $$;"
+    )
+    MART = (
+        "CREATE PROCEDURE load_mart() AS $$ INSERT INTO mart SELECT * FROM stage; $$;"
+    )
+
+    @staticmethod
+    def _dependencies(sql_code):
+        return BufferTable.procedure_dependencies(
+            Procedure.extract_procedures(sql_code)
+        )
+
+    def test_buffer_table_across_files(self):
+        index = BufferTableIndex()
+        index.add_dependencies(self._dependencies(self.LOAD), source_file="load.ddl")
+        assert index.buffer_tables() == set()
+
+        index.add_dependencies(self._dependencies(self.MART), source_file="mart.ddl")
+
+        assert index.buffer_tables() == {"stage"}
+        nodes, edges = index.get_filtered_nodes_edges()
+        assert nodes == {"stage", r"\$load_stage\$", r"\$load_mart\$"}
+        assert {(s, t, d["operation"]) for s, t, d in edges} == {
+            (r"\$load_stage\$", "stage", "BuffWrite"),
+            ("stage", r"\$load_mart\$", "BuffRead"),
+        }
+
+    def test_procedures_of_one_file_are_not_linked(self):
+        sql_code = (
+            "CREATE PROCEDURE p1() AS $$ SELECT * FROM a; $$;\n"
+            "CREATE PROCEDURE p2() AS $$ SELECT * FROM b; $$;\n"
+            "CREATE PROCEDURE p2() AS $$ SELECT * FROM c; $$;"
+        )
+        index = BufferTableIndex()
+        index.add_dependencies(
+            BufferTable.procedure_dependencies(
+                Procedure.extract_procedures(sql_code), source_path="/etl/p.ddl"
+            ),
+            source_file="/etl/p.ddl",
+        )
+
+        assert {t for t in index.writers if t.startswith("result")} == {
+            "result /etl/p.ddl#p1:1",
+            "result /etl/p.ddl#p2:1",
+            "result /etl/p.ddl#p2#2:1",
+        }
+        assert index.buffer_tables() == set()
+
+    def test_remove_file_updates_index(self):
+        index = BufferTableIndex()
+        index.add_dependencies(self._dependencies(self.LOAD), source_file="load.ddl")
+        index.add_dependencies(self._dependencies(self.MART), source_file="mart.ddl")
+
+        index.remove_files(["mart.ddl"])
+
+        assert index.buffer_tables() == set()
+        assert "stage" not in index.readers
+        assert index.get_filtered_nodes_edges() == (set(), [])
+
+    def test_incremental_directory(self, tmp_path):
+        directory = tmp_path / "ddl"
+        directory.mkdir()
+        (directory / "load.ddl").write_text(self.LOAD)
+        (directory / "mart.ddl").write_text(self.MART)
+        state = str(tmp_path / "state.pkl")
+
+        manager = NewBuffGraphManager()
+        manager.process_directory(directory, incremental=True)
+        manager.save_state(state)
+        assert manager.storage.buffer_tables() == {"stage"}
+
+        (directory / "mart.ddl").write_text(self.MART.replace("stage", "src"))
+        manager = NewBuffGraphManager()
+        assert manager.load_state(state)
+        results = manager.process_directory(directory, incremental=True)
+
+        assert [os.path.basename(path) for path, _ in results] == ["mart.ddl"]
+        assert manager.storage.buffer_tables() == set()
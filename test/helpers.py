@@ -0,0 +1,45 @@
+"""Общие помощники тестов: приводят результаты разбора и графы к сравнимому виду."""
+
+__all__ = ["SlowSqlAst", "file_edges", "graph"]
+
+import os
+import time
+
+from src.base.parse import SqlAst
+
+
+class SlowSqlAst(SqlAst):
+    """Зависает на операторах с таблицей slow."""
+
+    def _analyze_statement(self, statement, index, line, visitor):
+        if "slow" in statement.sql():
+            time.sleep(30)
+        super()._analyze_statement(statement, index, line, visitor)
+
+
+def file_edges(results):
+    """Результаты DirectoryParser в виде [(имя файла, рёбра, корректировки)].
+
+    Рёбра - отсортированные тройки (источник, цель, операция).
+    """
+    return [
+        (
+            os.path.basename(path),
+            sorted(
+                (edge.source, edge.target, edge.op_type.__name__)
+                for edges in dependencies.values()
+                for edge in edges
+            ),
+            corrections,
+        )
+        for dependencies, corrections, path in results
+    ]
+
+
+def graph(storage):
+    """Узлы и рёбра хранилища после фильтров (см. get_filtered_nodes_edges)."""
+    nodes, edges = storage.get_filtered_nodes_edges()
+    return (
+        {str(node) for node in nodes},
+        sorted((str(s), str(t), sorted(d.items())) for s, t, d in edges),
+    )
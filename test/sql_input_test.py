@@ -61,7 +61,7 @@ class TestSqlInput:
             self.graph_manager.storage.operator_filter,
         )
 
-        assert graph_storage[0] == {"input 0", table_name}
+        assert graph_storage[0] == {"input 1", table_name}
 
         # Проверка ребер (убираем дубликаты)
         unique_edges = list(
@@ -74,7 +74,7 @@ class TestSqlInput:
         assert len(unique_edges) == 1, f"Found duplicate edges: {graph_storage[1]}"
 
         edge = unique_edges[0]
-        assert edge[0] == "input 0"  # source
+        assert edge[0] == "input 1"  # source
         assert edge[1] == table_name  # target
         assert dict(edge[2]) == {"operation": "Insert", "color": "red"}
 
@@ -154,17 +154,17 @@ class TestSqlInput:
                 self.graph_manager.storage.operator_filter,
             )
 
-            assert graph_storage[0] == set(["input 0", "input 1", table_name_1])
+            assert graph_storage[0] == set(["input 1", "input 2", table_name_1])
 
             assert sorted(graph_storage[1]) == sorted(
                 [
                     (
-                        "input 0",
+                        "input 1",
                         table_name_1,
                         {"operation": "Insert", "color": ANY},
                     ),
                     (
-                        "input 1",
+                        "input 2",
                         table_name_1,
                         {"operation": "Insert", "color": ANY},
                     ),
@@ -217,17 +217,17 @@ class TestSqlInput:
             self.graph_manager.storage.edges,
         )
 
-        assert graph_storage[0] == set(["input 0", "input 1", table_name_1])
+        assert graph_storage[0] == set(["input 1", "input 2", table_name_1])
 
         assert sorted(graph_storage[1]) == sorted(
             [
                 (
-                    "input 0",
+                    "input 1",
                     table_name_1,
                     {"operation": "Insert", "color": ANY},
                 ),
                 (
-                    "input 1",
+                    "input 2",
                     table_name_1,
                     {"operation": "Insert", "color": ANY},
                 ),
@@ -304,6 +304,14 @@ class TestSqlInput:
 
         assert correction_message in corrections[0]
 
+    def test_graph_manager_process_sql_snippets_do_not_share_nodes(self):
+        self.graph_manager.process_sql("SELECT * FROM a;")
+        self.graph_manager.process_sql("SELECT * FROM b; SELECT * FROM c;")
+
+        assert sorted(
+            (src, dst) for src, dst, _ in self.graph_manager.storage.edges
+        ) == [("a", "result 1"), ("b", "result 2"), ("c", "result 3")]
+
 
 @dataclass
 class SqlTestCase:
@@ -346,11 +354,10 @@ class TestJoinInput:
                     JOIN table2 t2 ON t1.id = t2.t1_id
                   ) AS subquery
                   JOIN table3 ON subquery.id = table3.sub_id;""",
-            expected_nodes={"table3", "unknown 4", "unknown 5"},
+            expected_nodes={"table3", "unknown 1"},
             expected_edges={
                 ("table3", "join"),
-                ("unknown 4", "select"),
-                ("unknown 5", "select"),
+                ("unknown 1", "select"),
             },
             name="nested_join_table1_table2_table3",
         ),
@@ -0,0 +1,82 @@
+__all__ = []
+
+import asyncio
+import os
+
+from src.base.manager import GraphManager
+from src.base.parse import DirectoryParser, SqlAst
+from src.settings import BASE_DIR
+from test.helpers import file_edges
+
+
+async def _collect(results):
+    return [result async for result in results]
+
+
+class CountingParser(DirectoryParser):
+    """Считает прочитанные файлы, чтобы проверить ограничение памяти конвейера."""
+
+    reads = 0
+
+    def _read_file(self, file_path):
+        type(self).reads += 1
+        return super()._read_file(file_path)
+
+
+class TestAsyncPipeline:
+    def test_matches_sequential(self):
+        directory = BASE_DIR / "ddl"
+        parser = DirectoryParser(SqlAst)
+
+        sequential = file_edges(parser.parse_directory(directory))
+        pipelined = file_edges(asyncio.run(_collect(parser.aiter_directory(directory))))
+        pooled = file_edges(
+            asyncio.run(_collect(parser.aiter_directory(directory, jobs=2)))
+        )
+
+        assert pipelined == sequential
+        assert pooled == sequential
+
+    def test_reading_is_bounded(self, tmp_path):
+        for i in range(30):
+            (tmp_path / f"{i:02d}.sql").write_text(f"INSERT INTO t{i} SELECT * FROM s;")
+        parser = CountingParser(SqlAst)
+        ahead = []
+
+        async def consume():
+            done = 0
+            async for _ in parser.aiter_directory(tmp_path, queue_size=2):
+                done += 1
+                # A slow storage stage: the reader must wait for it
+                await asyncio.sleep(0.01)
+                ahead.append(CountingParser.reads - done)
+            return done
+
+        assert asyncio.run(consume()) == 30
+        assert max(ahead) <= 2 * 2 + 1
+
+    def test_read_error_is_reported(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a SELECT * FROM b;")
+        (tmp_path / "b.sql").write_bytes(b"\xff\xfe INSERT")
+
+        results = asyncio.run(_collect(DirectoryParser().aiter_directory(tmp_path)))
+
+        assert [os.path.basename(path) for _, _, path in results] == ["a.sql", "b.sql"]
+        assert results[1][1][0].startswith("Error:")
+
+
+class TestManagerAsync:
+    def test_incremental(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a SELECT * FROM b;")
+        (tmp_path / "b.sql").write_text("INSERT INTO c SELECT * FROM d;")
+        manager = GraphManager()
+        asyncio.run(manager.process_directory_async(tmp_path, incremental=True))
+        assert manager.storage.nodes == {"a", "b", "c", "d"}
+
+        (tmp_path / "b.sql").write_text("INSERT INTO e SELECT * FROM a;")
+        results = asyncio.run(
+            manager.process_directory_async(tmp_path, incremental=True)
+        )
+
+        assert [os.path.basename(path) for path, _ in results] == ["b.sql"]
+        assert manager.storage.nodes == {"a", "b", "e"}
@@ -0,0 +1,167 @@
+__all__ = []
+
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src.base.parse import DirectoryParser, SqlAst, WorkerPool
+from src.util.budget import BudgetExceeded, TimeBudget
+
+# The parser catches the exceptions of the budget it imports itself
+from src.base.parse import TimeBudget as ParserTimeBudget
+from test.helpers import SlowSqlAst
+
+
+class StuckSqlAst(SqlAst):
+    """Зависает на файлах с таблицей stuck, не давая прервать себя таймером."""
+
+    def __init__(self, sql_code, **kwargs):
+        if "stuck" in sql_code:
+            signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+            time.sleep(30)
+        super().__init__(sql_code, **kwargs)
+
+
+def _write(directory, files):
+    for name, sql in files.items():
+        (directory / name).write_text(sql)
+
+
+class TestTimeBudget:
+    def test_statement_timeout_skips_statement(self):
+        ast = SlowSqlAst(
+            "INSERT INTO a SELECT * FROM b; INSERT INTO c SELECT * FROM slow; "
+            "INSERT INTO d SELECT * FROM e;",
+            budget=ParserTimeBudget(statement_seconds=0.2),
+        )
+
+        assert set(ast.get_dependencies()) == {"a", "d"}
+        assert len(ast.corrections) == 1
+        assert ast.corrections[0].startswith("Timeout: statement 2 (line 1)")
+
+    def test_file_budget_is_checked(self):
+        budget = TimeBudget(file_seconds=0.1)
+
+        with pytest.raises(BudgetExceeded) as error:
+            with budget.file():
+                time.sleep(5)
+
+        assert error.value.scope == "file"
+        assert 0.1 <= error.value.elapsed < 5
+
+    def test_threads_keep_their_own_deadlines(self):
+        # Threads of the server share the parser's budget
+        budget = TimeBudget(file_seconds=0.1)
+        started, finished = threading.Event(), threading.Event()
+        errors = []
+
+        def other_file():
+            with budget.file():
+                started.set()
+                time.sleep(0.2)
+            finished.set()
+
+        def this_file():
+            started.wait()
+            time.sleep(0.15)
+            try:
+                budget.check()  # the other file is over budget, not this thread
+                with budget.file():
+                    finished.wait()
+                    time.sleep(0.1)
+                    budget.check()
+            except BudgetExceeded as e:
+                errors.append((finished.is_set(), e))
+
+        threads = [threading.Thread(target=f) for f in (other_file, this_file)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Only the second check fails: the end of the other file keeps this deadline
+        [(second_check, error)] = errors
+        assert second_check and error.scope == "file" and error.elapsed >= 0.1
+
+    def test_timed_out_file_does_not_stop_directory(self, tmp_path):
+        _write(
+            tmp_path,
+            {
+                "a.sql": "INSERT INTO a SELECT * FROM b;",
+                "b.sql": "INSERT INTO c SELECT * FROM slow;",
+                "c.sql": "INSERT INTO d SELECT * FROM e;",
+            },
+        )
+        parser = DirectoryParser(SlowSqlAst, budget=ParserTimeBudget(file_seconds=0.3))
+
+        results = parser.parse_directory(tmp_path)
+
+        assert [sorted(dependencies) for dependencies, _, _ in results] == [
+            ["a"],
+            [],
+            ["d"],
+        ]
+        assert results[1][1][0].startswith("Timeout: file exceeded 0.3s")
+
+    @pytest.mark.skipif(
+        not hasattr(signal, "pthread_sigmask"), reason="needs pthread_sigmask"
+    )
+    def test_stuck_worker_is_replaced(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(DirectoryParser, "WATCHDOG_GRACE", 1.0)
+        _write(
+            tmp_path,
+            {
+                "a.sql": "INSERT INTO a SELECT * FROM b;",
+                "b.sql": "INSERT INTO c SELECT * FROM stuck;",
+                "c.sql": "INSERT INTO d SELECT * FROM e;",
+                "d.sql": "INSERT INTO f SELECT * FROM g;",
+            },
+        )
+        parser = DirectoryParser(StuckSqlAst, budget=ParserTimeBudget(file_seconds=2))
+
+        started = time.perf_counter()
+        results = parser.parse_directory(tmp_path, jobs=2)
+
+        assert time.perf_counter() - started < 25
+        assert [os.path.basename(path) for _, _, path in results] == [
+            "a.sql",
+            "b.sql",
+            "c.sql",
+            "d.sql",
+        ]
+        assert "Timeout: file exceeded 2s" in results[1][1][0]
+        assert [sorted(dependencies) for dependencies, _, _ in results] == [
+            ["a"],
+            [],
+            ["d"],
+            ["f"],
+        ]
+
+    @pytest.mark.skipif(
+        not hasattr(signal, "pthread_sigmask"), reason="needs pthread_sigmask"
+    )
+    def test_stuck_worker_of_shared_pool_is_replaced(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(DirectoryParser, "WATCHDOG_GRACE", 1.0)
+        _write(
+            tmp_path,
+            {
+                "a.sql": "INSERT INTO a SELECT * FROM b;",
+                "b.sql": "INSERT INTO c SELECT * FROM stuck;",
+            },
+        )
+        parser = DirectoryParser(StuckSqlAst, budget=ParserTimeBudget(file_seconds=2))
+
+        with WorkerPool(1) as pool:
+            pool.start()
+            executor = pool.executor
+            results = list(parser.iter_directory(tmp_path, pool=pool))
+
+            assert "Timeout: file exceeded 2s" in results[1][1][0]
+            assert pool.executor is not executor
+            [(dependencies, _, _)] = parser.iter_files(
+                [str(tmp_path / "a.sql")], pool=pool
+            )
+            assert sorted(dependencies) == ["a"]
@@ -0,0 +1,80 @@
+__all__ = []
+
+import os
+import pickle
+
+import pytest
+
+from src.base.columnar import ColumnarGraphStorage
+from src.base.parse import DirectoryParser, SqlAst
+from src.base.storage import GraphStorage
+from test.helpers import graph
+
+DDL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "ddl")
+
+
+class TestColumnarGraphStorage:
+    @pytest.fixture(scope="class")
+    def results(self):
+        return DirectoryParser().parse_directory(DDL_DIR)
+
+    def _fill(self, storage, results):
+        for dependencies, _, file_path in results:
+            storage.add_dependencies(dependencies, source_file=file_path)
+        return storage
+
+    @pytest.mark.parametrize("operators", [None, "INSERT,JOIN", "SELECT,TABLE"])
+    def test_matches_graph_storage(self, results, operators):
+        expected, columnar = GraphStorage(), ColumnarGraphStorage()
+        expected.set_operator_filter(operators)
+        columnar.set_operator_filter(operators)
+
+        self._fill(expected, results)
+        self._fill(columnar, results)
+
+        assert graph(columnar) == graph(expected)
+        assert columnar.nodes == expected.nodes
+
+    @pytest.mark.parametrize("operators", [None, "UPDATE"])
+    def test_remove_files(self, results, operators):
+        expected, columnar = GraphStorage(), ColumnarGraphStorage()
+        expected.set_operator_filter(operators)
+        columnar.set_operator_filter(operators)
+        self._fill(expected, results)
+        self._fill(columnar, results)
+        removed = [file_path for _, _, file_path in results[::2]]
+
+        expected.remove_files(removed)
+        columnar.remove_files(removed)
+
+        assert graph(columnar) == graph(expected)
+        assert columnar.nodes == expected.nodes
+
+    def test_pickle_round_trip(self, results):
+        columnar = self._fill(ColumnarGraphStorage(), results)
+
+        restored = pickle.loads(pickle.dumps(columnar))
+
+        assert graph(restored) == graph(columnar)
+        restored.clear()
+        assert restored.nodes == set() and restored.edges == []
+
+    def test_remove_add_cycles_reuse_names(self, results):
+        expected, columnar = GraphStorage(), ColumnarGraphStorage()
+        self._fill(expected, results)
+        self._fill(columnar, results)
+        names = len(columnar._names)
+
+        for i in range(50):
+            # Every edit brings new node names, like synthetic statement nodes
+            dependencies = SqlAst(
+                f"INSERT INTO t{i} SELECT * FROM s{i}; SELECT * FROM s{i};",
+                source_path="edit.sql",
+            ).get_dependencies()
+            for storage in (expected, columnar):
+                storage.remove_files(["edit.sql"])
+                storage.add_dependencies(dependencies, source_file="edit.sql")
+
+        assert graph(columnar) == graph(expected)
+        assert columnar.nodes == expected.nodes
+        assert len(columnar._names) <= 2 * (names + 3)
@@ -0,0 +1,88 @@
+__all__ = []
+
+import itertools
+
+from src.base.manager import GraphManager
+from src.base.parse import SqlAst
+from src.util.cycles import CycleReport
+
+
+class TestCycleReport:
+    def test_components_and_examples(self):
+        edges = [("a", "b"), ("b", "a"), ("b", "c"), ("c", "c"), ("x", "y")]
+        edges += [("y", "z"), ("z", "x"), ("x", "z")]
+
+        report = CycleReport.from_edges(edges)
+
+        assert report.components == [
+            (["x", "y", "z"], [["x", "z"], ["x", "y", "z"]]),
+            (["a", "b"], [["a", "b"]]),
+            (["c"], [["c"]]),
+        ]
+        assert report.cyclic_nodes() == {"a", "b", "c", "x", "y", "z"}
+
+    def test_acyclic_graph(self):
+        report = CycleReport.from_edges([("a", "b"), ("b", "c"), ("a", "c")])
+
+        assert not report
+        assert report.format() == "No cycles found"
+
+    def test_examples_are_bounded_on_dense_graph(self):
+        # A complete graph on 40 nodes has more simple cycles than can be listed
+        nodes = [f"stg_{i}" for i in range(40)]
+        edges = list(itertools.permutations(nodes, 2))
+
+        report = CycleReport.from_edges(edges, max_cycles=5)
+
+        assert len(report.components) == 1
+        component, cycles = report.components[0]
+        assert len(component) == 40
+        assert len(cycles) == 5
+        assert all(len(cycle) == 2 for cycle in cycles)
+
+    def test_long_chain_does_not_recurse(self):
+        edges = [(i, i + 1) for i in range(100_000)] + [(100_000, 0)]
+
+        report = CycleReport.from_edges(edges, max_cycles=1)
+
+        assert len(report.components[0][0]) == 100_001
+        assert len(report.cycles()[0]) == 100_001
+
+    def test_ring_is_searched_once(self):
+        edges = [(i, (i + 1) % 50_000) for i in range(50_000)]
+
+        report = CycleReport.from_edges(edges, max_cycles=3)
+
+        assert len(report.cycles()) == 1
+
+
+class TestSqlAstCycles:
+    def test_cyclic_dependencies(self):
+        ast = SqlAst(
+            "INSERT INTO a SELECT * FROM b; INSERT INTO b SELECT * FROM a;"
+            "INSERT INTO c SELECT * FROM a;"
+        )
+
+        assert ast.get_cyclic_dependencies() == [["a", "b"]]
+
+    def test_recursive_cte(self):
+        ast = SqlAst(
+            "WITH RECURSIVE t AS (SELECT 1 AS n UNION ALL SELECT n + 1 FROM t) "
+            "INSERT INTO target SELECT * FROM t"
+        )
+
+        assert {str(name) for name in ast.get_recursive_ctes()} == {"t"}
+
+
+class TestManagerCycles:
+    def test_report_covers_all_files(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a SELECT * FROM b;")
+        (tmp_path / "b.sql").write_text("INSERT INTO b SELECT * FROM c;")
+        (tmp_path / "c.sql").write_text("INSERT INTO c SELECT * FROM a;")
+        manager = GraphManager()
+        manager.process_directory(tmp_path)
+
+        report = manager.report_cycles()
+
+        assert report.components == [(["a", "b", "c"], [["a", "c", "b"]])]
+        assert "cycle: a -> c -> b -> a" in report.format()
@@ -1,6 +1,7 @@
 __all__ = []
 
 import src.base.parse
+from src.util.dialect import DialectDetector, detect_dialect
 
 
 class TestDialectsInput:
@@ -20,3 +21,57 @@ class TestDialectsInput:
         ast = src.base.parse.SqlAst("SELECT TOP IFNULL(name, 'N/A') FROM users;")
 
         assert ast.dialect == "Unknown"
+
+    def test_forced_dialect(self):
+        ast = src.base.parse.SqlAst(
+            "SELECT TOP 10 * FROM employees;", dialect="postgres"
+        )
+
+        assert ast.dialect == "Unknown"
+
+
+class TestDialectDetection:
+    def test_detect_by_markers(self):
+        assert detect_dialect("CREATE TABLE t (name VARCHAR2(10));") == "oracle"
+        assert detect_dialect("SELECT id::text FROM t;") == "postgres"
+        assert detect_dialect("CREATE TABLE `t` (id INT AUTO_INCREMENT);") == "mysql"
+        assert detect_dialect("SELECT * FROM t;") is None
+
+    def test_single_attempt_for_marked_code(self):
+        detector = DialectDetector()
+
+        _, dialect = detector.parse("SELECT NVL(a, 0) FROM dual;")
+
+        assert dialect == "oracle"
+        assert detector.attempts == 1
+
+    def test_remembers_dialect_per_hash(self):
+        detector = DialectDetector()
+        sql = "SELECT * FROM t WHERE a MINUS SELECT 1;"
+
+        _, first = detector.parse(sql)
+        attempts = detector.attempts
+        _, second = detector.parse(sql)
+
+        assert second == first
+        assert detector.attempts == attempts + 1
+
+    def test_directory_dialect_goes_first(self, tmp_path):
+        detector = DialectDetector()
+        path = str(tmp_path / "a.sql")
+        detector.parse("SELECT 1 FROM dual WHERE ROWNUM < 2;", source_path=path)
+
+        assert detector.candidates("SELECT 1;", "", str(tmp_path))[0] == "oracle"
+
+    def test_parser_forgets_dialects_of_previous_runs(self, tmp_path):
+        (tmp_path / "a.sql").write_text("SELECT `a` FROM t;")
+        (tmp_path / "b.sql").write_text("SELECT a FROM t;")
+        parser = src.base.parse.DirectoryParser()
+
+        parser.parse_files([str(tmp_path / "a.sql")])
+        assert parser.detector.by_directory[str(tmp_path)] == {"mysql": 1}
+        parser.parse_files([str(tmp_path / "b.sql")])
+
+        # b.sql has no markers: only its own run decides its dialect
+        assert parser.detector.by_directory[str(tmp_path)] == {"postgres": 1}
+        assert src.base.parse.DirectoryParser().detector.by_hash == {}
@@ -0,0 +1,51 @@
+__all__ = []
+
+import gc
+import pickle
+import weakref
+from collections import defaultdict
+
+from sqlglot.expressions import Expression, Insert, Select
+
+from src.base.parse import SqlAst
+from src.base.storage import Edge
+
+
+class TestEdge:
+    def test_value_equality_deduplicates(self):
+        edges = {Edge("a", "b", Insert()), Edge("a", "b", Insert())}
+
+        assert len(edges) == 1
+        assert Edge("a", "b", Insert()) != Edge("a", "b", Select())
+        assert Edge("a", "b", Insert()) != Edge("a", "b", Insert()).replace(
+            is_recursive=True
+        )
+
+    def test_pickle_round_trip(self):
+        edge = Edge("a", "b", Insert(), columns=(("x:input",), None))
+
+        assert pickle.loads(pickle.dumps(edge)) == edge
+
+    def test_edges_do_not_keep_ast_alive(self, monkeypatch):
+        nodes = weakref.WeakSet()
+        init = Expression.__init__
+
+        def tracking(self, **args):
+            init(self, **args)
+            nodes.add(self)
+
+        monkeypatch.setattr(Expression, "__init__", tracking)
+        dependencies = defaultdict(set)
+        for sql in (
+            "WITH r AS (SELECT * FROM a) INSERT INTO b SELECT * FROM r JOIN c ON r.id = c.id;",
+            "INSERT INTO d (x, y) VALUES (1, 2);",
+        ):
+            ast = SqlAst(sql, column_mode=True)
+            for target, edges in ast.get_dependencies().items():
+                dependencies[target] |= edges
+        del ast
+        gc.collect()
+
+        assert dependencies
+        # Only the detached CTE names are left
+        assert all(type(node).__name__ == "Identifier" for node in nodes)
@@ -0,0 +1,170 @@
+__all__ = []
+
+import csv
+import json
+import xml.etree.ElementTree as ET
+
+import networkx as nx
+import pytest
+from sqlglot.expressions import Update
+
+from src.base.export import export_format, export_graph
+from src.base.manager import GraphManager
+from src.base.storage import BuffRead, BuffWrite, Edge
+from src.func.buff_tables import BufferTableIndex
+
+SQL = """
+INSERT INTO sales SELECT * FROM orders JOIN customers ON orders.cid = customers.id;
+INSERT INTO orders SELECT * FROM raw_orders;
+"""
+
+
+def _manager(**kwargs):
+    manager = GraphManager(**kwargs)
+    manager.process_sql(SQL)
+    manager.storage.add_dependencies(
+        {"orders": [Edge("orders", "orders", Update, is_internal_update=True)]}
+    )
+    return manager
+
+
+def _edges(storage):
+    _, edges = storage.get_filtered_nodes_edges()
+    return sorted(
+        (str(source), str(target), data["operation"]) for source, target, data in edges
+    )
+
+
+def _jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class TestExportFormats:
+    def test_jsonl(self, tmp_path):
+        manager = _manager()
+        path = tmp_path / "graph.jsonl"
+
+        nodes, edges = export_graph(manager.storage, path)
+
+        records = _jsonl(path)
+        assert [r["id"] for r in records if r["type"] == "node"] == sorted(
+            manager.storage.nodes
+        )
+        assert sorted(
+            (r["source"], r["target"], r["operation"])
+            for r in records
+            if r["type"] == "edge"
+        ) == _edges(manager.storage)
+        assert (nodes, edges) == (
+            len(manager.storage.nodes),
+            len(_edges(manager.storage)),
+        )
+        internal = [r for r in records if r.get("operation") == "InternalUpdate"]
+        assert internal and internal[0]["style"] == "dashed"
+
+    def test_graphml(self, tmp_path):
+        manager = _manager()
+        path = tmp_path / "graph.graphml"
+
+        export_graph(manager.storage, path)
+
+        graph = nx.read_graphml(path)
+        assert set(graph.nodes) == manager.storage.nodes
+        assert sorted(
+            (source, target, data["operation"])
+            for source, target, data in graph.edges(data=True)
+        ) == _edges(manager.storage)
+        assert ET.parse(path).getroot().tag.endswith("graphml")
+
+    def test_dot(self, tmp_path):
+        manager = _manager()
+        path = tmp_path / "graph.gv"
+
+        export_graph(manager.storage, path)
+
+        text = path.read_text(encoding="utf-8")
+        assert text.startswith("digraph dependencies {\n") and text.endswith("}\n")
+        assert '"raw_orders" -> "orders" [label="Select", color="purple"];' in text
+        assert text.count(" -> ") == len(_edges(manager.storage))
+
+    def test_csv(self, tmp_path):
+        manager = _manager()
+        path = tmp_path / "graph.out"
+
+        export_graph(manager.storage, path, "csv")
+
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert sorted(
+            (row["source"], row["target"], row["operation"])
+            for row in rows
+            if row["type"] == "edge"
+        ) == _edges(manager.storage)
+        assert {row["source"] for row in rows if row["type"] == "node"} == (
+            manager.storage.nodes
+        )
+
+    def test_format_from_extension(self):
+        assert export_format("a/graph.GRAPHML") == "graphml"
+        assert export_format("graph.txt") == "jsonl"
+        assert export_format("graph.txt", "dot") == "dot"
+        with pytest.raises(ValueError):
+            export_format("graph.txt", "svg")
+
+    def test_quoting(self, tmp_path):
+        storage = BufferTableIndex()
+        storage.add_dependencies(
+            {
+                'tmp "x"': [Edge("p<1>&", 'tmp "x"', BuffWrite)],
+                "p2": [Edge('tmp "x"', "p2", BuffRead)],
+            }
+        )
+
+        export_graph(storage, tmp_path / "graph.graphml")
+        export_graph(storage, tmp_path / "graph.dot")
+
+        graph = nx.read_graphml(tmp_path / "graph.graphml")
+        assert set(graph.edges) == {("p<1>&", 'tmp "x"'), ('tmp "x"', "p2")}
+        assert '"p<1>&" -> "tmp \\"x\\""' in (tmp_path / "graph.dot").read_text()
+
+
+class TestExportStorages:
+    def test_columnar_matches_default(self, tmp_path):
+        export_graph(_manager().storage, tmp_path / "default.jsonl")
+        export_graph(_manager(columnar=True).storage, tmp_path / "columnar.jsonl")
+
+        default = _jsonl(tmp_path / "default.jsonl")
+        columnar = _jsonl(tmp_path / "columnar.jsonl")
+        key = lambda record: json.dumps(record, sort_keys=True)
+        assert sorted(default, key=key) == sorted(columnar, key=key)
+
+    def test_operator_filter(self, tmp_path):
+        manager = _manager(operators="JOIN")
+        manager.storage.set_operator_filter("JOIN")
+
+        export_graph(manager.storage, tmp_path / "graph.jsonl")
+
+        records = _jsonl(tmp_path / "graph.jsonl")
+        assert {r["operation"] for r in records if r["type"] == "edge"} == {"Join"}
+        assert {r["id"] for r in records if r["type"] == "node"} == {
+            "sales",
+            "customers",
+        }
+
+    def test_column_metadata(self, tmp_path):
+        manager = GraphManager(column_mode=True)
+        manager.process_sql("INSERT INTO a (x) SELECT b.x FROM b WHERE b.z > 1;")
+
+        export_graph(manager.storage, tmp_path / "graph.jsonl")
+
+        [edge] = [r for r in _jsonl(tmp_path / "graph.jsonl") if r["type"] == "edge"]
+        assert edge["columns"] == [["x"], ["z"]]
+
+    def test_manager_export(self, tmp_path):
+        manager = _manager()
+        manager.export(str(tmp_path / "graph.csv"))
+        manager.export(str(tmp_path / "missing" / "graph.csv"))
+
+        assert (tmp_path / "graph.csv").read_text().startswith("type,source,target")
+        assert not (tmp_path / "missing").exists()
@@ -0,0 +1,83 @@
+__all__ = []
+
+import os
+
+import pytest
+
+from src.base.manager import GraphManager
+from test.helpers import graph
+
+
+class TestIncremental:
+    @pytest.fixture(autouse=True)
+    def sql_dir(self, tmp_path):
+        self.dir = tmp_path / "sql"
+        self.dir.mkdir()
+        (self.dir / "a.sql").write_text("INSERT INTO a SELECT * FROM src_a;")
+        (self.dir / "b.sql").write_text("INSERT INTO b SELECT * FROM a;")
+        (self.dir / "c.sql").write_text("INSERT INTO c SELECT * FROM src_c;")
+
+    def _change_files(self):
+        (self.dir / "b.sql").write_text("INSERT INTO b SELECT * FROM c;")
+        os.remove(self.dir / "c.sql")
+        (self.dir / "d.sql").write_text("INSERT INTO d VALUES (1);")
+
+    def test_patch_matches_full_rebuild(self):
+        manager = GraphManager()
+        manager.process_directory(self.dir, incremental=True)
+
+        self._change_files()
+        results = manager.process_directory(self.dir, incremental=True)
+
+        assert sorted(os.path.basename(path) for path, _ in results) == [
+            "b.sql",
+            "d.sql",
+        ]
+        rebuilt = GraphManager()
+        rebuilt.process_directory(self.dir)
+        assert graph(manager.storage) == graph(rebuilt.storage)
+        assert "src_c" not in manager.storage.nodes
+        assert "c" in manager.storage.nodes  # still read by b.sql
+
+    def test_relative_directory_matches_full_rebuild(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (self.dir / "a.sql").write_text("INSERT INTO a VALUES (1);")
+        manager = GraphManager()
+        manager.process_directory("sql", incremental=True)
+
+        (self.dir / "a.sql").write_text("INSERT INTO a VALUES (2); SELECT * FROM a;")
+        manager.process_directory("sql", incremental=True)
+
+        rebuilt = GraphManager()
+        rebuilt.process_directory("sql")
+        assert graph(manager.storage) == graph(rebuilt.storage)
+        assert f"result {self.dir / 'a.sql'}:2" in manager.storage.nodes
+
+    def test_unchanged_directory_parses_nothing(self):
+        manager = GraphManager()
+        manager.process_directory(self.dir, incremental=True)
+        before = graph(manager.storage)
+
+        (self.dir / "a.sql").touch()
+        results = manager.process_directory(self.dir, incremental=True)
+
+        assert results == []
+        assert graph(manager.storage) == before
+
+    def test_state_round_trip(self, tmp_path):
+        state = str(tmp_path / "graph.state")
+        manager = GraphManager()
+        manager.process_directory(self.dir, incremental=True)
+        manager.save_state(state)
+
+        self._change_files()
+        restored = GraphManager()
+        assert restored.load_state(state)
+        restored.process_directory(self.dir, incremental=True)
+
+        rebuilt = GraphManager()
+        rebuilt.process_directory(self.dir)
+        assert graph(restored.storage) == graph(rebuilt.storage)
+
+    def test_missing_state_is_ignored(self, tmp_path):
+        assert not GraphManager().load_state(str(tmp_path / "missing.state"))
@@ -0,0 +1,65 @@
+__all__ = []
+
+import os
+
+import pytest
+
+from src.base.manager import GraphManager
+from src.base.parse import DirectoryParser, metrics
+from src.settings import BASE_DIR
+
+
+class TestMetrics:
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_per_file_and_total(self, jobs):
+        directory = BASE_DIR / "ddl"
+        manager = GraphManager()
+
+        with metrics.collecting() as run_metrics:
+            manager.process_directory(directory, jobs=jobs)
+
+        assert len(run_metrics.files) == len(os.listdir(directory))
+        total = run_metrics.as_dict()
+        assert total["counters"]["files"] == len(run_metrics.files)
+        assert total["counters"]["statements"] == sum(
+            m.counters["statements"] for m in run_metrics.files.values()
+        )
+        assert total["counters"]["edges"] > 0
+        for phase in ("file", "parse", "schema", "ctes", "dependencies"):
+            assert total["timers"][phase]["calls"] > 0
+        assert total["timers"]["storage.add"]["calls"] == len(run_metrics.files)
+        assert total["counters"]["walk.visits"] > 0
+
+    def test_dialect_fallback_is_counted(self, tmp_path):
+        # The whole file looks like postgres, the second statement is mysql only
+        (tmp_path / "a.sql").write_text(
+            "INSERT INTO a SELECT x::int, y::int, z::int FROM b;\n"
+            "INSERT INTO c SELECT `x` FROM d;\n"
+        )
+
+        with metrics.collecting() as run_metrics:
+            DirectoryParser().parse_directory(tmp_path)
+
+        assert run_metrics.counters["dialect.fallbacks"] == 1
+        assert run_metrics.counters["dialect.attempts"] > 2
+
+    def test_inactive_metrics_are_not_returned(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a VALUES (1);")
+
+        _, meta = DirectoryParser().parse_file_local(str(tmp_path / "a.sql"))
+
+        assert "metrics" not in meta
+
+    def test_prometheus_text(self, tmp_path):
+        run_metrics = metrics.Metrics()
+        run_metrics.count("dialect.fallbacks", 2)
+        run_metrics.add_time("parse", 0.5)
+        run_metrics.add_time("parse", 0.25)
+        path = tmp_path / "metrics.prom"
+
+        run_metrics.write(str(path), "prometheus")
+
+        lines = path.read_text().splitlines()
+        assert "etl_graph_dialect_fallbacks_total 2" in lines
+        assert 'etl_graph_phase_seconds_total{phase="parse"} 0.75' in lines
+        assert 'etl_graph_phase_calls_total{phase="parse"} 2' in lines
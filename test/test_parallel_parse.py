@@ -0,0 +1,121 @@
+__all__ = []
+
+import os
+
+import pytest
+
+from src.base.parse import DirectoryParser, SqlAst
+from src.settings import BASE_DIR
+from test.helpers import file_edges
+
+
+class CrashingSqlAst(SqlAst):
+    """Роняет рабочий процесс на файлах с маркером CRASH."""
+
+    def __init__(self, sql_code, **kwargs):
+        if "CRASH" in sql_code:
+            os._exit(1)
+        super().__init__(sql_code, **kwargs)
+
+
+class TestParallelParse:
+    def _run(self, directory, jobs):
+        return file_edges(DirectoryParser(SqlAst).parse_directory(directory, jobs=jobs))
+
+    def test_parallel_matches_sequential(self):
+        directory = BASE_DIR / "ddl"
+
+        sequential = self._run(directory, jobs=1)
+        parallel = self._run(directory, jobs=3)
+
+        assert len(sequential) == len(os.listdir(directory))
+        assert parallel == sequential
+
+    def test_worker_crash_is_contained(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a VALUES (1);")
+        (tmp_path / "b.sql").write_text("SELECT 'CRASH' FROM b;")
+        (tmp_path / "c.sql").write_text("INSERT INTO c SELECT * FROM a;")
+
+        parser = DirectoryParser(CrashingSqlAst)
+        results = parser.parse_directory(tmp_path, jobs=2)
+
+        assert [os.path.basename(path) for _, _, path in results] == [
+            "a.sql",
+            "b.sql",
+            "c.sql",
+        ]
+        assert results[0][1] == [] and "a" in results[0][0]
+        assert results[1][0] == {} and "crashed" in results[1][1][0]
+        assert results[2][1] == [] and "c" in results[2][0]
+
+    def test_synthetic_ids_do_not_depend_on_file_order(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a VALUES (1); SELECT * FROM a;")
+        (tmp_path / "b.sql").write_text("INSERT INTO b VALUES (1);")
+        paths = [str(tmp_path / "a.sql"), str(tmp_path / "b.sql")]
+
+        forward = file_edges(DirectoryParser().parse_files(paths))
+        backward = file_edges(DirectoryParser().parse_files(paths[::-1], jobs=2))
+
+        assert backward[::-1] == forward
+        assert forward[0][1] == [
+            ("a", f"result {paths[0]}:2", "Select"),
+            (f"input {paths[0]}:1", "a", "Insert"),
+        ]
+        assert forward[1][1] == [(f"input {paths[1]}:1", "b", "Insert")]
+
+    def test_synthetic_ids_do_not_depend_on_path_spelling(self, tmp_path, monkeypatch):
+        (tmp_path / "d").mkdir()
+        (tmp_path / "d" / "x.sql").write_text("INSERT INTO x VALUES (1);")
+        monkeypatch.chdir(tmp_path)
+
+        relative = DirectoryParser().parse_directory("d")
+        absolute = DirectoryParser().parse_files([str(tmp_path / "d" / "x.sql")])
+
+        assert relative == absolute
+        assert relative[0][2] == str(tmp_path / "d" / "x.sql")
+        assert f"input {tmp_path / 'd' / 'x.sql'}:1" in str(relative[0][0])
+
+    def test_options_are_keyword_only(self, tmp_path):
+        # The second positional slot used to be sep_parse
+        with pytest.raises(TypeError):
+            SqlAst("SELECT 1", True)
+        with pytest.raises(TypeError):
+            DirectoryParser().parse_directory(tmp_path, True)
+        with pytest.raises(TypeError):
+            DirectoryParser().parse_file_local(str(tmp_path / "a.sql"), True)
+
+
+class TestIterDirectory:
+    @pytest.fixture(autouse=True)
+    def sql_dir(self, tmp_path):
+        for name in "abcd":
+            (tmp_path / f"{name}.sql").write_text(
+                f"INSERT INTO {name} SELECT * FROM src_{name};"
+            )
+        self.dir = tmp_path
+
+    def test_results_are_yielded_per_file(self, monkeypatch):
+        parser = DirectoryParser()
+        parsed = []
+        parse_file_local = parser.parse_file_local
+        monkeypatch.setattr(
+            parser,
+            "parse_file_local",
+            lambda path: parsed.append(path) or parse_file_local(path),
+        )
+
+        stream = parser.iter_directory(self.dir)
+        dependencies, corrections, path = next(stream)
+
+        assert os.path.basename(path) == "a.sql" and "a" in dependencies
+        assert len(parsed) == 1
+        assert len(list(stream)) == 3
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_stream_matches_list(self, jobs):
+        streamed = file_edges(DirectoryParser().iter_directory(self.dir, jobs=jobs))
+
+        assert streamed == file_edges(DirectoryParser().parse_directory(self.dir))
+
+    def test_missing_directory_yields_nothing(self, tmp_path):
+        assert list(DirectoryParser().iter_directory(tmp_path / "missing")) == []
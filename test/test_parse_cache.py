@@ -0,0 +1,65 @@
+__all__ = []
+
+import os
+
+from src.base.parse import DirectoryParser
+from src.settings import BASE_DIR
+from src.util.cache import ParseCache
+from test.helpers import file_edges
+
+
+class TestParseCache:
+    def test_second_run_is_served_from_cache(self, tmp_path):
+        cache = ParseCache(str(tmp_path / "cache"))
+        directory = BASE_DIR / "ddl"
+
+        first = file_edges(DirectoryParser(cache=cache).parse_directory(directory))
+        assert cache.hits == 0
+
+        parser = DirectoryParser(cache=cache)
+        second = file_edges(parser.parse_directory(directory))
+
+        assert cache.hits == len(first)
+        assert second == first
+        assert "Employee" in parser.table_schema
+
+    def test_key_depends_on_settings(self, tmp_path):
+        cache = ParseCache(str(tmp_path))
+        sql = "SELECT * FROM users;"
+
+        keys = {
+            cache.make_key(sql),
+            cache.make_key(sql, ignore_io=True),
+            cache.make_key(sql, dialect="oracle"),
+            cache.make_key(sql, namespace="BufferTableDirectoryParser"),
+            cache.make_key(sql, source_path="etl/users.sql"),
+            cache.make_key(sql + " "),
+        }
+
+        assert len(keys) == 6
+        assert cache.make_key(sql) == cache.make_key(sql)
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ParseCache(str(tmp_path), max_bytes=3000)
+        payload = "x" * 900
+        for i in range(3):
+            cache.put(f"{i:064x}", payload)
+            os.utime(cache._path(f"{i:064x}"), (i, i))
+        assert cache.get(f"{0:064x}") == payload  # обращение обновляет запись
+
+        cache.put(f"{3:064x}", payload)
+
+        assert cache.size() <= 3000
+        assert cache.get(f"{0:064x}") == payload
+        assert cache.get(f"{1:064x}") is None
+        assert cache.get(f"{3:064x}") == payload
+
+    def test_corrupted_entry_is_a_miss(self, tmp_path):
+        cache = ParseCache(str(tmp_path))
+        key = cache.make_key("SELECT 1;")
+        cache.put(key, [1, 2, 3])
+        with open(cache._path(key), "wb") as f:
+            f.write(b"not a pickle")
+
+        assert cache.get(key) is None
+        assert not os.path.exists(cache._path(key))
@@ -0,0 +1,63 @@
+__all__ = []
+
+import pytest
+
+from src.base.manager import GraphManager
+from src.base.storage import GraphStorage
+from src.settings import BASE_DIR
+from src.util.prefilter import StatementFilter, statement_keywords
+from test.helpers import graph
+
+
+class TestStatementKeywords:
+    def test_quoted_text_is_ignored(self):
+        kind, keywords = statement_keywords(
+            "/* update */ (SELECT 'join', $$ delete $$, \"insert\" -- merge\n FROM t)"
+        )
+
+        assert kind == "SELECT"
+        assert keywords == {"SELECT", "FROM"}
+
+    @pytest.mark.parametrize(
+        "sql, operators, ignore_io, accepted",
+        [
+            ("SELECT * FROM a JOIN b ON a.id = b.id", ["INSERT"], False, False),
+            ("SELECT * FROM a, b", ["JOIN"], False, True),
+            (
+                "WITH c AS (SELECT 1) INSERT INTO t SELECT * FROM c",
+                ["INSERT"],
+                False,
+                True,
+            ),
+            ("SELECT * FROM a", None, True, False),
+            ("SELECT * INTO t FROM a", None, True, True),
+            ("WITH c AS (SELECT * FROM a) SELECT * FROM c", None, True, True),
+            ("CREATE TABLE t (id INT)", ["INSERT"], False, True),
+            ("DROP TABLE t", ["TABLE"], False, False),
+            ("TRUNCATE t", ["INSERT"], False, True),
+        ],
+    )
+    def test_accepts(self, sql, operators, ignore_io, accepted):
+        prefilter = StatementFilter(operators=operators, ignore_io=ignore_io)
+
+        assert prefilter.accepts(sql) is accepted
+
+
+class TestPrefilteredGraph:
+    # Without operators and ignore_io the prefilter has nothing to filter
+    FILTERS = [(None, True)] + [
+        (operators, ignore_io)
+        for operators in [*GraphStorage.OPERATOR_MAP, "INSERT,JOIN"]
+        for ignore_io in (False, True)
+    ]
+
+    @pytest.mark.parametrize("operators, ignore_io", FILTERS)
+    def test_graph_matches_full_parse(self, operators, ignore_io, monkeypatch):
+        directory = BASE_DIR / "ddl"
+        filtered = GraphManager(operators=operators, ignore_io=ignore_io)
+        filtered.process_directory(directory)
+        monkeypatch.setattr(StatementFilter, "accepts", lambda self, statement: True)
+        full = GraphManager(operators=operators, ignore_io=ignore_io)
+        full.process_directory(directory)
+
+        assert graph(filtered.storage) == graph(full.storage)
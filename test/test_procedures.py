@@ -0,0 +1,98 @@
+__all__ = []
+
+import time
+
+from src.func.buff_tables import Procedure
+from src.util.procedures import scan_procedures
+
+
+def _bodies(sql_code):
+    return [
+        (span.name, sql_code[span.start : span.end])
+        for span in scan_procedures(sql_code)
+    ]
+
+
+class TestScanProcedures:
+    def test_tagged_dollar_quotes(self):
+        sql_code = """
+        CREATE FUNCTION f() RETURNS void AS $body$
+        BEGIN
+            PERFORM '$$';
+            INSERT INTO t SELECT * FROM s;
+        END
+        $body$ LANGUAGE plpgsql;
+        """
+
+        assert _bodies(sql_code) == [
+            ("f", "PERFORM '$$';\n            INSERT INTO t SELECT * FROM s;")
+        ]
+
+    def test_keywords_in_comments_and_strings(self):
+        sql_code = """
+        -- CREATE PROCEDURE fake() AS $$ x $$
+        /* FUNCTION other() $$ */
+        INSERT INTO log VALUES ('PROCEDURE p() AS $$', 'it''s');
+        CREATE PROCEDURE real_one() LANGUAGE SQL AS $$ DELETE FROM t; $$;
+        """
+
+        assert _bodies(sql_code) == [("real_one", " DELETE FROM t; ")]
+
+    def test_function_mentions_without_body(self):
+        sql_code = """
+        DROP FUNCTION old_f(int);
+        CREATE TRIGGER trg AFTER INSERT ON t EXECUTE FUNCTION old_f()
+        CREATE FUNCTION new_f(a int) RETURNS int AS $$ SELECT a $$;
+        """
+
+        assert _bodies(sql_code) == [("new_f", " SELECT a ")]
+
+    def test_qualified_and_quoted_names(self):
+        sql_code = """
+        CREATE PROCEDURE etl.load() AS $$ SELECT 1 $$;
+        CREATE PROCEDURE "stage" . "Clean"() AS $$ SELECT 2 $$;
+        CREATE FUNCTION myfunction_helper() AS $$ SELECT 3 $$;
+        """
+
+        assert [name for name, _ in _bodies(sql_code)] == [
+            "etl.load",
+            "stage.Clean",
+            "myfunction_helper",
+        ]
+
+    def test_unbalanced_header(self):
+        sql_code = """
+        CREATE PROCEDURE p(a DECIMAL(10,2)
+        LANGUAGE SQL AS $$ SELECT 1; $$;
+        CREATE PROCEDURE q(b INT)) LANGUAGE SQL AS $$ SELECT 2; $$;
+        """
+
+        assert _bodies(sql_code) == [("p", " SELECT 1; "), ("q", " SELECT 2; ")]
+
+    def test_unterminated_constructs(self):
+        assert scan_procedures("CREATE PROCEDURE p() AS $$ SELECT 1") == []
+        assert scan_procedures("SELECT 'abc; CREATE PROCEDURE p() AS $$ 1 $$") == []
+
+    def test_unclosed_quote_is_linear(self):
+        # The former regex backtracked over the whole tail for every position
+        body = "CREATE PROCEDURE p(a INT) LANGUAGE SQL AS\n    UPDATE t SET a = a;\n"
+        sql_code = body * 20_000 + "AS $$ BEGIN"
+
+        started = time.perf_counter()
+        assert scan_procedures(sql_code) == []
+        assert time.perf_counter() - started < 2
+
+
+class TestProcedureSource:
+    def test_code_is_sliced_from_source(self):
+        sql_code = "CREATE PROCEDURE p() AS $$ BEGIN SELECT 1; END $$;" * 3
+
+        procedures = Procedure.extract_procedures(sql_code)
+
+        assert [p.code for p in procedures] == ["SELECT 1;"] * 3
+        assert all(p._source is sql_code for p in procedures)
+
+    def test_plain_code(self):
+        procedure = Procedure("p", "SELECT 1;")
+
+        assert procedure.code == "SELECT 1;"
@@ -0,0 +1,209 @@
+__all__ = []
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+import pytest
+
+from src.base.manager import GraphManager
+from src.base.parse import TimeBudget as ParserTimeBudget
+from src.base.server import LineageServer, parse_address
+from src.func.buff_tables import NewBuffGraphManager
+from src.util.lineage import LineageIndex
+from src.util.metrics import LatencyWindow
+from test.helpers import SlowSqlAst
+
+
+def _request(address, path, payload=None):
+    host, port = address
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(f"http://{host}:{port}{path}", data=data)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _wait_generation(address, generation, timeout=10):
+    deadline = time.time() + timeout
+    while _request(address, "/health")[1]["generation"] < generation:
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def sql_dir(tmp_path):
+    (tmp_path / "a.sql").write_text("INSERT INTO b SELECT * FROM a;")
+    (tmp_path / "b.sql").write_text("INSERT INTO c SELECT * FROM b;")
+    (tmp_path / "d.sql").write_text("INSERT INTO d SELECT * FROM x;")
+    return tmp_path
+
+
+class TestLineageIndex:
+    def test_queries(self):
+        index = LineageIndex(
+            [
+                ("f1.sql", "a", "b"),
+                ("f2.sql", "b", "c"),
+                ("f3.sql", "c", "a"),
+                ("f4.sql", "x", "d"),
+            ],
+            nodes=["lonely"],
+        )
+
+        assert index.downstream("a") == {"b": 1, "c": 2}
+        assert index.downstream("a", depth=1) == {"b": 1}
+        assert index.upstream("d") == {"x": 1}
+        assert index.impact("b") == {
+            "tables": {"c": 1, "a": 2},
+            "files": ["f1.sql", "f2.sql", "f3.sql"],
+        }
+        assert "lonely" in index and index.downstream("lonely") == {}
+        assert index.edges == 4
+
+
+class TestLatencyWindow:
+    def test_percentiles(self):
+        window = LatencyWindow(size=100)
+        assert window.percentiles() == {}
+        for i in range(1, 201):
+            window.record(i / 1000)
+
+        assert window.count == 200
+        assert window.percentiles() == {"p50": 0.15, "p90": 0.19, "p99": 0.199}
+
+
+class TestLineageServer:
+    def test_parse_address(self):
+        assert parse_address("8080") == ("127.0.0.1", 8080)
+        assert parse_address("0.0.0.0:9000") == ("0.0.0.0", 9000)
+
+    def test_queries(self, sql_dir):
+        with LineageServer(GraphManager(), sql_dir) as server:
+            address = server.start()
+
+            status, body = _request(address, "/downstream?table=a")
+            assert (status, body) == (
+                200,
+                {"table": "a", "downstream": {"b": 1, "c": 2}},
+            )
+            status, body = _request(address, "/upstream?table=c&depth=1")
+            assert body["upstream"] == {"b": 1}
+            status, body = _request(address, "/impact?table=a")
+            assert body["tables"] == {"b": 1, "c": 2}
+            assert body["files"] == [str(sql_dir / "a.sql"), str(sql_dir / "b.sql")]
+
+            status, body = _request(
+                address, "/sql", {"sql": "INSERT INTO t SELECT * FROM s;"}
+            )
+            assert status == 200
+            assert body["edges"] == [
+                {"source": "s", "target": "t", "operation": "Select"}
+            ]
+
+            assert _request(address, "/downstream?table=nope")[0] == 404
+            assert _request(address, "/downstream")[0] == 400
+            assert _request(address, "/sql", {})[0] == 400
+            assert _request(address, "/nothing")[0] == 404
+
+            status, body = _request(address, "/stats")
+            assert body["latency"]["downstream"]["count"] == 3
+            assert set(body["latency"]["downstream"]) == {"count", "p50", "p90", "p99"}
+
+    def test_operator_filter(self, sql_dir):
+        (sql_dir / "j.sql").write_text(
+            "INSERT INTO j SELECT * FROM a JOIN k ON a.id = k.id;"
+        )
+        with LineageServer(GraphManager(operators="JOIN"), sql_dir) as server:
+            address = server.start()
+
+            assert _request(address, "/downstream?table=k")[1]["downstream"] == {"j": 1}
+            # SELECT edges a -> b -> c are hidden by the filter, as on the graph
+            assert _request(address, "/downstream?table=b")[0] == 404
+            assert _request(address, "/health")[1]["edges"] == 1
+
+    def test_functional_mode(self, tmp_path):
+        (tmp_path / "load.ddl").write_text(
+            "CREATE PROCEDURE load_stage() AS $$ "
+            "INSERT INTO stage SELECT * FROM src; $$;"
+        )
+        (tmp_path / "mart.ddl").write_text(
+            "CREATE PROCEDURE load_mart() AS $$ "
+            "INSERT INTO mart SELECT * FROM stage; $$;"
+        )
+        with LineageServer(NewBuffGraphManager(), tmp_path) as server:
+            address = server.start()
+
+            status, body = _request(address, "/downstream?table=stage")
+            assert body["downstream"] == {r"\$load_mart\$": 1}
+            status, body = _request(
+                address, "/upstream?table=" + quote(r"\$load_mart\$")
+            )
+            assert body["upstream"] == {"stage": 1, r"\$load_stage\$": 2}
+            # Only buffer tables are indexed, src and mart are not on the graph
+            assert _request(address, "/downstream?table=src")[0] == 404
+            assert _request(address, "/impact?table=stage")[1]["files"] == [
+                str(tmp_path / "mart.ddl")
+            ]
+
+    def test_reload_does_not_block_readers(self, sql_dir):
+        manager = GraphManager()
+        with LineageServer(manager, sql_dir, interval=0.05) as server:
+            address = server.start()
+            process_directory = manager.process_directory
+            release = threading.Event()
+
+            def slow_process_directory(*args, **kwargs):
+                release.wait(10)
+                return process_directory(*args, **kwargs)
+
+            manager.process_directory = slow_process_directory
+            (sql_dir / "b.sql").write_text("INSERT INTO e SELECT * FROM b;")
+            assert _request(address, "/reload", {})[0] == 202
+
+            started = time.perf_counter()
+            status, body = _request(address, "/downstream?table=b")
+            assert time.perf_counter() - started < 1
+            assert body["downstream"] == {"c": 1}
+            assert _request(address, "/health")[1]["reloading"] is True
+
+            release.set()
+            _wait_generation(address, 2)
+            assert _request(address, "/downstream?table=b")[1]["downstream"] == {"e": 1}
+
+    def test_reload_in_warm_pool(self, sql_dir):
+        manager = GraphManager()
+        manager.parser.sql_ast_cls = SlowSqlAst
+        manager.parser.budget = ParserTimeBudget(statement_seconds=0.5)
+        with LineageServer(manager, sql_dir, interval=0.05) as server:
+            address = server.start()
+            workers = set(server._pool.executor._processes)
+
+            (sql_dir / "b.sql").write_text(
+                "INSERT INTO c SELECT * FROM slow; INSERT INTO e SELECT * FROM b;"
+            )
+            started = time.perf_counter()
+            assert _request(address, "/reload", {})[0] == 202
+            _wait_generation(address, 2, timeout=20)
+
+            # The statement budget interrupts the slow statement in the worker
+            assert time.perf_counter() - started < 20
+            assert _request(address, "/downstream?table=b")[1]["downstream"] == {"e": 1}
+            assert set(server._pool.executor._processes) == workers
+
+    def test_warm_pool(self, sql_dir):
+        with LineageServer(GraphManager(), sql_dir, jobs=2) as server:
+            address = server.start()
+            status, body = _request(
+                address,
+                "/sql",
+                {"sql": "INSERT INTO t SELECT * FROM s JOIN r ON s.id = r.id;"},
+            )
+
+        assert status == 200
+        assert {edge["source"] for edge in body["edges"]} == {"r", "s"}
@@ -0,0 +1,68 @@
+__all__ = []
+
+import os
+import subprocess
+import sys
+
+from src.settings import BASE_DIR
+
+SRC_DIR = BASE_DIR / "src"
+# Heavy plotting modules that must load only when a graph is rendered
+GUI_MODULES = ("matplotlib", "networkx", "numpy", "PyQt6")
+# Cumulative import time of the CLI and a mode module. It is about 0.1-0.2 s;
+# loading the plotting stack at import time adds 0.7 s or more
+STARTUP_BUDGET = 0.5
+
+
+def _import_times(args, env=None):
+    """Запускает python -X importtime и возвращает {модуль: секунды с зависимостями}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=SRC_DIR,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules[name.strip()] = int(cumulative) / 1e6
+    return modules
+
+
+def _gui_modules(modules):
+    return sorted(name for name in modules if name.split(".")[0] in GUI_MODULES)
+
+
+class TestStartup:
+    def test_cli_does_not_import_gui_stack(self):
+        code = "import main, table.run, field.run, func.run, base.server, base.export"
+        assert _gui_modules(_import_times(["-c", code])) == []
+
+    def test_startup_budget(self):
+        code = "import main, table.run"
+        seconds = []
+        for _ in range(3):
+            modules = _import_times(["-c", code])
+            seconds.append(sum(modules.get(name, 0) for name in ("main", "table.run")))
+        assert min(seconds) < STARTUP_BUDGET, seconds
+
+    def test_headless_run(self, tmp_path):
+        modules = _import_times(
+            [
+                "headless.py",
+                "--mode",
+                "table",
+                "--directory_path",
+                str(BASE_DIR / "ddl"),
+                "--cycles",
+            ],
+            env={"LOG_DIR": str(tmp_path)},
+        )
+
+        assert "base.parse" in modules
+        assert _gui_modules(modules) == []
@@ -0,0 +1,222 @@
+__all__ = []
+
+import pytest
+
+from src.base.parse import DirectoryParser, SqlAst
+from src.field.storage import ColumnStorage
+from src.util.cache import ParseCache
+from src.util.dialect import DialectDetector
+from src.util.statements import (
+    StatementReader,
+    read_statements,
+    split_statements,
+    strip_bulk_data,
+)
+
+
+def _edges(dependencies):
+    return {
+        (edge.source, edge.target) for edges in dependencies.values() for edge in edges
+    }
+
+
+class TestSplitStatements:
+    def test_semicolons_inside_literals_and_comments(self):
+        sql = (
+            "SELECT 'a;b', \"c;d\", `e;f` FROM t; -- g;h\n"
+            "/* i;\n j */ SELECT $$ k; $$, $tag$ l; $tag$ FROM v$x;\n"
+            "SELECT 'it''s;';"
+        )
+
+        assert split_statements(sql) == [
+            (1, "SELECT 'a;b', \"c;d\", `e;f` FROM t"),
+            (3, "SELECT $$ k; $$, $tag$ l; $tag$ FROM v$x"),
+            (4, "SELECT 'it''s;'"),
+        ]
+
+    def test_skips_empty_and_comment_only_fragments(self):
+        assert split_statements(" ;\n-- only a comment;\n/* x */;") == []
+
+    def test_unclosed_quote_runs_to_the_end(self):
+        assert split_statements("SELECT 'a; SELECT 2;") == [(1, "SELECT 'a; SELECT 2;")]
+
+    def test_backslash_escapes(self):
+        sql = "INSERT INTO t VALUES ('it\\'s; fine', \"a\\\\\"); SELECT 1;"
+
+        assert split_statements(sql, backslash_escapes=True) == [
+            (1, "INSERT INTO t VALUES ('it\\'s; fine', \"a\\\\\")"),
+            (1, "SELECT 1"),
+        ]
+        # Standard SQL: the backslash is an ordinary character
+        assert split_statements("SELECT 'a\\'; SELECT 2;") == [
+            (1, "SELECT 'a\\'"),
+            (1, "SELECT 2"),
+        ]
+
+    def test_mysql_dump_with_escaped_quotes(self):
+        sql = "INSERT INTO t VALUES ('it\\'s; fine'); INSERT INTO u SELECT * FROM t;"
+
+        ast = SqlAst(sql, dialect="mysql")
+
+        assert ast.get_corrections() == []
+        assert _edges(ast.get_dependencies()) == {("input 1", "t"), ("t", "u")}
+
+
+class TestPerStatementParsing:
+    SQL = (
+        "INSERT INTO a SELECT * FROM src_a;\n"
+        "INSERT ONTO broken VALUES (1);\n"
+        "INSERT INTO b SELECT * FROM a;"
+    )
+
+    def test_failure_is_localized(self):
+        ast = SqlAst(self.SQL)
+
+        targets = set(ast.get_dependencies())
+        assert {"a", "b"} <= targets
+        assert len(ast.get_corrections()) == 1
+        assert ast.get_corrections()[0].startswith(
+            "Error parsing SQL: statement 2 (line 2):"
+        )
+
+    def test_only_failing_statement_is_retried(self):
+        detector = DialectDetector()
+        statements = [text for _, text in split_statements(self.SQL)]
+
+        results = detector.parse_statements(self.SQL, statements)
+
+        assert [dialect for _, dialect, _ in results] == [
+            "postgres",
+            "Unknown",
+            "postgres",
+        ]
+        assert detector.attempts == 2 + len(
+            DialectDetector().candidates(self.SQL, "", None)
+        )
+
+
+class TestStatementReader:
+    SQL = (
+        "SELECT 'a;''b' FROM t; -- c;d\n"
+        "/* e;\n f */ INSERT INTO v SELECT $tag$ g; $tag$, x$y FROM w;\n"
+        'SELECT "h;i", $$;$$ FROM z -'
+        "- tail comment;\n"
+        "SELECT 'unclosed;"
+    )
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 1000])
+    def test_matches_split_statements(self, chunk_size):
+        reader = StatementReader()
+        statements = []
+        for start in range(0, len(self.SQL), chunk_size):
+            statements += reader.feed(self.SQL[start : start + chunk_size])
+        statements += reader.close()
+
+        assert statements == split_statements(self.SQL)
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 1000])
+    def test_backslash_escapes_across_chunks(self, chunk_size):
+        sql = "SELECT 'a\\'; b\\\\', 'c''\\'' FROM t; SELECT 'd\\\\';" * 2
+        reader = StatementReader(backslash_escapes=True)
+        statements = []
+        for start in range(0, len(sql), chunk_size):
+            statements += reader.feed(sql[start : start + chunk_size])
+        statements += reader.close()
+
+        assert statements == split_statements(sql, backslash_escapes=True)
+        assert len(statements) == 4
+
+    def test_completed_statements_are_released(self):
+        reader = StatementReader()
+
+        assert reader.feed("SELECT 1; SELECT ';") == [(1, "SELECT 1")]
+        assert reader.buffered < len("SELECT 1; SELECT ';")
+        assert reader.feed("';") == [(1, "SELECT ';'")]
+        assert reader.buffered <= 1
+
+    def test_read_statements(self, tmp_path):
+        path = tmp_path / "dump.sql"
+        path.write_text(self.SQL * 3)
+
+        assert list(read_statements(str(path), chunk_size=4)) == split_statements(
+            self.SQL * 3
+        )
+
+
+class TestStreamedFile:
+    SQL = "".join(
+        f"INSERT INTO t{i} SELECT * FROM s{i} WHERE note = 'x;{i}';\n"
+        for i in range(50)
+    )
+
+    def test_streamed_file_matches_whole_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "dump.sql"
+        path.write_text(self.SQL)
+
+        whole, _ = DirectoryParser().parse_file_local(str(path))
+        monkeypatch.setattr(DirectoryParser, "STREAM_THRESHOLD", 0)
+        monkeypatch.setattr(DirectoryParser, "STREAM_CHUNK_SIZE", 16)
+        streamed, _ = DirectoryParser(
+            cache=ParseCache(str(tmp_path / "cache"))
+        ).parse_file_local(str(path))
+
+        assert _edges(streamed[0]) == _edges(whole[0])
+        assert ("s49", "t49") in _edges(streamed[0])
+        assert streamed[1] == whole[1] == []
+
+
+class TestBulkData:
+    DUMP = (
+        "COPY public.orders (id, note) FROM stdin;\n"
+        "1\t'a;b\n"
+        "2\tc; d\n"
+        "\\.\n"
+        "INSERT INTO report SELECT * FROM public.orders;\n"
+    )
+
+    def test_copy_data_is_not_split(self):
+        assert split_statements(self.DUMP) == [
+            (1, "COPY public.orders (id, note) FROM stdin"),
+            (5, "INSERT INTO report SELECT * FROM public.orders"),
+        ]
+
+    @pytest.mark.parametrize(
+        "statement",
+        [
+            "INSERT INTO t VALUES (1), (2) ON CONFLICT DO NOTHING",
+            "INSERT INTO t VALUES (1), (2) RETURNING id",
+            "INSERT INTO t VALUES (1 /* ) */)",
+            "INSERT INTO t SELECT * FROM s",
+        ],
+    )
+    def test_statements_with_more_than_data_are_kept(self, statement):
+        assert strip_bulk_data(statement) == statement
+
+    def test_escaped_quote_in_values_payload(self):
+        statement = "INSERT INTO t VALUES ('a\\'b)'), (1)"
+
+        assert strip_bulk_data(statement, backslash_escapes=True) == (
+            "INSERT INTO t VALUES (NULL)"
+        )
+        # Without escapes the string ends at "\'" and "b)" closes the tuple
+        assert strip_bulk_data(statement) == statement
+
+    def test_values_payload_is_skipped(self):
+        statement = "INSERT INTO t (a, b) VALUES " + ", ".join(
+            f"({i}, 'x''{i}', now())" for i in range(1000)
+        )
+
+        assert strip_bulk_data(statement) == "INSERT INTO t (a, b) VALUES (NULL)"
+
+    def test_copy_gives_input_edge_with_columns(self):
+        ast = SqlAst(self.DUMP, column_mode=True)
+        storage = ColumnStorage()
+        storage.add_dependencies(ast.get_dependencies())
+
+        assert ast.get_corrections() == []
+        (edge,) = ast.get_dependencies()["orders"]
+        assert edge.source.startswith("input ")
+        columns = [
+            data["columns"] for _, target, data in storage.edges if target == "orders"
+        ]
+        assert columns == [(("id:input", "note:input"), None)]
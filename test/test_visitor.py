@@ -0,0 +1,49 @@
+__all__ = []
+
+from sqlglot.expressions import Expression
+
+from src.base.parse import SqlAst
+from src.base.visitor import DependencyVisitor
+
+
+class TestDependencyVisitor:
+    SQL = (
+        "WITH recent AS (SELECT * FROM orders WHERE id > (SELECT max(id) FROM archive)) "
+        "INSERT INTO report SELECT r.id FROM recent r JOIN customers c ON c.id = r.cid "
+        "WHERE c.id IN (SELECT id FROM vip);"
+    )
+
+    def test_each_node_is_visited_once(self, monkeypatch):
+        ast = SqlAst(self.SQL)
+        nodes = sum(1 for statement in ast.parsed for _ in statement.walk())
+
+        visits = []
+        iter_expressions = Expression.iter_expressions
+
+        def counting(self, *args, **kwargs):
+            visits.append(self)
+            return iter_expressions(self, *args, **kwargs)
+
+        monkeypatch.setattr(Expression, "iter_expressions", counting)
+        visitor = DependencyVisitor(ast, ast.dependencies)
+        for statement in ast.parsed:
+            ast._extract_dependencies(statement, visitor)
+
+        assert len(visits) == nodes
+
+    def test_no_duplicate_edges(self):
+        ast = SqlAst(self.SQL)
+
+        edges = [
+            (edge.source, str(target), edge.op_type.__name__)
+            for target, target_edges in ast.get_dependencies().items()
+            for edge in target_edges
+        ]
+
+        assert len(edges) == len(set(edges))
+        assert {(source, target) for source, target, _ in edges} >= {
+            ("orders", "recent"),
+            ("archive", "recent"),
+            ("customers", "report"),
+            ("vip", "report"),
+        }
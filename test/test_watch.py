@@ -0,0 +1,124 @@
+__all__ = []
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.base.manager import GraphManager
+from src.util.watch import FileWatcher
+from test.helpers import graph
+
+
+class TestFileWatcher:
+    @pytest.mark.parametrize("use_inotify", [False, True])
+    def test_reports_changed_files(self, tmp_path, use_inotify):
+        (tmp_path / "a.sql").write_text("SELECT 1;")
+        (tmp_path / "b.sql").write_text("SELECT 2;")
+        (tmp_path / "notes.txt").write_text("")
+        with FileWatcher(tmp_path, use_inotify=use_inotify) as watcher:
+            assert watcher.wait(0.05) == []
+
+            (tmp_path / "a.sql").write_text("SELECT 10;")
+            (tmp_path / "b.sql").unlink()
+            (tmp_path / "sub").mkdir()
+            (tmp_path / "sub" / "c.ddl").write_text("SELECT 3;")
+            (tmp_path / "notes.txt").write_text("changed")
+
+            assert watcher.wait(0.05) == sorted(
+                str(tmp_path / name) for name in ("a.sql", "b.sql", "sub/c.ddl")
+            )
+            assert watcher.wait(0.05) == []
+
+    def test_inotify_wakes_up_on_save(self, tmp_path):
+        with FileWatcher(tmp_path) as watcher:
+            if watcher.backend != "inotify":
+                pytest.skip("inotify is unavailable")
+            timer = threading.Timer(0.1, (tmp_path / "a.sql").write_text, ["SELECT 1;"])
+            timer.start()
+            started = time.perf_counter()
+            changed = watcher.wait(5)
+            timer.join()
+
+        assert changed == [str(tmp_path / "a.sql")]
+        assert time.perf_counter() - started < 1
+
+
+class TestUpdateFiles:
+    def test_only_touched_files_are_reparsed(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a SELECT * FROM b;")
+        (tmp_path / "b.sql").write_text("INSERT INTO c SELECT * FROM d;")
+        manager = GraphManager()
+        manager.process_directory(tmp_path, incremental=True)
+
+        (tmp_path / "b.sql").write_text("INSERT INTO e SELECT * FROM a;")
+        results = manager.update_files([tmp_path / "a.sql", tmp_path / "b.sql"])
+
+        assert [os.path.basename(path) for path, _ in results] == ["b.sql"]
+        assert manager.storage.nodes == {"a", "b", "e"}
+
+    def test_deleted_and_unchanged_files(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a SELECT * FROM b;")
+        (tmp_path / "b.sql").write_text("INSERT INTO c SELECT * FROM d;")
+        manager = GraphManager()
+        manager.process_directory(tmp_path, incremental=True)
+
+        # A new mtime with the same content does not change the graph
+        os.utime(tmp_path / "a.sql", ns=(0, 0))
+        assert manager.update_files([tmp_path / "a.sql"]) is None
+
+        (tmp_path / "b.sql").unlink()
+        assert manager.update_files([tmp_path / "b.sql"]) == []
+        assert manager.storage.nodes == {"a", "b"}
+        assert list(manager.manifest.entries) == [str(tmp_path / "a.sql")]
+
+    def test_update_matches_full_pass(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "d").mkdir()
+        (tmp_path / "d" / "x.sql").write_text("INSERT INTO x VALUES (1);")
+        (tmp_path / "d" / "y.sql").write_text("INSERT INTO y SELECT * FROM x;")
+        manager = GraphManager()
+        manager.process_directory("d", incremental=True)
+
+        (tmp_path / "d" / "x.sql").write_text("INSERT INTO x VALUES (2); SELECT 1;")
+        assert manager.update_files([tmp_path / "d" / "x.sql"])
+
+        rebuilt = GraphManager()
+        rebuilt.process_directory("d")
+        assert graph(manager.storage) == graph(rebuilt.storage)
+
+
+class TestWatch:
+    def test_graph_follows_saves(self, tmp_path):
+        (tmp_path / "a.sql").write_text("INSERT INTO a SELECT * FROM b;")
+        manager = GraphManager()
+        updates = []
+        updated = threading.Event()
+        stop = threading.Event()
+
+        def on_update(results):
+            updates.append([os.path.basename(path) for path, _ in results])
+            updated.set()
+
+        thread = threading.Thread(
+            target=manager.watch,
+            args=(tmp_path,),
+            kwargs={"interval": 0.05, "on_update": on_update, "stop": stop},
+        )
+        thread.start()
+        try:
+            assert updated.wait(10)
+            updated.clear()
+
+            started = time.perf_counter()
+            (tmp_path / "b.sql").write_text("INSERT INTO c SELECT * FROM a;")
+            assert updated.wait(10)
+            latency = time.perf_counter() - started
+        finally:
+            stop.set()
+            thread.join()
+
+        assert updates == [["a.sql"], ["b.sql"]]
+        assert manager.storage.nodes == {"a", "b", "c"}
+        assert latency < 1